@@ -0,0 +1,69 @@
+"""Compares the size of synthetic outbreak and catalog responses in each
+    cache format, and the time taken to store and load them
+
+Run from the repository root with ``python -m benchmarks.cache_formats``.
+Formats needing a package which is not installed are skipped.
+"""
+import random
+import time
+from benchmarks.dataframe_memory import outbreak_records
+from gideon_api.query.serialization import (COMPRESSIONS, ENCODINGS,
+                                            check_format, deserialize,
+                                            serialize)
+
+
+def catalog_records(count: int, seed: int = 0):
+    """Creates records shaped like the /microbiology/bacteria response"""
+    rng = random.Random(seed)
+    words = [
+        'Acinetobacter', 'baumannii', 'Bacillus', 'cereus', 'Brucella',
+        'melitensis', 'Clostridium', 'difficile', 'Escherichia', 'coli'
+    ]
+    return [{
+        'bacteria_code': 1000 + i,
+        'bacteria': ' '.join(rng.sample(words, 2)) + f' {i}',
+    } for i in range(count)]
+
+
+def _formats():
+    for encoding in ENCODINGS:
+        for compression in [''] + list(COMPRESSIONS):
+            name = f'{encoding}+{compression}' if compression else encoding
+            try:
+                yield check_format(name)
+            except ImportError:
+                continue
+
+
+def _time(func, *args, repeat: int = 3) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main() -> None:
+    payloads = (
+        ('outbreaks', {
+            'data': outbreak_records(50000)
+        }),
+        ('catalog', {
+            'data': catalog_records(5000)
+        }),
+    )
+    for payload, response in payloads:
+        print(payload)
+        for name in _formats():
+            data = serialize(response, name)
+            assert deserialize(data, allow_pickle=True) == response
+            stored = _time(serialize, response, name)
+            loaded = _time(deserialize, data, True)
+            print(f'  {name:16} {len(data) / 2**10:9.1f} KiB, stored in '
+                  f'{stored * 1000:7.1f} ms, loaded in {loaded * 1000:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
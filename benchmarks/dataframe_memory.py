@@ -0,0 +1,52 @@
+"""Compares the memory used by plain and typed DataFrames of a synthetic
+    outbreak response, and the time taken to build and group them
+
+Run from the repository root with
+``python -m benchmarks.dataframe_memory``.
+"""
+import random
+import time
+from pandas import DataFrame
+from gideon_api.query.schema import to_typed_dataframe
+
+
+def outbreak_records(count: int, seed: int = 0):
+    """Creates records shaped like the /diseases/outbreaks response"""
+    rng = random.Random(seed)
+    countries = [(f'G{100 + i}', f'Country {i}') for i in range(230)]
+    diseases = [(10000 + i, f'Disease {i}') for i in range(360)]
+    records = []
+    for _ in range(count):
+        country_code, country = rng.choice(countries)
+        disease_code, disease = rng.choice(diseases)
+        records.append({
+            'disease_code': disease_code,
+            'disease': disease,
+            'country_code': country_code,
+            'country': country,
+            'year': rng.randint(1900, 2023),
+            'latitude': f'{rng.uniform(-90, 90):.4f}',
+            'longitude': f'{rng.uniform(-180, 180):.4f}',
+        })
+    return records
+
+
+def main(count: int = 200000) -> None:
+    records = outbreak_records(count)
+    for name, convert in (
+        ('plain', DataFrame),
+        ('typed', lambda data: to_typed_dataframe(data, '/diseases/outbreaks')),
+    ):
+        start = time.perf_counter()
+        frame = convert(records)
+        elapsed = time.perf_counter() - start
+        size = frame.memory_usage(deep=True).sum()
+        start = time.perf_counter()
+        frame.groupby(['country_code', 'disease_code'], observed=True).size()
+        grouped = time.perf_counter() - start
+        print(f'{name}: {size / 2**20:8.1f} MiB, converted in '
+              f'{elapsed:.2f} s, grouped in {grouped:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
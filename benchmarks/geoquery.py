@@ -0,0 +1,46 @@
+"""Compares a spatial index with scanning every row, for radius and nearest
+    neighbour queries over a synthetic outbreak dataframe
+
+Run from the repository root with ``python -m benchmarks.geoquery``.
+"""
+import random
+import time
+import numpy as np
+from pandas import DataFrame
+from benchmarks.dataframe_memory import outbreak_records
+from gideon_api import OutbreakIndex
+from gideon_api.utilities.geoquery import haversine_km
+
+
+def main(count: int = 200000, queries: int = 1000) -> None:
+    frame = DataFrame(outbreak_records(count))
+    rng = random.Random(1)
+    lat = np.array([rng.uniform(-60, 60) for _ in range(queries)])
+    lon = np.array([rng.uniform(-180, 180) for _ in range(queries)])
+
+    start = time.perf_counter()
+    index = OutbreakIndex(frame)
+    print(f'index built in {time.perf_counter() - start:.2f} s')
+
+    start = time.perf_counter()
+    points_lat = frame['latitude'].astype(float).to_numpy()
+    points_lon = frame['longitude'].astype(float).to_numpy()
+    scanned = sum(
+        int((haversine_km(query_lat, query_lon, points_lat, points_lon) <= 200
+            ).sum()) for query_lat, query_lon in zip(lat, lon))
+    print(f'scan:  {queries} radius queries in '
+          f'{time.perf_counter() - start:.2f} s, {scanned} matches')
+
+    start = time.perf_counter()
+    matches = len(index.within_radius(lat, lon, 200))
+    print(f'index: {queries} radius queries in '
+          f'{time.perf_counter() - start:.2f} s, {matches} matches')
+
+    start = time.perf_counter()
+    matches = len(index.nearest(lat, lon, 10))
+    print(f'index: {queries} 10-nearest queries in '
+          f'{time.perf_counter() - start:.2f} s, {matches} matches')
+
+
+if __name__ == '__main__':
+    main()
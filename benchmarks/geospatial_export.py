@@ -0,0 +1,35 @@
+"""Compares the time taken to export a synthetic outbreak dataframe to each
+    geospatial file format
+
+Run from the repository root with
+``python -m benchmarks.geospatial_export``.
+"""
+import os
+import tempfile
+import time
+from pandas import DataFrame
+from benchmarks.dataframe_memory import outbreak_records
+from gideon_api import to_geojson
+
+
+def main(count: int = 200000) -> None:
+    frame = DataFrame(outbreak_records(count))
+    start = time.perf_counter()
+    to_geojson(frame)
+    print(f'points built in {time.perf_counter() - start:.2f} s')
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in ('geojson', 'fgb', 'gpkg', 'parquet'):
+            path = os.path.join(directory, f'outbreaks.{extension}')
+            start = time.perf_counter()
+            try:
+                to_geojson(frame, path, return_geodataframe=False)
+            except ImportError as e:
+                print(f'{extension:8} skipped: {e}')
+                continue
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(path)
+            print(f'{extension:8} {elapsed:6.2f} s, {size / 2**20:7.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Measures the throughput, retries and cache hits of the client against a
+    local stand-in server, without a network
+
+Run from the repository root with
+``python -m benchmarks.standin_throughput [FIXTURES]``. Without a fixture
+directory, synthetic outbreak responses are served.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import sys
+import tempfile
+import time
+from benchmarks.dataframe_memory import outbreak_records
+from gideon_api.query import GIDEON, HTTPTransport, RateLimiter, RetryPolicy
+from gideon_api.query.cache import GideonAPICache
+from gideon_api.query.replay import FixtureStore
+from gideon_api.query.standin import StandInServer
+
+_YEARS = range(2000, 2020)
+
+
+def _synthetic_fixtures(directory: str) -> None:
+    fixtures = FixtureStore(directory)
+    for year in _YEARS:
+        body = json.dumps({'data': outbreak_records(2000, seed=year)})
+        fixtures.save('/diseases/outbreaks', {'year': year}, 200,
+                      {'ETag': f'"{year}"'}, body)
+
+
+def _run(server: StandInServer, workers: int, label: str) -> None:
+    with HTTPTransport(pool_maxsize=workers) as transport:
+        client = GIDEON('key',
+                        transport=transport,
+                        cache=GideonAPICache(24, persistent_cache=False),
+                        rate_limiter=RateLimiter(),
+                        retry_policy=RetryPolicy(backoff_base=0.01),
+                        api_origin=server.origin)
+
+        def fetch(year: int) -> None:
+            client.query_gideon_api('/diseases/outbreaks', {'year': year},
+                                    try_dataframe=False)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(workers) as executor:
+            # Every year twice, the second time from the cache
+            list(executor.map(fetch, list(_YEARS) * 2))
+        elapsed = time.perf_counter() - start
+    print(f'{label:28} {2 * len(_YEARS) / elapsed:7.1f} queries/s, '
+          f'retries {client.retry_stats.retries:3}, '
+          f'cache hits {client._cache.stats.hits:3}, '
+          f'connections {transport.stats.new_connections:2}')
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        if len(sys.argv) > 1:
+            directory = sys.argv[1]
+        else:
+            _synthetic_fixtures(directory)
+        for workers in (1, 8):
+            with StandInServer(directory, latency=0.05) as server:
+                _run(server, workers, f'{workers} workers')
+            with StandInServer(directory, latency=0.05, error_rate=0.2,
+                               seed=1) as server:
+                _run(server, workers, f'{workers} workers, 20% errors')
+
+
+if __name__ == '__main__':
+    main()
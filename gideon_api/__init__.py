@@ -4,18 +4,21 @@ This module automatically handles the necessary authentication with the GIDEON
 API. Disease and outbreak information can be called without additional setup.
 """
 import os
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
 
 JSON = Dict[str, Any]
 PARAMS = Dict[str, Union[str, int]]
 
 from gideon_api.query import GIDEON
 
-gideon_api = GIDEON(os.environ.get('GIDEON_API_KEY'), 0.5)
+gideon_api = GIDEON(os.environ.get('GIDEON_API_KEY'),
+                    0.5,
+                    api_origin=os.environ.get('GIDEON_API_ORIGIN'))
 
 from gideon_api.codes import *
 from gideon_api.diseases import *
 from gideon_api.utilities import *
+from gideon_api.mirror import *
 
 
 def set_api_key(api_key: str) -> None:
@@ -69,3 +72,38 @@ def query(api_path: str,
     """
     return gideon_api.query_gideon_api(api_path, params, try_dataframe,
                                        force_online, cache_expiration_hours)
+
+
+def query_many(queries: Iterable[Union[str, Tuple[str, Optional[PARAMS]]]],
+               try_dataframe: bool = True,
+               force_online: bool = False,
+               cache_expiration_hours: Optional[int] = 24,
+               max_workers: int = 8,
+               as_completed: bool = False,
+               return_exceptions: bool = False):
+    """Runs many queries at once, answering cached queries immediately and
+    fetching the others in parallel on a bounded pool of threads.
+
+    Args:
+        queries: The queries to run, each an API path or a tuple of an API
+            path and its URL parameters.
+        try_dataframe: If possible, converts output data to pandas dataframe.
+        force_online: Forces the queries to the server, regardless of cache
+            status.
+        cache_expiration_hours: Sets the time, in hours, after which a response
+            will expire from the cache.
+        max_workers: The maximum number of queries sent to the server at the
+            same time.
+        as_completed: If True, yields the position of each query and its
+            result as soon as it is available, instead of returning a list.
+        return_exceptions: If True, a failed query returns its error instead
+            of raising it.
+
+    Returns:
+        list or iterator: The results in the order of the queries, or pairs of
+        the position and result of each query as they complete. Refer to
+        :py:meth:`gideon_api.query.GIDEON.query_many`.
+    """
+    return gideon_api.query_many(queries, try_dataframe, force_online,
+                                 cache_expiration_hours, max_workers,
+                                 as_completed, return_exceptions)
@@ -0,0 +1,18 @@
+"""Asyncio versions of the high level GIDEON API functions
+
+The functions in this module are coroutines sharing the authorization and
+cache of :py:data:`gideon_api.gideon_api`, so many queries can be awaited
+concurrently, e.g. with ``asyncio.gather``.
+"""
+from gideon_api import gideon_api
+from gideon_api.query.async_wrapper import AsyncGIDEON
+
+async_gideon_api = AsyncGIDEON(client=gideon_api)
+
+from gideon_api.aio.codes import lookup_item, lookup_items
+from gideon_api.aio.diseases import (
+    filter_diseases, outbreaks_by_year, outbreaks_by_country_year,
+    outbreaks_by_disease, endemic_countries_by_disease,
+    endemic_diseases_by_country, latest_outbreaks_by_country,
+    outbreaks_by_countries_year, endemic_diseases_by_countries,
+    latest_outbreaks_by_countries)
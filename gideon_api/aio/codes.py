@@ -0,0 +1,40 @@
+"""Asynchronously look up the GIDEON API code for a particular item"""
+from typing import Dict, Iterable, List, Union
+from gideon_api.aio import async_gideon_api
+from gideon_api.codes.categories import get_endpoint
+from gideon_api.codes.index import (ENDPOINT_ID_NAME, CatalogIndex,
+                                    LookupResult, current_index, index_catalog)
+
+
+async def catalog_index(category: str,
+                        index_class: type = CatalogIndex) -> CatalogIndex:
+    """Async version of :py:func:`gideon_api.codes.index.catalog_index`"""
+    api_endpoint = get_endpoint(category)
+    index = current_index(api_endpoint, index_class)
+    if index is None:
+        catalog = await async_gideon_api.query_gideon_api(api_endpoint,
+                                                          try_dataframe=False)
+        index = index_catalog(
+            api_endpoint, catalog,
+            async_gideon_api.client.cached_version(api_endpoint), index_class)
+    return index
+
+
+async def lookup_item(category: str, item: str) -> LookupResult:
+    """Async version of :py:func:`gideon_api.lookup_item`"""
+    return (await catalog_index(category)).lookup(item)
+
+
+async def lookup_items(category: str,
+                       items: Iterable[str]) -> Dict[str, LookupResult]:
+    """Async version of :py:func:`gideon_api.lookup_items`"""
+    index = await catalog_index(category)
+    return {item: index.lookup(item) for item in items}
+
+
+async def all_codes(api_endpoint: str) -> List[Union[int, str]]:
+    """Lists the code of every item of a category endpoint"""
+    all_category_items = await async_gideon_api.query_gideon_api(
+        api_endpoint, try_dataframe=False)
+    id_key, _ = ENDPOINT_ID_NAME[api_endpoint]
+    return [catalog_item[id_key] for catalog_item in all_category_items['data']]
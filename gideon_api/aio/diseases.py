@@ -0,0 +1,115 @@
+"""Asyncio versions of the disease and outbreak functions, along with helpers
+    that fan a query out over many countries at once
+"""
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+import asyncio
+from gideon_api.aio import async_gideon_api
+from gideon_api.aio.codes import all_codes
+from gideon_api.diseases.filter import _filter_params
+from gideon_api.diseases.outbreaks import split_by_country
+
+
+async def filter_diseases(agent: Optional[int] = None,
+                          vector: Optional[str] = None,
+                          vehicle: Optional[str] = None,
+                          reservoir: Optional[str] = None,
+                          country: Optional[str] = None):
+    """Async version of :py:func:`gideon_api.filter_diseases`"""
+    return await async_gideon_api.query_gideon_api(
+        '/diseases/filter',
+        _filter_params(agent, vector, vehicle, reservoir, country))
+
+
+async def outbreaks_by_year(year: int):
+    """Async version of :py:func:`gideon_api.outbreaks_by_year`"""
+    return await async_gideon_api.query_gideon_api('/diseases/outbreaks',
+                                                   {'year': year})
+
+
+async def outbreaks_by_country_year(country_code: str, year: int):
+    """Async version of :py:func:`gideon_api.outbreaks_by_country_year`"""
+    return await async_gideon_api.query_gideon_api(
+        f'/diseases/outbreaks/distribution/{country_code}', {'year': year})
+
+
+async def latest_outbreaks_by_country(country_code: str):
+    """Async version of :py:func:`gideon_api.latest_outbreaks_by_country`"""
+    return await async_gideon_api.query_gideon_api(
+        f'/diseases/countries/{country_code}/latest-outbreaks')
+
+
+async def outbreaks_by_disease(disease_code: int):
+    """Async version of :py:func:`gideon_api.outbreaks_by_disease`"""
+    return await async_gideon_api.query_gideon_api(
+        f'/diseases/{disease_code}/outbreaks')
+
+
+async def endemic_countries_by_disease(disease_code: int):
+    """Async version of :py:func:`gideon_api.endemic_countries_by_disease`"""
+    return await async_gideon_api.query_gideon_api(
+        f'/diseases/{disease_code}/countries')
+
+
+async def endemic_diseases_by_country(country_code: int):
+    """Async version of :py:func:`gideon_api.endemic_diseases_by_country`"""
+    return await async_gideon_api.query_gideon_api(
+        f'/diseases/countries/{country_code}')
+
+
+async def _for_each_country(query: Callable[[str], Awaitable],
+                            country_codes: Optional[Iterable[str]]) -> Dict:
+    """Runs a query for every country concurrently"""
+    if country_codes is None:
+        country_codes = await all_codes('/countries')
+    country_codes = list(country_codes)
+    results = await asyncio.gather(*(query(code) for code in country_codes))
+    return dict(zip(country_codes, results))
+
+
+async def outbreaks_by_countries_year(
+        year: int, country_codes: Optional[Iterable[str]] = None) -> Dict:
+    """Async version of :py:func:`gideon_api.outbreaks_by_countries_year`.
+
+    The outbreaks of every country in the year are fetched with one call and
+    split by country.
+
+    Args:
+        year: 4 digit year.
+        country_codes: GIDEON country codes. Every country with an outbreak
+            in the year is returned if this is not specified.
+
+    Returns:
+        dict: Maps each country code to the rows of
+        :py:func:`gideon_api.outbreaks_by_year` for that country.
+    """
+    return split_by_country(year, await outbreaks_by_year(year), country_codes)
+
+
+async def endemic_diseases_by_countries(
+        country_codes: Optional[Iterable[str]] = None) -> Dict:
+    """Diseases endemic to many countries, queried concurrently.
+
+    Args:
+        country_codes: GIDEON country codes to query. Every country is
+            queried if this is not specified.
+
+    Returns:
+        dict: Maps each country code to the DataFrame returned by
+        :py:func:`gideon_api.endemic_diseases_by_country`.
+    """
+    return await _for_each_country(endemic_diseases_by_country, country_codes)
+
+
+async def latest_outbreaks_by_countries(
+        country_codes: Optional[Iterable[str]] = None) -> Dict:
+    """Latest disease outbreaks of many countries, queried concurrently.
+
+    Args:
+        country_codes: GIDEON country codes to query. Every country is
+            queried if this is not specified.
+
+    Returns:
+        dict: Maps each country code to the DataFrame returned by
+        :py:func:`gideon_api.latest_outbreaks_by_country`.
+    """
+    return await _for_each_country(latest_outbreaks_by_country, country_codes)
@@ -1,2 +1,4 @@
 from gideon_api.codes.categories import get_endpoint
-from gideon_api.codes.lookup import lookup_item
+from gideon_api.codes.lookup import lookup_item, lookup_items
+from gideon_api.codes.search import complete_item, match_items, search_items
+from gideon_api.codes.warmup import warm_cache
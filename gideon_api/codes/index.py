@@ -0,0 +1,140 @@
+"""Indexes the items of a category by name, so codes can be looked up
+    without scanning the category
+"""
+from typing import List, Optional, Tuple, Union
+from gideon_api import JSON, gideon_api
+from gideon_api.codes.categories import get_endpoint
+from gideon_api.query.cache_backends import content_hash
+
+ENDPOINT_ID_NAME = {
+    '/diseases': ('disease_code', 'disease'),
+    '/diseases/fingerprint/agents': ('agent_code', 'agent'),
+    '/diseases/fingerprint/vectors': ('vector_code', 'vector'),
+    '/diseases/fingerprint/vehicles': ('vehicle_code', 'vehicle'),
+    '/diseases/fingerprint/reservoirs': ('reservoir_code', 'reservoir'),
+    '/diseases/fingerprint/countries': ('country_code', 'country'),
+    '/drugs': ('drug_code', 'drug'),
+    '/vaccines': ('vaccine_code', 'vaccine'),
+    '/microbiology/bacteria': ('bacteria_code', 'bacteria'),
+    '/microbiology/mycobacteria': ('mycobacteria_code', 'mycobacteria'),
+    '/microbiology/yeasts': ('yeast_code', 'yeast'),
+    '/countries': ('country_code', 'country'),
+    '/travel/regions': ('region_code', 'region'),
+}
+
+Code = Union[int, str]
+LookupResult = Optional[Union[Code, List[Tuple[Code, str]]]]
+
+
+def normalize_name(name: str) -> str:
+    """Converts an item name to the form compared when looking it up"""
+    return name.strip().lower()
+
+
+class CatalogIndex:
+    """Maps the normalized names of the items in a category response to
+        their codes.
+
+    Attributes:
+        api_endpoint: The endpoint the category was queried from.
+        version: The content hash of the response the index was built from.
+    """
+
+    def __init__(self, api_endpoint: str, catalog: JSON, version: str) -> None:
+        """Builds the index.
+
+        Args:
+            api_endpoint: One of the endpoints in ``ENDPOINT_ID_NAME``.
+            catalog: The response of the endpoint, with the items listed
+                under the 'data' key.
+            version: The content hash of the response.
+        """
+        # All items should be under the 'data' key
+        assert 'data' in catalog
+        self.api_endpoint = api_endpoint
+        self.version = version
+        self._matches = {}
+        id_key, name_key = ENDPOINT_ID_NAME[api_endpoint]
+        for catalog_item in catalog['data']:
+            id_ = catalog_item[id_key]
+            name = catalog_item[name_key]
+            self._matches.setdefault(normalize_name(name), []).append(
+                (id_, name))
+
+    def __len__(self) -> int:
+        return len(self._matches)
+
+    def lookup(self, item: str) -> LookupResult:
+        """Finds the code of the item with a matching name.
+
+        Returns:
+            The code if exactly one item matches, a list of the code and
+                name of every match if several items match, or None.
+        """
+        possible_matches = self._matches.get(normalize_name(item))
+        if not possible_matches:
+            return None
+        if len(possible_matches) == 1:
+            return possible_matches[0][0]
+        return list(possible_matches)
+
+
+# The latest index of each kind for each endpoint
+_INDEXES = {}
+
+
+def index_catalog(api_endpoint: str,
+                  catalog: JSON,
+                  version: Optional[str] = None,
+                  index_class: type = CatalogIndex) -> CatalogIndex:
+    """Returns the index of a category response, only building it if the
+        response differs from the one last indexed.
+
+    Args:
+        api_endpoint: One of the endpoints in ``ENDPOINT_ID_NAME``.
+        catalog: The response of the endpoint.
+        version: The content hash of the response, if already known.
+        index_class: The kind of index to build, taking the same arguments
+            as :py:class:`CatalogIndex`.
+    """
+    if version is None:
+        version = content_hash(catalog)
+    index = _INDEXES.get((index_class, api_endpoint))
+    if index is None or index.version != version:
+        index = index_class(api_endpoint, catalog, version)
+        _INDEXES[index_class, api_endpoint] = index
+    return index
+
+
+def current_index(api_endpoint: str,
+                  index_class: type = CatalogIndex) -> Optional[CatalogIndex]:
+    """Returns the index of an endpoint if it matches the cached response,
+        without loading the response.
+    """
+    index = _INDEXES.get((index_class, api_endpoint))
+    if index is not None and gideon_api.cached_version(
+            api_endpoint) == index.version:
+        return index
+    return None
+
+
+def catalog_index(category: str,
+                  index_class: type = CatalogIndex) -> CatalogIndex:
+    """Returns the index of a category, rebuilding it when the cached
+        category response changes.
+
+    Args:
+        category: The GIDEON API to index such as diseases, vaccines,
+            countries, etc. Refer to the :py:func:`gideon_api.get_endpoint`
+            function documentation for a complete list.
+        index_class: The kind of index to return, taking the same arguments
+            as :py:class:`CatalogIndex`.
+    """
+    api_endpoint = get_endpoint(category)
+    index = current_index(api_endpoint, index_class)
+    if index is None:
+        catalog = gideon_api.query_gideon_api(api_endpoint, try_dataframe=False)
+        index = index_catalog(api_endpoint, catalog,
+                              gideon_api.cached_version(api_endpoint),
+                              index_class)
+    return index
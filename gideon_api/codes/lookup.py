@@ -1,27 +1,13 @@
 """Look up the GIDEON API code for a particular item"""
 
-from typing import Optional, Union
-from gideon_api import gideon_api
-from gideon_api.codes.categories import get_endpoint
-
-ENDPOINT_ID_NAME = {
-    '/diseases': ('disease_code', 'disease'),
-    '/diseases/fingerprint/agents': ('agent_code', 'agent'),
-    '/diseases/fingerprint/vectors': ('vector_code', 'vector'),
-    '/diseases/fingerprint/vehicles': ('vehicle_code', 'vehicle'),
-    '/diseases/fingerprint/reservoirs': ('reservoir_code', 'reservoir'),
-    '/diseases/fingerprint/countries': ('country_code', 'country'),
-    '/drugs': ('drug_code', 'drug'),
-    '/vaccines': ('vaccine_code', 'vaccine'),
-    '/microbiology/bacteria': ('bacteria_code', 'bacteria'),
-    '/microbiology/mycobacteria': ('mycobacteria_code', 'mycobacteria'),
-    '/microbiology/yeasts': ('yeast_code', 'yeast'),
-    '/countries': ('country_code', 'country'),
-    '/travel/regions': ('region_code', 'region'),
-}
-
-
-def lookup_item(category: str, item: str) -> Optional[Union[int, str]]:
+from typing import Dict, Iterable
+from gideon_api.codes.index import (ENDPOINT_ID_NAME, LookupResult,
+                                    catalog_index)
+
+__all__ = ['ENDPOINT_ID_NAME', 'lookup_item', 'lookup_items']
+
+
+def lookup_item(category: str, item: str) -> LookupResult:
     """Looks up the GIDEON ID for a particular item.
 
     Args:
@@ -34,29 +20,23 @@ def lookup_item(category: str, item: str) -> Optional[Union[int, str]]:
     Returns:
         If the item is found, the GIDEON API code
     """
-    api_endpoint = get_endpoint(category)
-    all_category_items = gideon_api.query_gideon_api(api_endpoint,
-                                                     try_dataframe=False)
+    return catalog_index(category).lookup(item)
 
-    # All items should be under the 'data' key
-    assert 'data' in all_category_items
 
-    # Check for item, expects exact match for now
-    search_name = item.strip().lower()
-    possible_matches = []
+def lookup_items(category: str,
+                 items: Iterable[str]) -> Dict[str, LookupResult]:
+    """Looks up the GIDEON IDs of many items of the same category at once.
 
-    id_key, name_key = ENDPOINT_ID_NAME[api_endpoint]
-    for catalog_item in all_category_items['data']:
-        id_ = catalog_item[id_key]
-        name = catalog_item[name_key]
-
-        if name.strip().lower() == search_name:
-            possible_matches.append((id_, name))
-
-    # Ensure only one option matched
-    if len(possible_matches) == 1:
-        return possible_matches[0][0]
+    Args:
+        category: The GIDEON API to search from such as diseases, vaccines,
+            countries, etc. Refer to the :py:func:`gideon_api.get_endpoint`
+            function documentation for a complete list.
+        items: The names of the items.
 
-    # Show multiple matches otherwise
-    if len(possible_matches) > 1:
-        return possible_matches
+    Returns:
+        A dictionary mapping each name to its GIDEON API code, or None if
+            the item is not found. A pandas Series of names can be converted
+            with ``names.map(lookup_items(category, names))``.
+    """
+    index = catalog_index(category)
+    return {item: index.lookup(item) for item in items}
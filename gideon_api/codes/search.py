@@ -0,0 +1,218 @@
+"""Searches the items of a category by approximate name or name prefix"""
+from collections import Counter
+from typing import TYPE_CHECKING, Iterable, List, NamedTuple, Union
+import bisect
+import heapq
+import re
+import sys
+from gideon_api import JSON
+from gideon_api.codes.index import ENDPOINT_ID_NAME, Code, catalog_index
+
+if TYPE_CHECKING:
+    from pandas import DataFrame, Series
+
+_NON_ALPHANUMERIC = re.compile(r'[^0-9a-z]+')
+# Sorts after every character of a search key
+_LAST_CHARACTER = chr(sys.maxunicode)
+
+
+def search_key(name: str) -> str:
+    """Converts a name to the form compared when searching, ignoring case,
+        punctuation and spacing.
+    """
+    return _NON_ALPHANUMERIC.sub(' ', name.lower()).strip()
+
+
+def trigrams(key: str) -> frozenset:
+    """Splits a search key into its overlapping three letter sequences.
+
+    The key is padded so that the start and end of the name, and names
+    shorter than three letters, still produce trigrams.
+    """
+    padded = f'  {key} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class SearchMatch(NamedTuple):
+    """An item matching a search.
+
+    Attributes:
+        code: The GIDEON API code of the item.
+        name: The name of the item.
+        score: The similarity of the name to the search, from 0 to 1, where
+            1 is an exact match ignoring case and punctuation.
+    """
+    code: Code
+    name: str
+    score: float
+
+
+class CatalogSearch:
+    """An inverted trigram index of the item names in a category response.
+
+    A search only scores the items sharing at least one trigram with the
+    query, ranking them by the Dice coefficient of the two trigram sets.
+
+    Attributes:
+        api_endpoint: The endpoint the category was queried from.
+        version: The content hash of the response the index was built from.
+    """
+
+    def __init__(self, api_endpoint: str, catalog: JSON, version: str) -> None:
+        """Builds the index.
+
+        Args:
+            api_endpoint: One of the endpoints in ``ENDPOINT_ID_NAME``.
+            catalog: The response of the endpoint, with the items listed
+                under the 'data' key.
+            version: The content hash of the response.
+        """
+        assert 'data' in catalog
+        self.api_endpoint = api_endpoint
+        self.version = version
+        id_key, name_key = ENDPOINT_ID_NAME[api_endpoint]
+        self._items = [(catalog_item[id_key], catalog_item[name_key])
+                       for catalog_item in catalog['data']]
+        self._gram_counts = []
+        self._postings = {}
+        # Every word-aligned suffix of every name, sorted for prefix search
+        self._prefixes = []
+        for position, (_, name) in enumerate(self._items):
+            key = search_key(name)
+            grams = trigrams(key)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(position)
+            words = key.split(' ')
+            for start in range(len(words)):
+                self._prefixes.append((' '.join(words[start:]), position))
+        self._prefixes.sort()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def search(self,
+               query: str,
+               limit: int = 5,
+               min_score: float = 0.0) -> List[SearchMatch]:
+        """Finds the items with names most similar to the query.
+
+        Args:
+            query: The approximate name of the item.
+            limit: The maximum number of matches returned.
+            min_score: The lowest score of the matches returned.
+
+        Returns:
+            The best matches, from the highest to the lowest score.
+        """
+        grams = trigrams(search_key(query))
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+
+        def score(position: int) -> float:
+            return (2 * shared[position] /
+                    (len(grams) + self._gram_counts[position]))
+
+        best = heapq.nlargest(limit, shared, key=score)
+        matches = []
+        for position in best:
+            match_score = score(position)
+            if match_score < min_score:
+                break
+            code, name = self._items[position]
+            matches.append(SearchMatch(code, name, match_score))
+        return matches
+
+    def complete(self, prefix: str, limit: int = 10) -> List[SearchMatch]:
+        """Finds the items with a word starting with the prefix.
+
+        Items whose name starts with the prefix are listed first, then the
+        shortest names. Every match has a score of 1.
+        """
+        key = search_key(prefix)
+        # The suffixes starting with the key sort between the key and the key
+        # followed by the last character, so only they are visited
+        start = bisect.bisect_left(self._prefixes, (key,))
+        end = bisect.bisect_left(self._prefixes, (key + _LAST_CHARACTER,),
+                                 start)
+        positions = {self._prefixes[i][1] for i in range(start, end)}
+
+        def rank(position: int) -> tuple:
+            name = self._items[position][1]
+            return (not search_key(name).startswith(key), len(name), name)
+
+        return [
+            SearchMatch(*self._items[position], 1.0)
+            for position in heapq.nsmallest(limit, positions, key=rank)
+        ]
+
+
+def search_items(category: str,
+                 query: str,
+                 limit: int = 5,
+                 min_score: float = 0.0) -> List[SearchMatch]:
+    """Searches a category for the items with names similar to the query.
+
+    Args:
+        category: The GIDEON API to search from such as diseases, vaccines,
+            countries, etc. Refer to the :py:func:`gideon_api.get_endpoint`
+            function documentation for a complete list.
+        query: The approximate name of the item, such as
+            "St Louis encephalitis".
+        limit: The maximum number of matches returned.
+        min_score: The lowest score, from 0 to 1, of the matches returned.
+
+    Returns:
+        The code, name and score of the best matches, from the highest to
+            the lowest score.
+    """
+    return catalog_index(category,
+                         CatalogSearch).search(query, limit, min_score)
+
+
+def complete_item(category: str,
+                  prefix: str,
+                  limit: int = 10) -> List[SearchMatch]:
+    """Lists the items of a category with a word starting with the prefix,
+        e.g. to suggest names while they are typed.
+
+    Args:
+        category: The GIDEON API to search from. Refer to the
+            :py:func:`gideon_api.get_endpoint` function documentation for a
+            complete list.
+        prefix: The start of a word in the name.
+        limit: The maximum number of items returned.
+    """
+    return catalog_index(category, CatalogSearch).complete(prefix, limit)
+
+
+def match_items(category: str,
+                names: Union[Iterable[str], 'Series'],
+                min_score: float = 0.5) -> 'DataFrame':
+    """Finds the best matching item for every name in a column.
+
+    Each distinct name is only searched once.
+
+    Args:
+        category: The GIDEON API to search from. Refer to the
+            :py:func:`gideon_api.get_endpoint` function documentation for a
+            complete list.
+        names: The names to match, such as a column of a DataFrame.
+        min_score: The lowest score accepted as a match.
+
+    Returns:
+        A DataFrame with the 'code', 'name' and 'score' of the best match of
+            each name, with missing values where nothing matched. It has the
+            same index as the names if they are a Series.
+    """
+    from pandas import DataFrame, Series
+    if not isinstance(names, Series):
+        names = Series(list(names), dtype=object)
+    index = catalog_index(category, CatalogSearch)
+    best = {}
+    for name in names.dropna().unique():
+        matches = index.search(str(name), 1, min_score)
+        best[name] = matches[0] if matches else (None, None, None)
+    rows = [best.get(name, (None, None, None)) for name in names]
+    return DataFrame(rows, index=names.index, columns=list(SearchMatch._fields))
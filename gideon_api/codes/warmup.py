@@ -0,0 +1,110 @@
+"""Prefetches the reference catalogs used to look up codes
+
+Run ``gideon-api-warmup`` when building an image, with
+``GIDEON_API_CACHE_DIR`` set to a directory shipped in the image, so that
+the first lookups of every worker are answered from the cache.
+"""
+from time import perf_counter
+from typing import Dict, Iterable, List, Optional
+import argparse
+import os.path
+import sys
+from gideon_api import gideon_api
+from gideon_api.codes.categories import get_endpoint
+from gideon_api.codes.index import ENDPOINT_ID_NAME, CatalogIndex, index_catalog
+from gideon_api.codes.search import CatalogSearch
+
+# The indexes built for every catalog, used by the lookup and search functions
+INDEX_CLASSES = (CatalogIndex, CatalogSearch)
+
+
+def _warm_endpoint(api_endpoint: str) -> int:
+    """Fetches a catalog, unless it is cached, and builds its indexes"""
+    catalog = gideon_api.query_gideon_api(api_endpoint, try_dataframe=False)
+    version = gideon_api.cached_version(api_endpoint)
+    for index_class in INDEX_CLASSES:
+        index_catalog(api_endpoint, catalog, version, index_class)
+    return len(catalog['data'])
+
+
+def warm_cache(categories: Optional[Iterable[str]] = None,
+               max_workers: int = 8,
+               snapshot: Optional[str] = None) -> Dict[str, int]:
+    """Fetches the reference catalogs concurrently and builds their lookup
+        and search indexes, so later lookups need no calls to the server.
+
+    Catalogs which are already cached are not downloaded again.
+
+    Args:
+        categories: The categories to fetch, such as diseases or vaccines,
+            by default every category which can be looked up. Refer to the
+            :py:func:`gideon_api.get_endpoint` function documentation for a
+            complete list.
+        max_workers: The maximum number of catalogs fetched at the same
+            time, paced by the rate limit of the client.
+        snapshot: Optional path of an SQLite cache database to write the
+            catalogs to, e.g. to ship a ready cache in a container image.
+
+    Returns:
+        The number of items of each endpoint fetched.
+
+    Raises:
+        ConnectionError: If a catalog could not be downloaded. The other
+            catalogs are still cached.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    if categories is None:
+        endpoints = list(ENDPOINT_ID_NAME)
+    else:
+        endpoints = [get_endpoint(category) for category in categories]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        counts = dict(zip(endpoints, executor.map(_warm_endpoint, endpoints)))
+
+    if snapshot is not None:
+        gideon_api.export_cache(snapshot, endpoints)
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Runs the ``gideon-api-warmup`` console command"""
+    parser = argparse.ArgumentParser(
+        prog='gideon-api-warmup',
+        description='Downloads the GIDEON reference catalogs into the cache '
+        'and optionally writes them to a cache snapshot.')
+    parser.add_argument('categories',
+                        nargs='*',
+                        help='categories to fetch, by default all of them')
+    parser.add_argument('--snapshot',
+                        metavar='PATH',
+                        help='SQLite cache database to write the catalogs to, '
+                        'e.g. $GIDEON_API_CACHE_DIR/cache.sqlite3')
+    parser.add_argument('--workers',
+                        type=int,
+                        default=8,
+                        help='catalogs fetched at the same time')
+    parser.add_argument('--api-key',
+                        help='GIDEON API key, by default $GIDEON_API_KEY')
+    args = parser.parse_args(argv)
+
+    if args.api_key:
+        gideon_api.set_api_key(args.api_key)
+    start = perf_counter()
+    try:
+        counts = warm_cache(args.categories or None, args.workers,
+                            args.snapshot)
+    except (ConnectionError, ValueError) as e:
+        print(f'gideon-api-warmup: {e}', file=sys.stderr)
+        return 1
+    finally:
+        gideon_api.close()
+    for api_endpoint, count in counts.items():
+        print(f'{api_endpoint:36} {count:6} items')
+    print(f'{len(counts)} catalogs ready in {perf_counter() - start:.1f} s')
+    if args.snapshot:
+        print(f'Snapshot written to {os.path.abspath(args.snapshot)}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,8 @@
 from gideon_api.diseases.filter import filter_diseases
-from gideon_api.diseases.outbreaks import (outbreaks_by_year,
-                                           outbreaks_by_country_year,
-                                           outbreaks_by_disease,
-                                           endemic_countries_by_disease,
-                                           endemic_diseases_by_country,
-                                           latest_outbreaks_by_country)
+from gideon_api.diseases.filter_index import (DiseaseFilterIndex,
+                                              local_filter_index)
+from gideon_api.diseases.outbreaks import (
+    outbreaks_by_year, outbreaks_by_country_year, outbreaks_by_countries_year,
+    outbreaks_by_disease, endemic_countries_by_disease,
+    endemic_diseases_by_country, latest_outbreaks_by_country)
+from gideon_api.diseases.history import outbreaks_range
@@ -1,12 +1,13 @@
 from typing import Optional
-from gideon_api import gideon_api
+from gideon_api import PARAMS, gideon_api
 
 
 def filter_diseases(agent: Optional[int] = None,
                     vector: Optional[str] = None,
                     vehicle: Optional[str] = None,
                     reservoir: Optional[str] = None,
-                    country: Optional[str] = None):
+                    country: Optional[str] = None,
+                    local: bool = False):
     """Filters diseases matching the specified parameters.
 
     `API reference for /diseases/filter
@@ -30,6 +31,11 @@ def filter_diseases(agent: Optional[int] = None,
             corresponds to accepted geographical and political designations.
             When Country filter is used, it will only retrieve diseases that are
             endemic to the country.
+        local: If true, the filters are answered locally by intersecting
+            the diseases of each filter value, fetched once per value, so
+            new combinations of known values need no calls to the server.
+            The diseases are then returned as their /diseases catalog
+            records. See :py:class:`gideon_api.DiseaseFilterIndex`.
 
     Returns:
         DataFrame: Returns list of all diseases matching filters. This is a
@@ -37,7 +43,23 @@ def filter_diseases(agent: Optional[int] = None,
         profiles and to generate reports on the status of diseases in any
         country.
     """
+    if local:
+        from gideon_api.diseases.filter_index import local_filter_index
+        return local_filter_index().filter(agent=agent,
+                                           vector=vector,
+                                           vehicle=vehicle,
+                                           reservoir=reservoir,
+                                           country=country)
 
+    return gideon_api.query_gideon_api(
+        '/diseases/filter',
+        _filter_params(agent, vector, vehicle, reservoir, country))
+
+
+def _filter_params(agent: Optional[int], vector: Optional[str],
+                   vehicle: Optional[str], reservoir: Optional[str],
+                   country: Optional[str]) -> Optional[PARAMS]:
+    """Builds the URL parameters for the /diseases/filter endpoint"""
     params = {}
 
     if agent is not None:
@@ -55,4 +77,4 @@ def filter_diseases(agent: Optional[int] = None,
     if not params:
         params = None
 
-    return gideon_api.query_gideon_api('/diseases/filter', params)
+    return params
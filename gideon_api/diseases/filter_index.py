@@ -0,0 +1,228 @@
+"""Answers disease filters locally by intersecting the diseases of each
+    filter value, instead of calling the server for every combination
+"""
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+import threading
+from gideon_api import JSON, PARAMS, gideon_api
+from gideon_api.codes.index import ENDPOINT_ID_NAME
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+_DISEASES_PATH = '/diseases'
+_FILTER_PATH = '/diseases/filter'
+_CODE_KEY = 'disease_code'
+
+# The filter parameters, each answered from the disease set of its value
+DIMENSIONS = ('agent', 'vector', 'vehicle', 'reservoir', 'country')
+
+# The catalog listing the values of each dimension
+_FINGERPRINT_PATHS = {
+    'agent': '/diseases/fingerprint/agents',
+    'vector': '/diseases/fingerprint/vectors',
+    'vehicle': '/diseases/fingerprint/vehicles',
+    'reservoir': '/diseases/fingerprint/reservoirs',
+    'country': '/diseases/fingerprint/countries',
+}
+
+
+def dimension_query(dimension: str, code) -> Tuple[str, Optional[PARAMS]]:
+    """The query listing the diseases of one filter value.
+
+    Countries are answered by the diseases endemic to the country, the other
+    dimensions by the filter endpoint with that parameter alone.
+    """
+    if dimension == 'country':
+        return f'/diseases/countries/{code}', None
+    if dimension not in DIMENSIONS:
+        raise ValueError(f'Dimension not one of {DIMENSIONS}')
+    return _FILTER_PATH, {dimension: code}
+
+
+class DiseaseFilterIndex:
+    """Evaluates any combination of disease filters from the diseases of
+        each filter value.
+
+    The diseases of every filter value are fetched once, through the cache
+    of the client, and kept as a bitset over the diseases of the /diseases
+    catalog. A combination of filters is the intersection of their bitsets,
+    so exploring combinations only calls the server for values not seen
+    before. A bitset is fetched again when the cached response it was built
+    from changes or expires, and every bitset is rebuilt when the catalog
+    does.
+
+    The matching diseases are returned as their records in the /diseases
+    catalog, which may have other fields than the records returned by the
+    /diseases/filter endpoint.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._catalog_version = None
+        # Counts the catalogs numbered, so that bitsets numbered with an
+        # earlier catalog are not combined with the current one
+        self._generation = 0
+        # The bit of each disease code and the record of each bit
+        self._positions = {}
+        self._records = []
+        # The bitset of each filter value, with the catalog generation it
+        # was numbered with and the content hash of the response it was
+        # built from
+        self._bitsets = {}
+
+    def _check_catalog(self) -> None:
+        """Numbers the diseases of the catalog, if it changed"""
+        version = gideon_api.cached_version(_DISEASES_PATH)
+        if version is not None and version == self._catalog_version:
+            return
+        catalog = gideon_api.query_gideon_api(_DISEASES_PATH,
+                                              try_dataframe=False)
+        with self._lock:
+            self._catalog_version = gideon_api.cached_version(_DISEASES_PATH)
+            self._generation += 1
+            self._positions = {}
+            self._records = []
+            self._bitsets = {}
+            for record in catalog['data']:
+                self._position(record)
+
+    def _position(self, record: JSON) -> int:
+        """The bit of a disease, numbering diseases missing from the
+            catalog as they are found.
+        """
+        code = record[_CODE_KEY]
+        position = self._positions.get(code)
+        if position is None:
+            position = len(self._records)
+            self._positions[code] = position
+            self._records.append(record)
+        return position
+
+    def bitset(self, dimension: str, code) -> int:
+        """The diseases matching one filter value, as a bitset.
+
+        Args:
+            dimension: One of ``DIMENSIONS``.
+            code: The GIDEON code of the agent, vector, vehicle, reservoir
+                or country.
+        """
+        return self._bitset(dimension, code)[1]
+
+    def _bitset(self, dimension: str, code) -> Tuple[int, int]:
+        """The diseases matching one filter value, as a bitset, with the
+            catalog generation the bits are numbered with.
+        """
+        api_path, params = dimension_query(dimension, code)
+        version = gideon_api.cached_version(api_path, params)
+        with self._lock:
+            found = self._bitsets.get((dimension, code))
+            if (found is not None and version is not None and
+                    found[:2] == (self._generation, version)):
+                return self._generation, found[2]
+
+        response = gideon_api.query_gideon_api(api_path,
+                                               params,
+                                               try_dataframe=False)
+        version = gideon_api.cached_version(api_path, params)
+        bits = 0
+        with self._lock:
+            for record in response.get('data', []):
+                bits |= 1 << self._position(record)
+            self._bitsets[dimension, code] = (self._generation, version, bits)
+            return self._generation, bits
+
+    def codes(self, **filters) -> List[int]:
+        """The codes of the diseases matching every filter.
+
+        Args:
+            filters: The code of any of the dimensions, such as
+                ``agent=1234``. Filters set to None are ignored.
+
+        Returns:
+            The disease codes, in the order of the /diseases catalog.
+        """
+        return [record[_CODE_KEY] for record in self._matching(filters)]
+
+    def _matching(self, filters: Dict[str, object]) -> List[JSON]:
+        self._check_catalog()
+        while True:
+            with self._lock:
+                generation = self._generation
+            bits = None
+            generations = {generation}
+            for dimension, code in filters.items():
+                if code is None:
+                    continue
+                value_generation, value_bits = self._bitset(dimension, code)
+                generations.add(value_generation)
+                bits = value_bits if bits is None else bits & value_bits
+            with self._lock:
+                # Start over if the catalog was renumbered in the meantime
+                if generations == {self._generation}:
+                    records = list(self._records)
+                    break
+        if bits is None:
+            return list(records)
+        matching = []
+        while bits:
+            lowest = bits & -bits
+            matching.append(records[lowest.bit_length() - 1])
+            bits ^= lowest
+        return matching
+
+    def filter(self, **filters) -> 'DataFrame':
+        """The diseases matching every filter.
+
+        Args:
+            filters: The code of any of the dimensions, such as
+                ``agent=1234``. Filters set to None are ignored.
+
+        Returns:
+            DataFrame: The records of the diseases in the /diseases catalog,
+            in the order of the catalog and typed like the catalog. Diseases
+            missing from the catalog have the fields of the first response
+            listing them.
+        """
+        return gideon_api.to_dataframe({'data': self._matching(filters)},
+                                       _DISEASES_PATH)
+
+    def prefetch(self,
+                 dimensions: Iterable[str] = DIMENSIONS,
+                 max_workers: int = 8) -> int:
+        """Fetches the diseases of every value of some dimensions ahead of
+            the first filter, concurrently.
+
+        Args:
+            dimensions: The dimensions whose values are fetched, listed by
+                the /diseases/fingerprint endpoint of each dimension.
+            max_workers: The maximum number of values fetched at the same
+                time, paced by the rate limit of the client.
+
+        Returns:
+            The number of filter values fetched.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        self._check_catalog()
+        values = []
+        for dimension in dimensions:
+            if dimension not in DIMENSIONS:
+                raise ValueError(f'Dimension not one of {DIMENSIONS}')
+            api_endpoint = _FINGERPRINT_PATHS[dimension]
+            id_key = ENDPOINT_ID_NAME[api_endpoint][0]
+            catalog = gideon_api.query_gideon_api(api_endpoint,
+                                                  try_dataframe=False)
+            values.extend((dimension, item[id_key]) for item in catalog['data'])
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(lambda value: self.bitset(*value), values))
+        return len(values)
+
+
+# The index used by filter_diseases(local=True)
+_INDEX = DiseaseFilterIndex()
+
+
+def local_filter_index() -> DiseaseFilterIndex:
+    """The index answering ``filter_diseases(..., local=True)``, e.g. to
+        prefetch its filter values.
+    """
+    return _INDEX
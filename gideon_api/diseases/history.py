@@ -0,0 +1,188 @@
+"""Downloads the outbreaks of many years into a single dataset"""
+from datetime import date
+from typing import TYPE_CHECKING, Iterable, List, Optional
+import os.path
+from gideon_api import JSON, gideon_api
+from gideon_api.query.schema import (arrow_schema, columns_to_dataframe,
+                                     endpoint_schema, records_to_columns)
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+_OUTBREAKS_PATH = '/diseases/outbreaks'
+_YEAR_COLUMN = 'year'
+# The earliest year with outbreak data in GIDEON
+FIRST_YEAR = 1348
+
+
+class _ColumnStore:
+    """Collects the records of many years column by column, so the dataset
+        is built once at the end instead of concatenating a frame per year.
+
+    The records are held as Python lists until the DataFrame is built.
+    """
+
+    def __init__(self, columns: Iterable[str] = ()) -> None:
+        """
+        Args:
+            columns: Columns the DataFrame has even if no record has them.
+        """
+        self._years = {}
+        self._columns = list(columns)
+
+    def add(self, year: int, records: List[JSON]) -> None:
+        """Stores the records of a year, which may arrive in any order"""
+        columns = records_to_columns(records)
+        if _YEAR_COLUMN not in columns:
+            columns[_YEAR_COLUMN] = [year] * len(records)
+        for column in columns:
+            if column not in self._columns:
+                self._columns.append(column)
+        self._years[year] = (len(records), columns)
+
+    def to_dataframe(self) -> 'DataFrame':
+        """Joins the years in order, filling the columns a year lacks, and
+            types the columns using the schema of the outbreak endpoint.
+        """
+        data = {column: [] for column in self._columns}
+        for year in sorted(self._years):
+            length, columns = self._years[year]
+            for column, values in data.items():
+                values.extend(columns.get(column, [None] * length))
+        return columns_to_dataframe(data, endpoint_schema(_OUTBREAKS_PATH))
+
+
+def _partition_path(directory: str, year: int) -> str:
+    return os.path.join(directory, f'{_YEAR_COLUMN}={year}', 'data.parquet')
+
+
+def _write_partition(directory: str, year: int, records: List[JSON]) -> None:
+    """Writes the outbreaks of a year to their Parquet partition.
+
+    Every column of the outbreak schema is written, even if the year lacks
+    it, with the Arrow type of its schema, so every partition has the same
+    type for the same column.
+    """
+    import pyarrow
+    import pyarrow.parquet
+    schema = endpoint_schema(_OUTBREAKS_PATH)
+    store = _ColumnStore(schema)
+    store.add(year, records)
+    frame = store.to_dataframe().drop(columns=_YEAR_COLUMN)
+    table = pyarrow.Table.from_pandas(frame,
+                                      schema=arrow_schema(frame, schema),
+                                      preserve_index=False)
+    path = _partition_path(directory, year)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pyarrow.parquet.write_table(table, path)
+
+
+def _read_partitions(directory: str, years: Iterable[int]) -> 'DataFrame':
+    """Reads the Parquet partitions of some years into one DataFrame, in
+        order of year.
+
+    Columns only written for some years are missing from the others, and
+    are filled with nulls. The year is read back as an integer.
+    """
+    import pyarrow
+    import pyarrow.dataset
+    import pyarrow.parquet
+    paths = [_partition_path(directory, year) for year in years]
+    schema = pyarrow.unify_schemas(
+        [pyarrow.parquet.read_schema(path) for path in paths])
+    year_field = pyarrow.field(_YEAR_COLUMN, pyarrow.int64())
+    partitioning = pyarrow.dataset.partitioning(pyarrow.schema([year_field]),
+                                                flavor='hive')
+    dataset = pyarrow.dataset.dataset(
+        paths,
+        schema=schema.remove_metadata().append(year_field),
+        format='parquet',
+        partitioning=partitioning,
+        partition_base_dir=directory)
+    return dataset.to_table().to_pandas()
+
+
+def _fetch_year(year: int, cache_expiration_hours: Optional[int]) -> List[JSON]:
+    response = gideon_api.query_gideon_api(
+        _OUTBREAKS_PATH, {'year': year},
+        try_dataframe=False,
+        cache_expiration_hours=cache_expiration_hours)
+    return response.get('data', [])
+
+
+def outbreaks_range(start_year: int = FIRST_YEAR,
+                    end_year: Optional[int] = None,
+                    max_workers: int = 8,
+                    directory: Optional[str] = None,
+                    cache_expiration_hours: Optional[int] = 24) -> 'DataFrame':
+    """Disease Outbreaks of a Range of Years
+
+    The years are fetched concurrently, paced by the rate limit of the
+    client, and their records are collected column by column into a single
+    DataFrame sorted by year.
+
+    Every year fetched is cached, so after a failure calling the function
+    again only downloads the years which did not finish. If a directory is
+    given, each year is also written as a Parquet file partitioned by year
+    as soon as it finishes, and years already written are not downloaded
+    again. Without a directory the records of every year are kept in memory
+    until the DataFrame is built; with one, only the years being written
+    are. Writing Parquet requires the pyarrow package.
+
+    Args:
+        start_year: The first 4 digit year, by default the earliest year
+            in GIDEON.
+        end_year: The last 4 digit year, by default the current year.
+        max_workers: The maximum number of years fetched at the same time.
+        directory: Optional directory of a Parquet dataset to write the
+            years to, partitioned by year.
+        cache_expiration_hours: The number of hours since the present
+            moment which a cached year will be considered valid.
+
+    Returns:
+        DataFrame: Every outbreak of the years in the range, with the year
+        of each outbreak in the 'year' column.
+
+    Raises:
+        ConnectionError: If a year could not be downloaded. The other years
+            are still cached, or written to the directory.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    if end_year is None:
+        end_year = date.today().year
+    years = range(start_year, end_year + 1)
+    pending = list(years)
+    if directory is not None:
+        pending = [
+            year for year in years
+            if not os.path.isfile(_partition_path(directory, year))
+        ]
+
+    store = _ColumnStore()
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_fetch_year, year, cache_expiration_hours): year
+            for year in pending
+        }
+        for future in as_completed(futures):
+            year = futures[future]
+            try:
+                records = future.result()
+            except (ConnectionError, ValueError) as e:
+                errors[year] = e
+                continue
+            if directory is None:
+                store.add(year, records)
+            else:
+                _write_partition(directory, year, records)
+
+    if errors:
+        failed = sorted(errors)
+        raise ConnectionError(
+            f'Could not download the outbreaks of {len(failed)} years, '
+            f'starting with {failed[0]}') from errors[failed[0]]
+
+    if directory is None:
+        return store.to_dataframe()
+    return _read_partitions(directory, years)
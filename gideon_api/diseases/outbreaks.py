@@ -1,4 +1,90 @@
+"""Queries disease outbreak data, splitting the outbreaks of every country
+    in a year by country when many countries are needed
+"""
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+import threading
 from gideon_api import gideon_api
+from gideon_api.query.api_wrapper import _cache_uri
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+_OUTBREAKS_PATH = '/diseases/outbreaks'
+# The column identifying the country of each outbreak in bulk responses
+_COUNTRY_COLUMN = 'country_code'
+
+# The number of years whose outbreaks are kept indexed by country
+MAX_INDEXED_YEARS = 4
+
+# Bulk responses indexed by country, keyed by their cache URI and stored
+# with the content hash of the response they were built from, from the
+# least to the most recently used
+_INDEXED = OrderedDict()
+_INDEXED_LOCK = threading.Lock()
+
+
+def _index_by_country(year: int, outbreaks: 'DataFrame') -> 'DataFrame':
+    """Indexes the outbreaks of every country in a year by country, so each
+        country can be sliced out without scanning the response. The index
+        is reused while the cached response does not change.
+
+    Raises:
+        ValueError: If the outbreaks have no country column.
+    """
+    from pandas import DataFrame
+    params = {'year': year}
+    uri = _cache_uri(_OUTBREAKS_PATH, params)
+    version = gideon_api.cached_version(_OUTBREAKS_PATH, params)
+    with _INDEXED_LOCK:
+        indexed = _INDEXED.get(uri)
+        if (version is not None and indexed is not None and
+                indexed[0] == version):
+            _INDEXED.move_to_end(uri)
+            return indexed[1]
+
+    if not isinstance(outbreaks, DataFrame) or _COUNTRY_COLUMN not in outbreaks:
+        raise ValueError(f'The outbreaks of {year} cannot be split by country')
+    by_country = outbreaks.set_index(_COUNTRY_COLUMN, drop=False).sort_index()
+    if version is not None:
+        with _INDEXED_LOCK:
+            _INDEXED[uri] = (version, by_country)
+            _INDEXED.move_to_end(uri)
+            while len(_INDEXED) > MAX_INDEXED_YEARS:
+                _INDEXED.popitem(last=False)
+    return by_country
+
+
+def _country_slice(by_country: 'DataFrame', country_code: str) -> 'DataFrame':
+    """Selects the rows of one country from an indexed bulk response"""
+    try:
+        rows = by_country.loc[[country_code]]
+    except KeyError:
+        rows = by_country.iloc[0:0]
+    return rows.reset_index(drop=True)
+
+
+def split_by_country(
+        year: int,
+        outbreaks: 'DataFrame',
+        country_codes: Optional[Iterable[str]] = None
+) -> Dict[str, 'DataFrame']:
+    """Splits the outbreaks of every country in a year by country.
+
+    Shared by the synchronous and asynchronous
+    ``outbreaks_by_countries_year``, which only differ in how the outbreaks
+    are fetched.
+
+    Args:
+        year: 4 digit year.
+        outbreaks: The response of :py:func:`outbreaks_by_year`.
+        country_codes: GIDEON country codes. Every country with an outbreak
+            in the year is returned if this is not specified.
+    """
+    by_country = _index_by_country(year, outbreaks)
+    if country_codes is None:
+        country_codes = by_country.index.unique()
+    return {code: _country_slice(by_country, code) for code in country_codes}
 
 
 def outbreaks_by_year(year: int):
@@ -33,6 +119,29 @@ def outbreaks_by_country_year(country_code: str, year: int):
         f'/diseases/outbreaks/distribution/{country_code}', {'year': year})
 
 
+def outbreaks_by_countries_year(
+        year: int,
+        country_codes: Optional[Iterable[str]] = None
+) -> Dict[str, 'DataFrame']:
+    """Disease Outbreaks of many Countries in a Year
+
+    The outbreaks of every country in the year are fetched with a single
+    call, or taken from the cache, and split by country, instead of calling
+    the server once per country. Each country's outbreaks therefore have the
+    columns of :py:func:`outbreaks_by_year`, whatever is cached; use
+    :py:func:`outbreaks_by_country_year` for the distribution endpoint.
+
+    Args:
+        year: 4 digit year.
+        country_codes: GIDEON country codes. Every country with an outbreak
+            in the year is returned if this is not specified.
+    Returns:
+        dict: Maps each country code to the rows of
+        :py:func:`outbreaks_by_year` for that country.
+    """
+    return split_by_country(year, outbreaks_by_year(year), country_codes)
+
+
 def latest_outbreaks_by_country(country_code: str):
     """Latest Disease Outbreaks by Country
 
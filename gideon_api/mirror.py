@@ -0,0 +1,240 @@
+"""Keeps a local copy of the GIDEON reference catalogs and disease datasets
+
+A :py:class:`Mirror` downloads the catalogs looked up by
+:py:mod:`gideon_api.codes` and the outbreak and endemicity datasets queried
+by :py:mod:`gideon_api.diseases`, stores them on disk and answers reads from
+memory. Unlike the response cache, mirrored responses never expire: they are
+replaced only when a sync finds that their content changed::
+
+    mirror = Mirror()
+    mirror.sync()
+    outbreaks = mirror.query('/diseases/outbreaks', {'year': 2020})
+"""
+from datetime import date
+from typing import (TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple, Union)
+import os.path
+import threading
+from gideon_api import JSON, PARAMS, gideon_api
+from gideon_api.codes.index import ENDPOINT_ID_NAME
+from gideon_api.diseases.history import FIRST_YEAR
+from gideon_api.query.api_wrapper import _cache_uri
+from gideon_api.query.cache import GideonAPICache, cache_directory
+from gideon_api.query.cache_backends import (RESPONSE, MemoryBackend,
+                                             SQLiteBackend)
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    from gideon_api.query import GIDEON
+
+__all__ = ['Mirror']
+
+MIRROR_FILE = os.path.join(cache_directory(), 'mirror.sqlite3')
+
+# The datasets which can be mirrored, see Mirror.endpoints
+DATASETS = ('catalogs', 'outbreaks', 'endemic_countries', 'endemic_diseases')
+
+Query = Tuple[str, Optional[PARAMS]]
+
+
+class Mirror:
+    """A local copy of GIDEON API responses, synced incrementally.
+
+    The responses are stored in an SQLite database with their content hash
+    and validators, and are loaded into memory when the mirror is opened. A
+    sync queries every mirrored endpoint with a conditional request, so the
+    server only sends the endpoints which changed, and the mirror only
+    replaces the responses whose content hash differs.
+
+    Attributes:
+        client: The client the endpoints are fetched with.
+    """
+
+    def __init__(self,
+                 path: Optional[str] = MIRROR_FILE,
+                 client: Optional['GIDEON'] = None) -> None:
+        """Opens the mirror and loads the stored responses.
+
+        Args:
+            path: The location of the mirror database, created if it does not
+                exist, by default in the cache directory. If None, the mirror
+                is only kept in memory.
+            client: The client the endpoints are fetched with, by default
+                the client of the ``gideon_api`` module.
+        """
+        self.client = client if client is not None else gideon_api
+        if path is None:
+            backend = MemoryBackend()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            backend = SQLiteBackend(path)
+        self._backend = backend
+        # Stored responses never expire
+        self._store = GideonAPICache(None, backend=backend)
+        self._lock = threading.Lock()
+        self._responses = {
+            uri: self._store.get_entry(uri)[RESPONSE] for uri in backend.keys()
+        }
+        # DataFrames converted from the responses, keyed by their cache URI
+        # and dropped when the response changes
+        self._frames = {}
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def __contains__(self, query: Union[str, Query]) -> bool:
+        if isinstance(query, str):
+            query = (query, None)
+        return _cache_uri(*query) in self._responses
+
+    def endpoints(self,
+                  datasets: Iterable[str] = DATASETS,
+                  years: Optional[Iterable[int]] = None) -> List[Query]:
+        """Lists the queries of the mirrored datasets.
+
+        The endemicity datasets are listed for every disease and country in
+        the mirrored catalogs, so the catalogs should be synced first.
+
+        Args:
+            datasets: Any of "catalogs", every catalog of
+                :py:mod:`gideon_api.codes`; "outbreaks", the outbreaks of
+                every year; "endemic_countries", the countries where each
+                disease is endemic; and "endemic_diseases", the diseases
+                endemic to each country.
+            years: The years of outbreaks mirrored, by default from the
+                earliest year in GIDEON to the current year.
+
+        Returns:
+            The path and parameters of every query.
+        """
+        queries = []
+        for dataset in datasets:
+            if dataset == 'catalogs':
+                queries.extend((path, None) for path in ENDPOINT_ID_NAME)
+            elif dataset == 'outbreaks':
+                if years is None:
+                    years = range(FIRST_YEAR, date.today().year + 1)
+                queries.extend(('/diseases/outbreaks', {
+                    'year': year
+                }) for year in years)
+            elif dataset == 'endemic_countries':
+                queries.extend((f'/diseases/{code}/countries', None)
+                               for code in self._codes('/diseases'))
+            elif dataset == 'endemic_diseases':
+                queries.extend((f'/diseases/countries/{code}', None)
+                               for code in self._codes('/countries'))
+            else:
+                raise ValueError(f'Unknown dataset {dataset}, expected one of '
+                                 f'{", ".join(DATASETS)}')
+        return queries
+
+    def _codes(self, api_endpoint: str) -> List[Union[int, str]]:
+        """The item codes of a mirrored catalog"""
+        catalog = self._responses.get(_cache_uri(api_endpoint))
+        if catalog is None:
+            return []
+        id_key = ENDPOINT_ID_NAME[api_endpoint][0]
+        return [item[id_key] for item in catalog['data']]
+
+    def _sync_query(self, query: Query) -> bool:
+        """Fetches a query, conditionally if it is mirrored, and stores it if
+            its content changed.
+        """
+        api_path, params = query
+        uri = _cache_uri(api_path, params)
+        response, changed = self.client._refresh(api_path, params, uri,
+                                                 self._store)
+        if changed:
+            with self._lock:
+                self._responses[uri] = response
+                self._frames.pop(uri, None)
+        return changed
+
+    def sync(self,
+             queries: Optional[Iterable[Query]] = None,
+             max_workers: int = 8) -> Dict[str, bool]:
+        """Brings the mirror up to date with the server.
+
+        By default the catalogs are synced first, and then every dataset of
+        the diseases and countries they list. The queries are fetched
+        concurrently, paced by the rate limit of the client.
+
+        Args:
+            queries: The path and parameters of the queries to sync, e.g.
+                from :py:meth:`endpoints`. By default every dataset.
+            max_workers: The maximum number of queries fetched at the same
+                time.
+
+        Returns:
+            Maps the cache URI of every query synced to True if its response
+                changed, or was not mirrored before, and False otherwise.
+
+        Raises:
+            ConnectionError: If a query could not be fetched. The other
+                queries are still synced.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        if queries is None:
+            changed = self.sync(self.endpoints(['catalogs']), max_workers)
+            changed.update(self.sync(self.endpoints(DATASETS[1:]), max_workers))
+            return changed
+
+        queries = list(queries)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            changed = list(executor.map(self._sync_query, queries))
+        self._store.flush()
+        return {
+            _cache_uri(*query): query_changed
+            for query, query_changed in zip(queries, changed)
+        }
+
+    def versions(self) -> Dict[str, str]:
+        """The content hash of every mirrored response, keyed by cache URI"""
+        return {uri: self._store.query_hash(uri) for uri in self._responses}
+
+    def query(self,
+              api_path: str,
+              params: Optional[PARAMS] = None,
+              try_dataframe: bool = True) -> Union['DataFrame', JSON]:
+        """Reads a mirrored response from memory, without contacting the
+            server.
+
+        Args:
+            api_path: The API endpoint to query.
+            params: Dictionary key value pairs to be passed.
+            try_dataframe: Convert dictionary to pandas DataFrame if possible.
+                The DataFrame is converted once per version of the response
+                and a copy is returned.
+
+        Returns:
+            The mirrored response, in the same form as
+                :py:meth:`GIDEON.query_gideon_api` returns it.
+
+        Raises:
+            KeyError: If the query is not mirrored.
+        """
+        from pandas import DataFrame
+        uri = _cache_uri(api_path, params)
+        with self._lock:
+            response = self._responses[uri]
+            frame = self._frames.get(uri)
+        if not try_dataframe:
+            return response
+        if frame is None:
+            frame = self.client.to_dataframe(response, api_path)
+            with self._lock:
+                if self._responses.get(uri) is response:
+                    self._frames[uri] = frame
+        if isinstance(frame, DataFrame):
+            return frame.copy()
+        return frame
+
+    def close(self) -> None:
+        """Closes the mirror database"""
+        self._store.close()
+        self._backend.close()
+
+    def __enter__(self) -> 'Mirror':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1 +1,10 @@
-from gideon_api.query.api_wrapper import GIDEON
\ No newline at end of file
+from gideon_api.query.api_wrapper import GIDEON
+from gideon_api.query.transport import HTTPTransport, RequestTiming
+from gideon_api.query.async_wrapper import AsyncGIDEON
+from gideon_api.query.rate_limit import RateLimiter, TokenBucket
+from gideon_api.query.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+from gideon_api.query.cache import GideonAPICache
+from gideon_api.query.cache_backends import (CacheBackend, MemoryBackend,
+                                             PickleBackend, SQLiteBackend)
+from gideon_api.query.write_behind import WriteBehindBackend
+from gideon_api.query.replay import RecordingTransport, ReplayTransport
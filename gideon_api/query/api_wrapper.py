@@ -1,12 +1,25 @@
 """Provides a single point for GIDEON API authorization and queries"""
-from datetime import datetime as dt
-from time import sleep
-from typing import Dict, Optional, Union
+from functools import partial
+from time import monotonic, sleep
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator,
+                    List, Optional, Tuple, Union)
 from urllib.parse import urlencode
-from pandas import DataFrame
-import requests
+import threading
 from gideon_api import JSON, PARAMS
-from gideon_api.query.cache import GideonAPICache
+from gideon_api.query.cache import GideonAPICache, default_backend
+from gideon_api.query.cache_backends import (ETAG, LAST_MODIFIED, RESPONSE,
+                                             SQLiteBackend)
+from gideon_api.query.rate_limit import RateLimiter
+from gideon_api.query.retry import CircuitBreaker, RetryPolicy, RetryStats
+from gideon_api.query.schema import to_typed_dataframe
+from gideon_api.query.singleflight import SingleFlight
+from gideon_api.query.stream import (close_response, iter_records, load,
+                                     response_text)
+from gideon_api.query.transport import HTTPTransport, RequestTiming
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    import requests
 
 
 class Authorization:
@@ -28,33 +41,237 @@ class Authorization:
         return {'Authorization': f'api_key {self._api_key}'}
 
 
+# A query of many: an API path, or an API path and its parameters
+Query = Union[str, Tuple[str, Optional[PARAMS]]]
+QueryResult = Union['DataFrame', JSON, Exception]
+
 _API_ORIGIN = 'https://api.gideononline.com'
 _BAD_PATH_RESP = {
     'message': "API documentation: 'https://api-doc.gideononline.com'"
 }
 
 
+def _cache_uri(api_path: str, params: Optional[PARAMS] = None) -> str:
+    """Creates the key used to store a query in the cache"""
+    if isinstance(params, dict):
+        return f'{api_path}?{urlencode(params)}'
+    return api_path
+
+
+def _to_dataframe(response: JSON,
+                  try_dataframe: bool = True,
+                  api_path: Optional[str] = None) -> Union['DataFrame', JSON]:
+    """Converts the data of an API response to a DataFrame, if possible.
+        If the API path is given, the columns are typed using its schema.
+    """
+    # pandas is imported on first use to keep importing the package fast
+    from pandas import DataFrame
+    # Check if response should be converted to DataFrame
+    if all((try_dataframe, isinstance(response,
+                                      dict), len(response.keys()) == 1, 'data'
+            in response)):
+        records = response['data']
+        is_records = (isinstance(records, list) and
+                      all(isinstance(record, dict) for record in records))
+        if api_path is not None and is_records:
+            return to_typed_dataframe(records, api_path)
+        try:
+            return DataFrame(records)
+        except ValueError:
+            pass
+    return response
+
+
 class GIDEON:
     """Abstraction of querying GIDEON REST API via HTTP"""
 
     def __init__(self,
                  api_key: Optional[str],
-                 delay: Optional[float] = None) -> None:
+                 delay: Optional[float] = None,
+                 transport: Optional[HTTPTransport] = None,
+                 cache: Optional[GideonAPICache] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 stale_while_revalidate: bool = False,
+                 typed_dataframes: bool = True,
+                 api_origin: Optional[str] = None) -> None:
+        """Initializes the GIDEON API client.
+
+        Args:
+            api_key: The GIDEON API key used to authorize requests.
+            delay: The minimum time, in seconds, between calls to the server.
+                Ignored if a rate limiter is provided.
+            transport: The HTTP transport used to send requests. A transport
+                with the default pool size and timeouts is created if one is
+                not provided.
+            cache: The cache storing API responses. By default, responses
+                are stored in an SQLite database and expire after 24 hours.
+                Expired responses are kept, so that they can be revalidated
+                with a conditional request or served while stale.
+            rate_limiter: Limits the rate of calls to the server, optionally
+                per endpoint and shared between processes.
+            retry_policy: Decides which failed calls are retried and how long
+                to wait in between. Use :py:meth:`RetryPolicy.never` to
+                disable retries.
+            circuit_breaker: Fails calls immediately while the server is
+                unavailable.
+            stale_while_revalidate: If true, an expired cached response is
+                returned immediately while a fresh response is fetched in the
+                background, instead of waiting for the server.
+            typed_dataframes: If true, responses are converted to DataFrames
+                with categorical and numeric columns, following the schema
+                of the endpoint, instead of columns of Python objects.
+            api_origin: The scheme and host requests are sent to, such as
+                the origin of a
+                :py:class:`gideon_api.query.standin.StandInServer`. Defaults
+                to the GIDEON API.
+        """
         self._auth = Authorization(api_key)
-        self._cache = GideonAPICache(24, buffer_size=1)
-        self._using_delay = delay is not None
-        self._delay_period = delay
-        self._last_call = None
+        self._cache = cache if cache is not None else GideonAPICache(
+            24, backend=default_backend, write_behind=1.0)
+        self.rate_limiter = (rate_limiter if rate_limiter is not None else
+                             RateLimiter.from_delay(delay))
+        self.transport = transport if transport is not None else HTTPTransport()
+        self.retry_policy = (retry_policy
+                             if retry_policy is not None else RetryPolicy())
+        self.circuit_breaker = (circuit_breaker if circuit_breaker is not None
+                                else CircuitBreaker())
+        self.retry_stats = RetryStats()
+        self.stale_while_revalidate = stale_while_revalidate
+        self.typed_dataframes = typed_dataframes
+        self.api_origin = (api_origin or _API_ORIGIN).rstrip('/')
+        self._in_flight = SingleFlight()
 
     def set_api_key(self, api_key: str) -> None:
         self._auth.set_api_key(api_key)
 
-    def query_gideon_api_online(
+    @property
+    def last_request_timing(self) -> Optional[RequestTiming]:
+        """The connect, time to first byte and download durations of the
+            most recent request sent online by the current thread.
+        """
+        return self.transport.last_timing
+
+    def close(self) -> None:
+        """Closes the connections kept open to the GIDEON API, and closes
+            the cache after writing any buffered changes. Both are opened
+            again if the client is used after it is closed.
+        """
+        self.transport.close()
+        self._cache.close()
+
+    def to_dataframe(self,
+                     response: JSON,
+                     api_path: str,
+                     try_dataframe: bool = True) -> Union['DataFrame', JSON]:
+        """Converts the data of a response from the API path to a
+            DataFrame, if possible.
+        """
+        return _to_dataframe(response, try_dataframe,
+                             api_path if self.typed_dataframes else None)
+
+    def __enter__(self) -> 'GIDEON':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _send(
             self,
             path: str,
             params: Optional[PARAMS] = None,
-            return_response_object: bool = False
-    ) -> Union[JSON, requests.Response]:
+            headers: Optional[Dict[str, str]] = None,
+            stream: bool = False,
+            read: Optional[Callable[['requests.Response'], Any]] = None) -> Any:
+        """Sends a request, retrying transient failures under the retry
+            policy, and returns the final response. A streamed response must
+            be closed by the caller.
+
+        If ``read`` is given, the body of the final response is read with it
+        inside the retries, so that a connection lost while reading the body
+        is retried like one lost before the response, and its result is
+        returned instead of the response.
+        """
+        import requests
+        request_headers = self._auth.get_authorization_header()
+        if headers:
+            request_headers.update(headers)
+        policy = self.retry_policy
+        deadline = None
+        if policy.deadline is not None:
+            deadline = monotonic() + policy.deadline
+        self.retry_stats.record(calls=1)
+
+        for attempt in range(policy.max_attempts):
+            try:
+                trial = self.circuit_breaker.before_call()
+            except ConnectionError:
+                self.retry_stats.record(rejected_by_circuit=1)
+                raise
+
+            try:
+                # Pause the execution until the rate limits allow another call
+                self.rate_limiter.acquire(path)
+
+                r, error = None, None
+                # Only passed when needed, so simple transports need not stream
+                options = {'stream': True} if stream else {}
+                try:
+                    r = self.transport.get(self.api_origin + path,
+                                           params=params,
+                                           headers=request_headers,
+                                           **options)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    self.circuit_breaker.record_failure()
+                    error = e
+                else:
+                    if not policy.should_retry(r):
+                        try:
+                            result = r if read is None else read(r)
+                        except requests.RequestException as e:
+                            close_response(r)
+                            self.circuit_breaker.record_failure()
+                            r, error = None, e
+                        except Exception:
+                            # The server answered, with a response not retried
+                            self.circuit_breaker.record_success()
+                            raise
+                        else:
+                            self.circuit_breaker.record_success()
+                            return result
+                    # Throttling means the server is up, so only count errors
+                    elif r.status_code == 429:
+                        self.circuit_breaker.record_success()
+                    else:
+                        self.circuit_breaker.record_failure()
+            finally:
+                if trial:
+                    self.circuit_breaker.end_trial()
+
+            wait = policy.retry_delay(attempt, r)
+            out_of_attempts = attempt + 1 >= policy.max_attempts
+            past_deadline = (deadline is not None and
+                             monotonic() + wait > deadline)
+            # Retrying before the server asks would only be refused again
+            if out_of_attempts or past_deadline or policy.waits_too_long(r):
+                self.retry_stats.record(gave_up=1)
+                if r is not None:
+                    return r if read is None else read(r)
+                raise ConnectionError(
+                    'Could not connect to GIDEON API') from error
+
+            if r is not None:
+                close_response(r)
+            self.retry_stats.record(retries=1, backoff_seconds=wait)
+            sleep(wait)
+
+    def query_gideon_api_online(
+        self,
+        path: str,
+        params: Optional[PARAMS] = None,
+        return_response_object: bool = False
+    ) -> Union[JSON, 'requests.Response']:
         """Queries the GIDEON API online
 
         Args:
@@ -71,27 +288,96 @@ class GIDEON:
 
         Raises:
             ConnectionError: If the request does not return a 200
-                status code
-        """
-        # Pause the execution if a server delay is set
-        if self._using_delay and self._last_call is not None:
-            time_diff = (dt.now() - self._last_call).total_seconds()
-            if time_diff < self._delay_period:
-                sleep(time_diff)
-        self._last_call = dt.now()
-
-        r = requests.get(_API_ORIGIN + path,
-                         params=params,
-                         headers=self._auth.get_authorization_header())
+                status code once the retries are exhausted, or without
+                trying if the circuit breaker is open.
+        """
         if return_response_object:
-            return r
+            return self._send(path, params)
+        return self._send(path,
+                          params,
+                          stream=True,
+                          read=partial(self._parse_response, path))
+
+    @staticmethod
+    def _check_status(path: str, r: 'requests.Response') -> None:
+        """Raises an error if the call failed"""
         if r.status_code == 200:
-            return r.json()
+            return
+        close_response(r)
         if r.status_code == 404:
             raise ValueError(f'Bad GIDEON API path: "{path}" - '
                              'Refer to https://api-doc.gideononline.com')
         raise ConnectionError('Could not connect to GIDEON API')
 
+    @classmethod
+    def _parse_response(cls, path: str, r: 'requests.Response') -> JSON:
+        """Decodes a response, raising an error if the call failed.
+
+        The body is decoded as it is read, so the raw body and its text are
+        never held in memory all at once.
+        """
+        cls._check_status(path, r)
+        try:
+            return load(response_text(r))
+        finally:
+            close_response(r)
+
+    def stream_records(self,
+                       api_path: str,
+                       params: Optional[PARAMS] = None,
+                       key: str = 'data') -> Iterator[JSON]:
+        """Queries the GIDEON API online and yields the records of the
+            response as they are downloaded, without caching them.
+
+        Only one record, and the part of the body being decoded, is held in
+        memory at a time, so responses larger than the available memory can
+        be processed.
+
+        Args:
+            api_path: The API endpoint to query.
+            params: Dictionary key value pairs to be passed.
+            key: The key of the array of records in the response.
+
+        Raises:
+            ConnectionError: If the request does not return a 200
+                status code once the retries are exhausted.
+        """
+        import requests
+        r = self._send(api_path, params, stream=True)
+        self._check_status(api_path, r)
+        try:
+            yield from iter_records(response_text(r), key)
+        except requests.RequestException as e:
+            # Records were already yielded, so the request is not retried
+            self.circuit_breaker.record_failure()
+            raise ConnectionError(
+                'Connection to GIDEON API lost while reading the response'
+            ) from e
+        finally:
+            close_response(r)
+
+    def stream_dataframes(self,
+                          api_path: str,
+                          params: Optional[PARAMS] = None,
+                          chunk_size: int = 10000) -> Iterator['DataFrame']:
+        """Queries the GIDEON API online and yields the records of the
+            response in DataFrames of up to ``chunk_size`` rows, as they are
+            downloaded and without caching them.
+
+        Args:
+            api_path: The API endpoint to query.
+            params: Dictionary key value pairs to be passed.
+            chunk_size: The maximum number of rows of each DataFrame.
+        """
+        chunk = []
+        for record in self.stream_records(api_path, params):
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield self.to_dataframe({'data': chunk}, api_path)
+                chunk = []
+        if chunk:
+            yield self.to_dataframe({'data': chunk}, api_path)
+
     def query_gideon_api(
             self,
             api_path: str,
@@ -99,7 +385,7 @@ class GIDEON:
             try_dataframe: bool = True,
             force_online: bool = False,
             cache_expiration_hours: Optional[int] = 24
-    ) -> Union[DataFrame, JSON]:
+    ) -> Union['DataFrame', JSON]:
         """Queries the GIDEON API either using the local cache or online.
 
         Args:
@@ -116,26 +402,269 @@ class GIDEON:
             The API JSON response in the form of a Python dictionary.
         """
         # Create the URL to cache
-        uri = api_path
-        if isinstance(params, dict):
-            uri = f'{uri}?{urlencode(params)}'
+        uri = _cache_uri(api_path, params)
 
         # First try a cached response
-        response = self._cache.query(uri, cache_expiration_hours)
+        response = None
+        if not force_online:
+            response = self._cache.query(uri, cache_expiration_hours)
+            if response is None and self.stale_while_revalidate:
+                response = self._cache.query_stale(uri)
+                if response is not None:
+                    self._revalidate_in_background(api_path, params, uri,
+                                                   cache_expiration_hours)
+
+        # Try online query if no cache or force online. Identical queries
+        # running at the same time share a single call to the server, but a
+        # forced query does not share the call of a query which may be
+        # answered from the cache.
+        if response is None:
+            response = self._in_flight.do((uri, force_online), self._fetch,
+                                          api_path, params, uri, force_online,
+                                          cache_expiration_hours)
+
+        return self.to_dataframe(response, api_path, try_dataframe)
 
-        # Try online query if no cache or force online
-        if force_online or response is None:
-            response = self.query_gideon_api_online(api_path, params)
+    def query_many(
+        self,
+        queries: Iterable[Query],
+        try_dataframe: bool = True,
+        force_online: bool = False,
+        cache_expiration_hours: Optional[int] = 24,
+        max_workers: int = 8,
+        as_completed: bool = False,
+        return_exceptions: bool = False
+    ) -> Union[List[QueryResult], Iterator[Tuple[int, QueryResult]]]:
+        """Runs many queries, fetching those which are not cached in
+            parallel.
+
+        Cached responses are looked up first and answered immediately. The
+        other queries are fetched by a pool of at most ``max_workers``
+        threads, paced by the rate limiter and sharing the cache and
+        connection pool of the client.
+
+        Args:
+            queries: The queries to run, each an API path or a tuple of an
+                API path and its parameters.
+            try_dataframe: Convert dictionary to pandas DataFrame if possible.
+            force_online: Query the API online, rather than the local
+                cache. However, the responses will still be saved to cache.
+            cache_expiration_hours: The number of hours since the present
+                moment which a cached response will be considered valid.
+            max_workers: The maximum number of queries sent to the server at
+                the same time.
+            as_completed: If true, the results are yielded as they become
+                available, cached responses first, as pairs of the position
+                of the query and its result.
+            return_exceptions: If true, the error raised by a failed query is
+                returned as its result instead of being raised.
+
+        Returns:
+            The results in the order of the queries, or, if as_completed is
+                true, an iterator of the position and result of each query.
+
+        Raises:
+            ConnectionError: If a query could not be fetched and
+                return_exceptions is false. With as_completed, the error is
+                raised when its result is reached.
+            ValueError: If a query has a bad path and return_exceptions is
+                false.
+        """
+        results = self._query_many(list(queries), try_dataframe, force_online,
+                                   cache_expiration_hours, max_workers,
+                                   return_exceptions)
+        if as_completed:
+            return results
+        ordered = {}
+        for position, result in results:
+            ordered[position] = result
+        return [ordered[position] for position in range(len(ordered))]
+
+    def _query_many(
+            self, queries: List[Query], try_dataframe: bool, force_online: bool,
+            cache_expiration_hours: Optional[int], max_workers: int,
+            return_exceptions: bool) -> Iterator[Tuple[int, QueryResult]]:
+        """Yields the position and result of each query as it completes"""
+        from concurrent.futures import ThreadPoolExecutor
+        from concurrent.futures import as_completed as completed_futures
+        misses = []
+        for position, query in enumerate(queries):
+            if isinstance(query, str):
+                api_path, params = query, None
+            else:
+                api_path, params = query
+            response = None
+            if not force_online:
+                response = self.query_cache(api_path, params, try_dataframe,
+                                            cache_expiration_hours)
+            if response is None:
+                misses.append((position, api_path, params))
+            else:
+                yield position, response
+        if not misses:
+            return
+
+        with ThreadPoolExecutor(max_workers=max_workers,
+                                thread_name_prefix='gideon-api') as executor:
+            futures = {}
+            for position, api_path, params in misses:
+                future = executor.submit(self.query_gideon_api, api_path,
+                                         params, try_dataframe, force_online,
+                                         cache_expiration_hours)
+                futures[future] = position
+            for future in completed_futures(futures):
+                try:
+                    result = future.result()
+                except (ConnectionError, ValueError) as e:
+                    if not return_exceptions:
+                        raise
+                    result = e
+                yield futures[future], result
+
+    def _fetch(self, api_path: str, params: Optional[PARAMS], uri: str,
+               force_online: bool,
+               cache_expiration_hours: Optional[int]) -> JSON:
+        """Queries the server and caches the response"""
+        # The response may have been cached while waiting to make the call
+        if not force_online:
+            response = self._cache.query(uri, cache_expiration_hours)
             if response is not None:
-                self._cache.write(uri, response)
+                return response
+        return self._refresh(api_path, params, uri, self._cache)[0]
+
+    def _refresh(self,
+                 api_path: str,
+                 params: Optional[PARAMS],
+                 uri: str,
+                 cache: GideonAPICache,
+                 conditional: bool = True) -> Tuple[JSON, bool]:
+        """Queries the server and stores the response in a cache.
 
-        # Check if response should be converted to DataFrame
-        if all(
-            (try_dataframe, isinstance(response,
-                                       dict), len(response.keys()) == 1, 'data'
-             in response)):
+        Args:
+            conditional: Whether to send the validators of the cached
+                response, so that the server confirms it with a 304 if it
+                has not changed.
+
+        Returns:
+            The response, and True if it differs from the cached response.
+        """
+        # Ask the server to only send the response if it has changed since
+        # it was cached, reading the validators without the response
+        headers = {}
+        if conditional:
+            validators = cache.get_validators(uri) or {}
+            if validators.get(ETAG):
+                headers['If-None-Match'] = validators[ETAG]
+            if validators.get(LAST_MODIFIED):
+                headers['If-Modified-Since'] = validators[LAST_MODIFIED]
+
+        def read(r: 'requests.Response') -> Tuple['requests.Response', JSON]:
+            if r.status_code == 304 and headers:
+                close_response(r)
+                return r, None
+            return r, self._parse_response(api_path, r)
+
+        r, response = self._send(api_path, params, headers, True, read)
+        etag = r.headers.get('ETag')
+        last_modified = r.headers.get('Last-Modified')
+        if r.status_code == 304 and headers:
+            entry = cache.get_entry(uri)
+            if entry is None:
+                # Evicted since the request was sent
+                return self._refresh(api_path, params, uri, cache, False)
+            cache.revalidate(uri, etag, last_modified)
+            return entry[RESPONSE], False
+
+        changed = False
+        if response is not None:
+            changed = cache.write(uri, response, etag, last_modified)
+        return response, changed
+
+    def _revalidate_in_background(
+            self, api_path: str, params: Optional[PARAMS], uri: str,
+            cache_expiration_hours: Optional[int]) -> None:
+        """Refreshes a cached response in a background thread, unless the
+            query is already being fetched.
+        """
+        if self._in_flight.running((uri, True)):
+            return
+
+        def revalidate() -> None:
             try:
-                return DataFrame(response['data'])
-            except ValueError:
+                self._in_flight.do((uri, True), self._fetch, api_path, params,
+                                   uri, True, cache_expiration_hours)
+            except (ConnectionError, ValueError):
+                # The stale response stays cached and is retried next time
                 pass
-        return response
+
+        threading.Thread(target=revalidate,
+                         name='gideon-api-revalidate',
+                         daemon=True).start()
+
+    def query_cache(
+        self,
+        api_path: str,
+        params: Optional[PARAMS] = None,
+        try_dataframe: bool = True,
+        cache_expiration_hours: Optional[int] = 24
+    ) -> Optional[Union['DataFrame', JSON]]:
+        """Looks up a query in the local cache only, without contacting the
+            server.
+
+        Args:
+            api_path: The API endpoint to query.
+            params: Dictionary key value pairs to be passed.
+            try_dataframe: Convert dictionary to pandas DataFrame if possible.
+            cache_expiration_hours: The number of hours since the present
+                moment which a cached response will be considered valid.
+
+        Returns:
+            The cached response, or None if the query is not cached or has
+                expired.
+        """
+        response = self._cache.query(_cache_uri(api_path, params),
+                                     cache_expiration_hours)
+        if response is None:
+            return None
+        return self.to_dataframe(response, api_path, try_dataframe)
+
+    def cached_version(
+            self,
+            api_path: str,
+            params: Optional[PARAMS] = None,
+            cache_expiration_hours: Optional[int] = 24) -> Optional[str]:
+        """Identifies the version of a cached response without loading it.
+
+        Args:
+            api_path: The API endpoint to query.
+            params: Dictionary key value pairs to be passed.
+            cache_expiration_hours: The number of hours since the present
+                moment which a cached response will be considered valid.
+
+        Returns:
+            A hash of the cached response, which changes whenever the
+                response does, or None if the query is not cached or has
+                expired.
+        """
+        return self._cache.query_hash(_cache_uri(api_path, params),
+                                      cache_expiration_hours)
+
+    def export_cache(self, path: str, api_paths: Iterable[str]) -> int:
+        """Writes the cached responses of some queries to an SQLite cache
+            database, which can be used as the cache of another machine.
+
+        Args:
+            path: The location of the database, created if it does not
+                exist. Point ``GIDEON_API_CACHE_DIR`` at its directory, with
+                the file named ``cache.sqlite3``, to use it as the default
+                cache.
+            api_paths: The API endpoints whose cached responses are written.
+
+        Returns:
+            The number of responses written.
+        """
+        backend = SQLiteBackend(path)
+        try:
+            return self._cache.export(map(_cache_uri, api_paths), backend)
+        finally:
+            backend.close()
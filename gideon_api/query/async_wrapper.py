@@ -0,0 +1,153 @@
+"""Provides an asyncio interface for running many GIDEON API queries
+    concurrently
+"""
+from typing import TYPE_CHECKING, Callable, Optional, TypeVar, Union
+import functools
+from gideon_api import JSON, PARAMS
+from gideon_api.query.api_wrapper import GIDEON, _cache_uri
+from gideon_api.query.cache import GideonAPICache
+from gideon_api.query.transport import HTTPTransport
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    import requests
+
+_T = TypeVar('_T')
+
+
+class AsyncGIDEON:
+    """Asyncio counterpart of :py:class:`gideon_api.GIDEON`.
+
+    The cache is read, and queries that need the server are sent, on a pool
+    of worker threads so that the event loop is never blocked, with at most
+    ``max_concurrency`` requests in flight at once, over the same pooled
+    transport, cache and response conversion used by the synchronous client.
+    """
+
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 delay: Optional[float] = None,
+                 max_concurrency: int = 16,
+                 client: Optional[GIDEON] = None,
+                 cache: Optional[GideonAPICache] = None) -> None:
+        """Initializes the asynchronous GIDEON API client.
+
+        Args:
+            api_key: The GIDEON API key used to authorize requests. Ignored if
+                a client is provided.
+            delay: The minimum time, in seconds, between calls to the server.
+                Ignored if a client is provided.
+            max_concurrency: The maximum number of requests sent to the
+                server at the same time.
+            client: An existing synchronous client whose authorization,
+                transport and cache should be shared. It is left open by
+                :py:meth:`close`.
+            cache: The cache storing API responses. Ignored if a client is
+                provided.
+        """
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1')
+        # Only a client created here is closed along with this one
+        self._owns_client = client is None
+        if client is None:
+            client = GIDEON(
+                api_key,
+                delay,
+                transport=HTTPTransport(pool_maxsize=max_concurrency),
+                cache=cache)
+        self.client = client
+        self._max_concurrency = max_concurrency
+        self._executor = None
+        self._in_flight = {}
+        # The number of queries answered by another caller's request
+        self.coalesced = 0
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._max_concurrency
+
+    def set_api_key(self, api_key: str) -> None:
+        self.client.set_api_key(api_key)
+
+    async def _run(self, func: Callable[..., _T], *args) -> _T:
+        """Runs a blocking call on the worker pool without blocking the loop"""
+        # Imported here so that importing the package does not load asyncio
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self._max_concurrency,
+                                                thread_name_prefix='gideon-api')
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor,
+                                          functools.partial(func, *args))
+
+    async def query_gideon_api_online(
+        self,
+        path: str,
+        params: Optional[PARAMS] = None,
+        return_response_object: bool = False
+    ) -> Union[JSON, 'requests.Response']:
+        """Queries the GIDEON API online.
+
+        Refer to :py:meth:`gideon_api.GIDEON.query_gideon_api_online` for
+        the description of the arguments.
+        """
+        return await self._run(self.client.query_gideon_api_online, path,
+                               params, return_response_object)
+
+    async def query_gideon_api(
+            self,
+            api_path: str,
+            params: Optional[PARAMS] = None,
+            try_dataframe: bool = True,
+            force_online: bool = False,
+            cache_expiration_hours: Optional[int] = 24
+    ) -> Union['DataFrame', JSON]:
+        """Queries the GIDEON API either using the local cache or online.
+
+        Refer to :py:meth:`gideon_api.GIDEON.query_gideon_api` for the
+        description of the arguments.
+        """
+        import asyncio
+        if not force_online:
+            response = await self._run(self.client.query_cache, api_path,
+                                       params, try_dataframe,
+                                       cache_expiration_hours)
+            if response is not None:
+                return response
+
+        # Identical queries awaited at the same time share one worker, and
+        # each caller converts the shared response into its own DataFrame.
+        # A forced query does not share the worker of a query which may be
+        # answered from the cache.
+        key = (_cache_uri(api_path, params), force_online)
+        fetch = self._in_flight.get(key)
+        if fetch is None:
+            fetch = asyncio.ensure_future(
+                self._run(self.client.query_gideon_api, api_path, params, False,
+                          force_online, cache_expiration_hours))
+            self._in_flight[key] = fetch
+            fetch.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so a cancelled caller does not cancel the other callers
+        response = await asyncio.shield(fetch)
+        if try_dataframe:
+            return await self._run(self.client.to_dataframe, response, api_path)
+        return response
+
+    def close(self) -> None:
+        """Stops the worker pool, and closes the underlying client if it was
+            created by this client.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._owns_client:
+            self.client.close()
+
+    async def __aenter__(self) -> 'AsyncGIDEON':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
@@ -1,14 +1,59 @@
 """Caches the GIDEON API response temporarily to improve response time
     and reduce server utilization
 """
-from datetime import datetime as dt
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from datetime import datetime as dt, timedelta
+from typing import Any, Callable, Dict, Iterable, Optional, Union
 import os.path
-import pickle
+import sqlite3
+import sys
+import threading
+from gideon_api.query.cache_backends import (CONTENT_HASH, ETAG, LAST_MODIFIED,
+                                             RESPONSE, TIMESTAMP, CacheBackend,
+                                             CacheEntry, MemoryBackend,
+                                             PickleBackend, SQLiteBackend,
+                                             content_hash, response_size)
+from gideon_api.query.write_behind import WriteBehindBackend
 
-CACHE_FILE = os.path.join(os.path.dirname(__file__), 'cache.pickle')
-TIMESTAMP = 'timestamp'
-RESPONSE = 'response'
+# Environment variable setting the directory of the persistent cache
+CACHE_DIR_VARIABLE = 'GIDEON_API_CACHE_DIR'
+
+
+def cache_directory() -> str:
+    """The directory holding the persistent cache files.
+
+    This is the directory named by the ``GIDEON_API_CACHE_DIR`` environment
+    variable if it is set, so that processes or containers can share a
+    cache, and otherwise the user's cache directory.
+    """
+    directory = os.environ.get(CACHE_DIR_VARIABLE)
+    if directory:
+        return directory
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser(
+            os.path.join('~', 'AppData', 'Local'))
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser(os.path.join('~', 'Library', 'Caches'))
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(
+            os.path.join('~', '.cache'))
+    return os.path.join(base, 'gideon_api')
+
+
+CACHE_FILE = os.path.join(cache_directory(), 'cache.pickle')
+SQLITE_CACHE_FILE = os.path.join(cache_directory(), 'cache.sqlite3')
+
+BackendOpener = Callable[[], CacheBackend]
+
+
+def default_backend() -> CacheBackend:
+    """Opens the SQLite cache database, falling back to an in-memory cache
+        if the database cannot be created.
+    """
+    try:
+        return SQLiteBackend(SQLITE_CACHE_FILE)
+    except (sqlite3.Error, OSError):
+        return MemoryBackend()
 
 
 def is_expired(item_timestamp: dt, now: dt, expiration_hours: int) -> bool:
@@ -16,13 +61,54 @@ def is_expired(item_timestamp: dt, now: dt, expiration_hours: int) -> bool:
     return (now - item_timestamp).total_seconds() >= expiration_hours * 3600
 
 
+class CacheStats:
+    """Running totals of how the cache has been used"""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.stale = 0
+        self.revalidated = 0
+        self.entries = 0
+        self.bytes = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'evictions': self.evictions,
+            'stale': self.stale,
+            'revalidated': self.revalidated,
+            'entries': self.entries,
+            'bytes': self.bytes,
+        }
+
+
 class GideonAPICache:
-    """Provides a cache for the API response."""
+    """Provides a cache for the API response.
+
+    The cache can be bounded by a number of entries and a number of bytes, in
+    which case the least recently used entries are evicted first. Expired
+    entries can also be removed periodically by a background thread.
+    """
 
     def __init__(self,
                  default_expiration_hours: Optional[int] = None,
                  persistent_cache: bool = True,
-                 buffer_size: int = 10) -> None:
+                 buffer_size: int = 10,
+                 backend: Optional[Union[CacheBackend, BackendOpener]] = None,
+                 max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None,
+                 sweep_interval: Optional[float] = None,
+                 write_behind: Optional[float] = None) -> None:
         """Initializes the API cache settings.
 
         Args:
@@ -34,38 +120,157 @@ class GideonAPICache:
             buffer_size:
                 The number of changes to store in memory before writing
                     to the local file system.
+            backend: The storage holding the cache entries, such as an
+                :py:class:`SQLiteBackend`, or a function opening the
+                storage. If not given, entries are kept in memory and, for a
+                persistent cache, pickled to ``CACHE_FILE``. A storage
+                passed in belongs to the caller, and is only flushed when
+                the cache is closed; storage opened by the cache is closed
+                with it.
+            max_entries: The maximum number of responses kept in the cache.
+            max_bytes: The maximum total size, in bytes, of the responses
+                kept in the cache.
+            sweep_interval: If set, expired entries are deleted by a
+                background thread every ``sweep_interval`` seconds.
+            write_behind: If set, changes are written to the backend by a
+                background thread, at most ``write_behind`` seconds after
+                they are made, instead of while answering queries. See
+                :py:class:`WriteBehindBackend`.
         """
-        self._cache_dictionary = {}
         self._default_expiration_hours = default_expiration_hours
-        self._persistent_cache = persistent_cache
-        self._max_buffer = buffer_size
-        self._unsaved_changes = 0
+        # Guards the backend when shared between threads
+        self._lock = threading.RLock()
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._sweep_interval = sweep_interval
+        self._write_behind = write_behind
+        self._sweeper = None
+        self._closed = threading.Event()
+        self.stats = CacheStats()
+        # Sizes of the cached responses from the least to the most recently
+        # used, only tracked when the cache size is bounded
+        self._lru = None
+
+        self._backend = None
+        self._owns_backend = not isinstance(backend, CacheBackend)
+        if isinstance(backend, CacheBackend):
+            self._open_backend = lambda: backend
+        elif backend is not None:
+            self._open_backend = backend
+        elif persistent_cache:
+            self._open_backend = lambda: PickleBackend(CACHE_FILE, buffer_size)
+        else:
+            self._open_backend = MemoryBackend
+
+    @property
+    def backend(self) -> CacheBackend:
+        """The storage of the cache entries, opened on first use so that
+            creating a cache does not load anything from disk.
+        """
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._open(self._open_backend())
+        return self._backend
 
-        if persistent_cache and os.path.isfile(CACHE_FILE):
-            with open(CACHE_FILE, 'rb') as f:
-                try:
-                    self._cache_dictionary = pickle.load(f)
-                except PermissionError:
-                    pass
+    def _open(self, backend: CacheBackend) -> None:
+        """Starts using a backend, indexing its entries if needed"""
+        if self._write_behind is not None:
+            backend = WriteBehindBackend(backend, self._write_behind)
+        if isinstance(backend,
+                      WriteBehindBackend) and backend.on_stored is None:
+            backend.on_stored = self._stored
+        if self._max_entries is not None or self._max_bytes is not None:
+            self._lru = OrderedDict(backend.sizes())
+            self.stats.entries = len(self._lru)
+            self.stats.bytes = sum(self._lru.values())
+        self._backend = backend
+        if self._sweep_interval is not None:
+            self._closed.clear()
+            self._sweeper = threading.Thread(target=self._sweep,
+                                             name='gideon-api-cache-sweeper',
+                                             daemon=True)
+            self._sweeper.start()
+        self._evict()
+
+    def _sweep(self) -> None:
+        """Deletes expired entries until the cache is closed"""
+        while not self._closed.wait(self._sweep_interval):
+            self.delete_old_queries()
+
+    def _stored(self, key: str, size: int) -> None:
+        """Counts the stored size of an entry written behind"""
+        with self._lock:
+            if self._lru is not None and key in self._lru:
+                self.stats.bytes += size - self._lru[key]
+                self._lru[key] = size
+                self._evict()
+
+    def _forget(self, key: str) -> None:
+        """Removes a deleted entry from the size index"""
+        if self._lru is not None and key in self._lru:
+            self.stats.bytes -= self._lru.pop(key)
+            self.stats.entries -= 1
+
+    def _over_limits(self) -> bool:
+        too_many = (self._max_entries is not None and
+                    len(self._lru) > self._max_entries)
+        too_big = (self._max_bytes is not None and
+                   self.stats.bytes > self._max_bytes)
+        return too_many or too_big
+
+    def _evict(self) -> None:
+        """Deletes the least recently used entries until within the limits,
+            always keeping the most recent entry.
+        """
+        if self._lru is None:
+            return
+        while len(self._lru) > 1 and self._over_limits():
+            key = next(iter(self._lru))
+            self._backend.delete(key)
+            self._forget(key)
+            self.stats.evictions += 1
 
     def count_persistent_changes(self, force: bool = False) -> None:
-        """Note when the local cache has been updated and periodically
-            write changes to the local file system. This method is only
-            important when the cache uses the persisten cache option.
+        """Writes buffered changes to the local file system. Backends
+            buffering changes count them as entries are written, so this
+            method is only needed to force storing the cache.
 
         Args:
             force: Force storing the cache, regardless of changes in
                 the buffer.
         """
-        if self._persistent_cache:
-            self._unsaved_changes += 1
-            if force or (self._unsaved_changes >= self._max_buffer):
-                try:
-                    with open(CACHE_FILE, 'wb') as f:
-                        pickle.dump(self._cache_dictionary, f)
-                    self._unsaved_changes = 0
-                except PermissionError:
-                    pass
+        if force:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes any buffered changes to persistent storage"""
+        with self._lock:
+            if self._backend is not None:
+                self._backend.flush()
+
+    def close(self) -> None:
+        """Stops the background sweep, writes any buffered changes and
+            closes the backend, unless it was passed in by the caller. The
+            backend is opened again if the cache is used after it is closed.
+        """
+        self._closed.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+        with self._lock:
+            backend, self._backend = self._backend, None
+            self._lru = None
+        # Closed without the lock, which a background writer may be waiting
+        # for before it can stop
+        if backend is None:
+            return
+        if self._owns_backend:
+            backend.close()
+        elif isinstance(backend, WriteBehindBackend):
+            backend.stop()
+        else:
+            backend.flush()
 
     def delete_old_queries(self,
                            expiration_hours: Optional[int] = None) -> None:
@@ -81,13 +286,12 @@ class GideonAPICache:
         if expiration_hours is None:
             expiration_hours = self._default_expiration_hours
 
-        # Only clear the cache dictionary if a time is set
-        now = dt.now()
+        # Only clear the cache if a time is set
         if expiration_hours is not None:
-            for path in list(self._cache_dictionary.keys()):
-                if is_expired(self._cache_dictionary[path][TIMESTAMP], now,
-                              expiration_hours):
-                    del self._cache_dictionary[path]
+            cutoff = dt.now() - timedelta(hours=expiration_hours)
+            with self._lock:
+                for key in self.backend.delete_older_than(cutoff):
+                    self._forget(key)
 
     def query(self,
               api_path: str,
@@ -109,7 +313,12 @@ class GideonAPICache:
                 the expiration_hours, this will return a Python
                 dictionary representing the query.
         """
-        if api_path in self._cache_dictionary:
+        with self._lock:
+            entry = self.backend.get(api_path)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+
             # Try default expiration time if not specified
             if expiration_hours is None:
                 expiration_hours = self._default_expiration_hours
@@ -117,35 +326,186 @@ class GideonAPICache:
             # If there still is not expiration time specified,
             # just return value
             if expiration_hours is None:
-                return self._cache_dictionary[api_path][RESPONSE]
+                self._record_hit(api_path)
+                return entry[RESPONSE]
 
             # Only return value if within time limit
-            if is_expired(self._cache_dictionary[api_path][TIMESTAMP], dt.now(),
-                          expiration_hours):
+            if is_expired(entry[TIMESTAMP], dt.now(), expiration_hours):
+                self.stats.misses += 1
+                self.stats.expired += 1
                 if delete_expired_entry:
-                    del self._cache_dictionary[api_path]
+                    self.backend.delete(api_path)
+                    self._forget(api_path)
             else:
-                return self._cache_dictionary[api_path][RESPONSE]
+                self._record_hit(api_path)
+                return entry[RESPONSE]
+
+    def _record_hit(self, api_path: str) -> None:
+        self.stats.hits += 1
+        self._mark_used(api_path)
+
+    def _mark_used(self, api_path: str) -> None:
+        if self._lru is not None and api_path in self._lru:
+            self._lru.move_to_end(api_path)
+
+    def get_entry(self, api_path: str) -> Optional[CacheEntry]:
+        """Reads the entry cached for a path, whether or not it has expired,
+            without counting it as a cache lookup.
+
+        Returns:
+            A dictionary holding the response, the time it was cached and the
+                validators sent by the server, or None if the path is not
+                cached.
+        """
+        with self._lock:
+            return self.backend.get(api_path)
 
-    def write(self, api_path: str, value: Dict[str, Any]) -> None:
+    def get_validators(self,
+                       api_path: str) -> Optional[Dict[str, Optional[str]]]:
+        """Reads the ETag and Last-Modified validators cached for a path,
+            without loading the response.
+
+        Returns:
+            The validators keyed by ``ETAG`` and ``LAST_MODIFIED``, either of
+                which may be None, or None if the path is not cached.
+        """
+        with self._lock:
+            return self.backend.get_validators(api_path)
+
+    def query_hash(self,
+                   api_path: str,
+                   expiration_hours: Optional[int] = None) -> Optional[str]:
+        """Reads the content hash of a cached response without loading the
+            response, e.g. to check if data derived from it is up to date.
+
+        Args:
+            api_path: The GIDEON API path of the query.
+            expiration_hours: The maximum time, in hours, since the
+                current moment which a response will be considered
+                recent enough.
+
+        Returns:
+            The hash of the cached response, or None if the path is not
+                cached or has expired.
+        """
+        if expiration_hours is None:
+            expiration_hours = self._default_expiration_hours
+        with self._lock:
+            metadata = self.backend.get_metadata(api_path)
+        if metadata is None:
+            return None
+        timestamp, digest = metadata
+        if (expiration_hours is not None and
+                is_expired(timestamp, dt.now(), expiration_hours)):
+            return None
+        return digest
+
+    def query_stale(self, api_path: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached response for a path regardless of its age, to
+            be served while a fresh response is fetched.
+
+        Returns:
+            The cached response, or None if the path is not cached.
+        """
+        with self._lock:
+            entry = self.backend.get(api_path)
+            if entry is None:
+                return None
+            self.stats.stale += 1
+            self._mark_used(api_path)
+            return entry[RESPONSE]
+
+    def revalidate(self,
+                   api_path: str,
+                   etag: Optional[str] = None,
+                   last_modified: Optional[str] = None) -> None:
+        """Marks a cached response as fresh after the server confirmed it
+            has not changed.
+
+        Args:
+            api_path: The path used to call the query from the API
+            etag: The ETag sent with the confirmation, if any.
+            last_modified: The Last-Modified date sent with the confirmation,
+                if any.
+        """
+        # A confirmation without a validator keeps the one stored before
+        validators = {
+            name: value
+            for name, value in ((ETAG, etag), (LAST_MODIFIED, last_modified))
+            if value is not None
+        }
+        with self._lock:
+            self.backend.touch(api_path, dt.now(), validators or None)
+            self.stats.revalidated += 1
+            self._mark_used(api_path)
+
+    def export(self, api_paths: Iterable[str], backend: CacheBackend) -> int:
+        """Copies the entries cached for some paths to another backend, e.g.
+            to build a cache snapshot which can be shipped elsewhere.
+
+        Args:
+            api_paths: The paths of the entries to copy. Paths which are not
+                cached are skipped.
+            backend: The backend the entries are written to, which is
+                flushed afterwards.
+
+        Returns:
+            The number of entries copied.
+        """
+        copied = 0
+        for api_path in api_paths:
+            entry = self.get_entry(api_path)
+            if entry is not None:
+                backend.set(api_path, entry)
+                copied += 1
+        backend.flush()
+        return copied
+
+    def write(self,
+              api_path: str,
+              value: Dict[str, Any],
+              etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> bool:
         """Writes the changes to cache
 
         Args:
             api_path: The path used to call the query from the API
             value: The JSON, represented as a Python dictionary,
                 returned from the server.
+            etag: The ETag header sent with the response, if any.
+            last_modified: The Last-Modified header sent with the response,
+                if any.
+
+        Returns:
+            True if the response was stored, or False if the same response
+                was already cached and only its timestamp was updated.
         """
         now = dt.now()
-        # Check if the query has been stored previously
-        if api_path in self._cache_dictionary:
-            self._cache_dictionary[api_path][TIMESTAMP] = now
-            # Only update and push cache if there is a change
-            if value != self._cache_dictionary[api_path][RESPONSE]:
-                self._cache_dictionary[api_path][RESPONSE] = value
-                self.count_persistent_changes()
-        else:
-            self._cache_dictionary[api_path] = {
+        digest = content_hash(value)
+        validators = {ETAG: etag, LAST_MODIFIED: last_modified}
+        with self._lock:
+            # Only store the response again if there is a change
+            if self.backend.get_hash(api_path) == digest:
+                self.backend.touch(api_path, now, validators)
+                self._mark_used(api_path)
+                return False
+
+            entry = {
                 TIMESTAMP: now,
                 RESPONSE: value,
+                CONTENT_HASH: digest,
             }
-            self.count_persistent_changes()
+            entry.update(validators)
+            size = self.backend.set(api_path, entry)
+            if self._lru is not None:
+                if isinstance(self._backend, WriteBehindBackend):
+                    # Counted by _stored once written, as sizes() counts it
+                    size = 0
+                elif size is None:
+                    size = response_size(value)
+                self._forget(api_path)
+                self._lru[api_path] = size
+                self.stats.entries += 1
+                self.stats.bytes += size
+                self._evict()
+        return True
@@ -0,0 +1,541 @@
+"""Storage backends holding the entries of the GIDEON API cache
+
+Each cache entry is a dictionary holding the time it was cached, the API
+response and a hash of the response content. Entries may also hold the ETag
+and Last-Modified validators the server sent with the response.
+
+Backends writing to disk store each response serialized in a compact
+format, see :py:mod:`gideon_api.query.serialization`, and only decode it
+when the entry is read.
+"""
+from contextlib import contextmanager
+from datetime import datetime as dt
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import json
+import os.path
+import pickle
+import sqlite3
+import tempfile
+import threading
+from gideon_api.query.file_lock import locked_file
+from gideon_api.query.serialization import (DEFAULT_FORMAT, check_format,
+                                            deserialize, is_pickled, serialize)
+
+TIMESTAMP = 'timestamp'
+RESPONSE = 'response'
+CONTENT_HASH = 'content_hash'
+ETAG = 'etag'
+LAST_MODIFIED = 'last_modified'
+VALIDATORS = (ETAG, LAST_MODIFIED)
+
+CacheEntry = Dict[str, Any]
+
+
+def content_hash(value: Any) -> str:
+    """Hashes a JSON response independently of its dictionary key order"""
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def _is_trusted(path: str) -> bool:
+    """Checks that a file can only have been written by the current user,
+        before loading a pickle from it.
+    """
+    if not hasattr(os, 'getuid'):
+        return True
+    stat = os.stat(path)
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+
+def response_size(value: Any) -> int:
+    """Estimates the number of bytes a response takes up in the cache"""
+    return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+class CacheBackend:
+    """Interface of the storage used by :py:class:`GideonAPICache`.
+
+    Backends only store and retrieve entries. Expiration, locking and change
+    detection are handled by the cache itself.
+    """
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Reads the entry stored under a key, or None if there is none"""
+        raise NotImplementedError
+
+    def get_hash(self, key: str) -> Optional[str]:
+        """Reads only the content hash of the entry stored under a key"""
+        entry = self.get(key)
+        if entry is None:
+            return None
+        if CONTENT_HASH not in entry:
+            return content_hash(entry[RESPONSE])
+        return entry[CONTENT_HASH]
+
+    def get_metadata(self, key: str) -> Optional[Tuple[dt, str]]:
+        """Reads only the time an entry was cached and its content hash"""
+        entry = self.get(key)
+        if entry is None:
+            return None
+        return entry[TIMESTAMP], self.get_hash(key)
+
+    def get_validators(self, key: str) -> Optional[Dict[str, Optional[str]]]:
+        """Reads only the ETag and Last-Modified validators of an entry"""
+        entry = self.get(key)
+        if entry is None:
+            return None
+        return {ETAG: entry.get(ETAG), LAST_MODIFIED: entry.get(LAST_MODIFIED)}
+
+    def set(self, key: str, entry: CacheEntry) -> Optional[int]:
+        """Stores an entry, replacing any entry under the same key.
+
+        Returns:
+            The number of bytes used to store the response, if known.
+        """
+        raise NotImplementedError
+
+    def touch(self,
+              key: str,
+              timestamp: dt,
+              validators: Optional[Dict[str, Optional[str]]] = None) -> None:
+        """Updates the time an existing entry was cached, and the validators
+            given. Validators missing from the dictionary are kept.
+        """
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Removes an entry, if it exists"""
+        raise NotImplementedError
+
+    def delete_older_than(self, timestamp: dt) -> List[str]:
+        """Removes every entry cached before the timestamp.
+
+        Returns:
+            The keys of the entries removed.
+        """
+        raise NotImplementedError
+
+    def keys(self) -> List[str]:
+        """Lists the keys of every stored entry"""
+        raise NotImplementedError
+
+    def sizes(self) -> List[Tuple[str, int]]:
+        """Lists the key and stored size of every entry, from the least to
+            the most recently cached.
+        """
+        entries = [(key, self.get(key)) for key in self.keys()]
+        entries.sort(key=lambda item: item[1][TIMESTAMP])
+        return [(key, response_size(entry[RESPONSE])) for key, entry in entries]
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Groups the changes made within the context, which backends may
+            write together.
+        """
+        yield
+
+    def flush(self) -> None:
+        """Writes any buffered changes to persistent storage"""
+
+    def close(self) -> None:
+        """Flushes changes and releases any open resources"""
+        self.flush()
+
+
+class MemoryBackend(CacheBackend):
+    """Keeps every entry in a dictionary for the life of the process"""
+
+    def __init__(self) -> None:
+        self._entries = {}
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        return self._entries.get(key)
+
+    def set(self, key: str, entry: CacheEntry) -> Optional[int]:
+        self._entries[key] = entry
+        return None
+
+    def touch(self,
+              key: str,
+              timestamp: dt,
+              validators: Optional[Dict[str, Optional[str]]] = None) -> None:
+        if key in self._entries:
+            self._entries[key][TIMESTAMP] = timestamp
+            if validators is not None:
+                self._entries[key].update(validators)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def delete_older_than(self, timestamp: dt) -> List[str]:
+        expired = [
+            key for key, entry in self._entries.items()
+            if entry[TIMESTAMP] <= timestamp
+        ]
+        for key in expired:
+            del self._entries[key]
+        return expired
+
+    def keys(self) -> List[str]:
+        return list(self._entries)
+
+
+class PickleBackend(MemoryBackend):
+    """Keeps every entry in memory and pickles the whole dictionary to a file
+        after a number of changes.
+
+    The file can be shared by several processes. Each write holds a lock on
+    a ``.lock`` file next to it, merges the entries other processes saved
+    since it was last read, and replaces the file in a single rename, so the
+    file is never left partially written. Entries saved by other processes
+    are read when a key is not found in memory.
+
+    Loading a pickle can run arbitrary code, so the file is only read if it
+    is owned by the current user and cannot be written by anyone else. Use
+    the :py:class:`SQLiteBackend` for a cache shared between users.
+    """
+
+    def __init__(self,
+                 path: str,
+                 buffer_size: int = 10,
+                 serialization: str = DEFAULT_FORMAT) -> None:
+        """Loads any entries previously saved to the file.
+
+        The responses are kept serialized in memory and in the file, so
+        loading the file does not decode them.
+
+        Args:
+            path: The location of the pickle file.
+            buffer_size: The number of changes to store in memory before
+                writing to the local file system.
+            serialization: The format the responses are stored in, such as
+                'json+zlib' or 'columnar+zstd'.
+        """
+        super().__init__()
+        self.path = path
+        self.serialization = check_format(serialization)
+        self._max_buffer = buffer_size
+        self._unsaved_changes = 0
+        # Keys changed or deleted since the file was last written
+        self._changed = set()
+        self._deleted = set()
+        # The inode, modification time and size of the file when it was last
+        # read, which change whenever it is replaced
+        self._file_version = None
+        self._refresh()
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self) -> None:
+        """Reads the file if another process has replaced it, keeping the
+            changes not yet written.
+        """
+        version = self._stat()
+        if version is None or version == self._file_version:
+            return
+        self._file_version = version
+        try:
+            if not _is_trusted(self.path):
+                # Replaced by a file of this user on the next write
+                return
+            with open(self.path, 'rb') as f:
+                entries = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # An unreadable file is replaced on the next write
+            return
+        for key in self._deleted:
+            entries.pop(key, None)
+        for key in self._changed:
+            entries[key] = self._entries[key]
+        self._entries = entries
+
+    def _lookup(self, key: str) -> Optional[CacheEntry]:
+        if key not in self._entries:
+            self._refresh()
+        return self._entries.get(key)
+
+    def _count_change(self, key: str, deleted: bool = False) -> None:
+        if deleted:
+            self._changed.discard(key)
+            self._deleted.add(key)
+        else:
+            self._deleted.discard(key)
+            self._changed.add(key)
+        self._unsaved_changes += 1
+        if self._unsaved_changes >= self._max_buffer:
+            self.flush()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        entry = dict(entry)
+        # Entries saved before responses were serialized hold the response
+        if isinstance(entry[RESPONSE], bytes):
+            entry[RESPONSE] = deserialize(entry[RESPONSE], allow_pickle=True)
+        return entry
+
+    def get_hash(self, key: str) -> Optional[str]:
+        entry = self._lookup(key)
+        if entry is None or CONTENT_HASH not in entry:
+            return super().get_hash(key)
+        return entry[CONTENT_HASH]
+
+    def get_validators(self, key: str) -> Optional[Dict[str, Optional[str]]]:
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        return {ETAG: entry.get(ETAG), LAST_MODIFIED: entry.get(LAST_MODIFIED)}
+
+    def set(self, key: str, entry: CacheEntry) -> Optional[int]:
+        entry = dict(entry)
+        response = serialize(entry[RESPONSE], self.serialization)
+        entry[RESPONSE] = response
+        super().set(key, entry)
+        self._count_change(key)
+        return len(response)
+
+    def touch(self,
+              key: str,
+              timestamp: dt,
+              validators: Optional[Dict[str, Optional[str]]] = None) -> None:
+        if self._lookup(key) is not None:
+            super().touch(key, timestamp, validators)
+            self._count_change(key)
+
+    def delete(self, key: str) -> None:
+        if self._lookup(key) is not None:
+            super().delete(key)
+            self._count_change(key, deleted=True)
+
+    def delete_older_than(self, timestamp: dt) -> List[str]:
+        self._refresh()
+        removed = super().delete_older_than(timestamp)
+        for key in removed:
+            self._count_change(key, deleted=True)
+        return removed
+
+    def sizes(self) -> List[Tuple[str, int]]:
+        entries = sorted(self._entries.items(),
+                         key=lambda item: item[1][TIMESTAMP])
+        return [(key, len(entry[RESPONSE]) if isinstance(
+            entry[RESPONSE], bytes) else response_size(entry[RESPONSE]))
+                for key, entry in entries]
+
+    def keys(self) -> List[str]:
+        self._refresh()
+        return super().keys()
+
+    def flush(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            with locked_file(self.path + '.lock'):
+                self._refresh()
+                fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        pickle.dump(self._entries, f, pickle.HIGHEST_PROTOCOL)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(temporary, self.path)
+                except BaseException:
+                    os.remove(temporary)
+                    raise
+                self._file_version = self._stat()
+        except PermissionError:
+            return
+        self._changed.clear()
+        self._deleted.clear()
+        self._unsaved_changes = 0
+
+
+class SQLiteBackend(CacheBackend):
+    """Stores each entry as a row of an SQLite database.
+
+    Entries are read and written one key at a time, so the cost of a write
+    does not depend on how many entries are cached, and entries are only
+    loaded from disk when they are requested.
+
+    The database can be shared by several processes. It is opened in
+    write-ahead log mode, so readers are not blocked by a process writing,
+    and writers wait for each other for up to ``timeout`` seconds.
+
+    The database may also be shared with other users or shipped as a
+    snapshot, so pickled responses, which can run arbitrary code when
+    loaded, are ignored and deleted unless ``allow_pickle`` is set.
+    """
+
+    def __init__(self,
+                 path: str,
+                 serialization: str = DEFAULT_FORMAT,
+                 timeout: float = 30.0,
+                 allow_pickle: bool = False) -> None:
+        """Opens, and creates if needed, the cache database.
+
+        Args:
+            path: The location of the database file, or ':memory:' for a
+                database which is not saved. Missing directories are
+                created.
+            serialization: The format new responses are stored in, such as
+                'json+zlib' or 'columnar+zstd'. Responses stored in other
+                formats are still read.
+            timeout: The number of seconds to wait for another process
+                writing to the database.
+            allow_pickle: Reads pickled responses, such as those cached by
+                earlier versions. Only set it for a database no one else can
+                write to.
+
+        Raises:
+            ValueError: A pickle format is chosen without ``allow_pickle``.
+        """
+        self.path = path
+        self.serialization = check_format(serialization)
+        self.allow_pickle = allow_pickle
+        if serialization.startswith('pickle') and not allow_pickle:
+            raise ValueError('Storing pickled responses needs allow_pickle')
+        self._lock = threading.RLock()
+        directory = os.path.dirname(path)
+        if path != ':memory:' and directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path,
+                                           timeout=timeout,
+                                           isolation_level=None,
+                                           check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                timestamp REAL NOT NULL,
+                content_hash TEXT NOT NULL,
+                response BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT
+            );
+            CREATE INDEX IF NOT EXISTS entries_timestamp
+                ON entries (timestamp);
+        """)
+        # Databases created before validators were stored lack their columns
+        columns = {
+            row[1] for row in self._connection.execute(
+                'PRAGMA table_info(entries)').fetchall()
+        }
+        for column in VALIDATORS:
+            if column not in columns:
+                try:
+                    self._connection.execute(
+                        f'ALTER TABLE entries ADD COLUMN {column} TEXT')
+                except sqlite3.OperationalError as e:
+                    # Another process may have just added the column
+                    if 'duplicate column' not in str(e):
+                        raise
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> int:
+        """Runs a statement and returns the number of rows changed"""
+        with self._lock:
+            return self._connection.execute(sql, parameters).rowcount
+
+    def _fetch(self, sql: str, parameters: tuple = ()) -> List[tuple]:
+        """Runs a query and returns all of its rows"""
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        rows = self._fetch(
+            'SELECT timestamp, content_hash, response, etag, last_modified '
+            'FROM entries WHERE key = ?', (key,))
+        if not rows:
+            return None
+        timestamp, digest, response, etag, last_modified = rows[0]
+        if is_pickled(response) and not self.allow_pickle:
+            self.delete(key)
+            return None
+        return {
+            TIMESTAMP: dt.fromtimestamp(timestamp),
+            RESPONSE: deserialize(response, self.allow_pickle),
+            CONTENT_HASH: digest,
+            ETAG: etag,
+            LAST_MODIFIED: last_modified,
+        }
+
+    def get_hash(self, key: str) -> Optional[str]:
+        rows = self._fetch('SELECT content_hash FROM entries WHERE key = ?',
+                           (key,))
+        return rows[0][0] if rows else None
+
+    def get_metadata(self, key: str) -> Optional[Tuple[dt, str]]:
+        rows = self._fetch(
+            'SELECT timestamp, content_hash FROM entries WHERE key = ?', (key,))
+        if not rows:
+            return None
+        return dt.fromtimestamp(rows[0][0]), rows[0][1]
+
+    def get_validators(self, key: str) -> Optional[Dict[str, Optional[str]]]:
+        rows = self._fetch(
+            'SELECT etag, last_modified FROM entries WHERE key = ?', (key,))
+        if not rows:
+            return None
+        return {ETAG: rows[0][0], LAST_MODIFIED: rows[0][1]}
+
+    def set(self, key: str, entry: CacheEntry) -> Optional[int]:
+        digest = entry.get(CONTENT_HASH) or content_hash(entry[RESPONSE])
+        response = serialize(entry[RESPONSE], self.serialization)
+        self._execute(
+            'INSERT OR REPLACE INTO entries (key, timestamp, content_hash, '
+            'response, etag, last_modified) VALUES (?, ?, ?, ?, ?, ?)',
+            (key, entry[TIMESTAMP].timestamp(), digest, response,
+             entry.get(ETAG), entry.get(LAST_MODIFIED)))
+        return len(response)
+
+    def touch(self,
+              key: str,
+              timestamp: dt,
+              validators: Optional[Dict[str, Optional[str]]] = None) -> None:
+        assignments = ['timestamp = ?']
+        values = [timestamp.timestamp()]
+        # Only the validators given are replaced
+        for name, column in ((ETAG, 'etag'), (LAST_MODIFIED, 'last_modified')):
+            if validators and name in validators:
+                assignments.append(f'{column} = ?')
+                values.append(validators[name])
+        values.append(key)
+        self._execute(
+            f'UPDATE entries SET {", ".join(assignments)} WHERE key = ?',
+            tuple(values))
+
+    def delete(self, key: str) -> None:
+        self._execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Writes the changes made within the context in one transaction"""
+        with self._lock, self._connection:
+            self._connection.execute('BEGIN IMMEDIATE')
+            yield
+
+    def delete_older_than(self, timestamp: dt) -> List[str]:
+        cutoff = (timestamp.timestamp(),)
+        with self._lock, self._connection:
+            self._connection.execute('BEGIN IMMEDIATE')
+            rows = self._connection.execute(
+                'SELECT key FROM entries WHERE timestamp <= ?',
+                cutoff).fetchall()
+            self._connection.execute('DELETE FROM entries WHERE timestamp <= ?',
+                                     cutoff)
+        return [row[0] for row in rows]
+
+    def keys(self) -> List[str]:
+        return [row[0] for row in self._fetch('SELECT key FROM entries')]
+
+    def sizes(self) -> List[Tuple[str, int]]:
+        return self._fetch('SELECT key, length(response) FROM entries '
+                           'ORDER BY timestamp')
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
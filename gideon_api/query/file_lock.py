@@ -0,0 +1,46 @@
+"""Provides exclusive locks on files shared between processes"""
+from contextlib import contextmanager
+from typing import IO, Iterator
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def locked_file(path: str) -> Iterator[IO[bytes]]:
+    """Opens a file for reading and writing while holding an exclusive lock.
+
+    The file is created if it does not exist. Other processes calling this
+    function on the same path wait until the lock is released.
+
+    Args:
+        path: The location of the file to lock.
+
+    Yields:
+        The open binary file object, positioned at the start of the file.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    with os.fdopen(fd, 'r+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            # Blocks, retrying for up to 10 seconds, then raises OSError
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            f.seek(0)
+            yield f
+        finally:
+            f.flush()
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
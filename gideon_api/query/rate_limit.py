@@ -0,0 +1,176 @@
+"""Limits the rate of calls to the GIDEON API with token buckets that can be
+    shared between threads and processes
+"""
+from time import monotonic, sleep, time
+from typing import Dict, Optional, Tuple
+import struct
+import threading
+from gideon_api.query.file_lock import locked_file
+
+# Number of tokens and the time they were counted, stored as two doubles
+_STATE_FORMAT = '<dd'
+_STATE_SIZE = struct.calcsize(_STATE_FORMAT)
+
+
+class TokenBucket:
+    """A token bucket allowing bursts of calls up to a sustained rate.
+
+    The bucket holds at most ``burst`` tokens and refills at ``rate`` tokens
+    per second. Every call takes one token. When the bucket is empty, the call
+    reserves a future token and waits exactly until that token is available,
+    so waiting callers are served in the order they arrived.
+
+    The bucket state is kept in memory and shared by all threads using the
+    bucket. If a ``state_file`` is given, the state is instead kept in that
+    file under an exclusive lock, so every process using the same file shares
+    one bucket.
+    """
+
+    def __init__(self,
+                 rate: float,
+                 burst: float = 1,
+                 state_file: Optional[str] = None) -> None:
+        """Initializes the token bucket.
+
+        Args:
+            rate: The sustained number of calls per second.
+            burst: The maximum number of calls which can be made at once
+                after the bucket has been idle.
+            state_file: Optional path of a file coordinating the bucket
+                between processes.
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        if burst < 1:
+            raise ValueError('burst must be at least 1')
+        self.rate = rate
+        self.burst = burst
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = monotonic()
+
+    def _refill(self, tokens: float, updated: float,
+                now: float) -> Tuple[float, float]:
+        return min(self.burst, tokens + (now - updated) * self.rate), now
+
+    def _reserve_in_memory(self, tokens: float) -> float:
+        with self._lock:
+            available, self._updated = self._refill(self._tokens, self._updated,
+                                                    monotonic())
+            self._tokens = available - tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def _reserve_in_file(self, tokens: float) -> float:
+        # Processes do not share a monotonic clock, so use the system time
+        now = time()
+        with self._lock, locked_file(self.state_file) as f:
+            state = f.read(_STATE_SIZE)
+            if len(state) == _STATE_SIZE:
+                available, _ = self._refill(
+                    *struct.unpack(_STATE_FORMAT, state), now)
+            else:
+                available = float(self.burst)
+            available -= tokens
+            f.seek(0)
+            f.write(struct.pack(_STATE_FORMAT, available, now))
+        return max(0.0, -available / self.rate)
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Takes tokens from the bucket without waiting.
+
+        Args:
+            tokens: The number of tokens to take.
+
+        Returns:
+            The number of seconds the caller must wait before the reserved
+                tokens may be used.
+        """
+        if self.state_file is None:
+            return self._reserve_in_memory(tokens)
+        return self._reserve_in_file(tokens)
+
+    def acquire(self, tokens: float = 1) -> float:
+        """Takes tokens from the bucket, waiting until they are available.
+
+        Args:
+            tokens: The number of tokens to take.
+
+        Returns:
+            The number of seconds spent waiting.
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            sleep(wait)
+        return wait
+
+
+class RateLimiter:
+    """Applies token buckets to calls based on the API path being called.
+
+    A call waits for the default bucket, if one is set, and for the bucket of
+    the most specific endpoint prefix matching its path.
+    """
+
+    def __init__(self,
+                 default: Optional[TokenBucket] = None,
+                 endpoints: Optional[Dict[str, TokenBucket]] = None) -> None:
+        """Initializes the rate limits.
+
+        Args:
+            default: The bucket limiting every call to the API.
+            endpoints: Maps API path prefixes, such as '/diseases/outbreaks',
+                to the bucket limiting calls to that part of the API.
+        """
+        self.default = default
+        self._endpoints = dict(endpoints or {})
+        self._lock = threading.Lock()
+        # Total time callers have been held back by the limits
+        self.waited_seconds = 0.0
+
+    @classmethod
+    def from_delay(cls, delay: Optional[float]) -> 'RateLimiter':
+        """Creates a limiter allowing one call every ``delay`` seconds"""
+        if delay is None or delay <= 0:
+            return cls()
+        return cls(TokenBucket(1 / delay))
+
+    def set_endpoint_limit(self, prefix: str,
+                           bucket: Optional[TokenBucket]) -> None:
+        """Sets, or removes if bucket is None, the limit of an endpoint"""
+        if bucket is None:
+            self._endpoints.pop(prefix, None)
+        else:
+            self._endpoints[prefix] = bucket
+
+    def endpoint_bucket(self, path: str) -> Optional[TokenBucket]:
+        """Finds the bucket of the longest prefix matching the path"""
+        best_prefix = None
+        for prefix in self._endpoints:
+            prefix_matches = path == prefix or path.startswith(
+                prefix.rstrip('/') + '/')
+            if prefix_matches and (best_prefix is None or
+                                   len(prefix) > len(best_prefix)):
+                best_prefix = prefix
+        return self._endpoints.get(best_prefix)
+
+    def acquire(self, path: str) -> float:
+        """Waits until a call to the API path is allowed.
+
+        Args:
+            path: The API path about to be called.
+
+        Returns:
+            The number of seconds spent waiting.
+        """
+        buckets = [
+            bucket for bucket in (self.default, self.endpoint_bucket(path))
+            if bucket is not None
+        ]
+        # Reserve from every bucket first so the waits overlap
+        wait = max([bucket.reserve() for bucket in buckets], default=0.0)
+        if wait > 0:
+            sleep(wait)
+            with self._lock:
+                self.waited_seconds += wait
+        return wait
@@ -0,0 +1,231 @@
+"""Records responses of the GIDEON API to fixture files and replays them
+
+A :py:class:`RecordingTransport` wraps a transport and saves every response
+it receives, and a :py:class:`ReplayTransport` answers requests from the
+saved fixtures without a network, so the client can be tested and measured
+reproducibly. The fixtures can also be served over HTTP by
+:py:class:`gideon_api.query.standin.StandInServer`.
+
+Each fixture is a JSON file holding the path, parameters, status, headers and
+body of one response. The API key is never recorded.
+"""
+from typing import TYPE_CHECKING, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse
+import argparse
+import hashlib
+import io
+import json
+import os.path
+import re
+import sys
+import threading
+from gideon_api import PARAMS
+
+if TYPE_CHECKING:
+    import requests
+
+# Response headers kept in the fixtures
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+_UNSAFE_CHARACTERS = re.compile(r'[^0-9A-Za-z]+')
+
+Fixture = Dict[str, object]
+
+
+def fixture_name(path: str, params: Optional[PARAMS] = None) -> str:
+    """The file name of the fixture of a request.
+
+    The name is readable from the path, with a hash of the parameters when
+    there are any, e.g. ``diseases_outbreaks-3f1c0b9e2a.json``.
+    """
+    name = _UNSAFE_CHARACTERS.sub('_', path).strip('_') or 'root'
+    if params:
+        query = urlencode(
+            sorted((key, str(value)) for key, value in params.items()))
+        name += '-' + hashlib.sha1(query.encode('utf-8')).hexdigest()[:10]
+    return name + '.json'
+
+
+class FixtureStore:
+    """A directory of recorded responses"""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, path: str, params: Optional[PARAMS]) -> str:
+        return os.path.join(self.directory, fixture_name(path, params))
+
+    def save(self, path: str, params: Optional[PARAMS], status: int,
+             headers: Dict[str, str], body: str) -> None:
+        """Saves a response, replacing any response of the same request"""
+        fixture = {
+            'path': path,
+            'params': {
+                key: str(value) for key, value in (params or {}).items()
+            },
+            'status': status,
+            'headers': {
+                name: headers[name]
+                for name in RECORDED_HEADERS
+                if name in headers
+            },
+            'body': body,
+        }
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(path, params), 'w', encoding='utf-8') as f:
+                json.dump(fixture, f, ensure_ascii=False, indent=1)
+
+    def load(self,
+             path: str,
+             params: Optional[PARAMS] = None) -> Optional[Fixture]:
+        """Reads the response of a request, or None if it was not recorded"""
+        try:
+            with open(self._path(path, params), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def paths(self) -> List[str]:
+        """Lists the API paths with a recorded response"""
+        if not os.path.isdir(self.directory):
+            return []
+        paths = set()
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                with open(os.path.join(self.directory, name),
+                          encoding='utf-8') as f:
+                    paths.add(json.load(f)['path'])
+        return sorted(paths)
+
+
+def answer(fixture: Fixture,
+           headers: Optional[Dict[str, str]] = None) -> Fixture:
+    """The response to send for a fixture, answering a conditional request
+        with 304 Not Modified if the recorded response has not changed.
+    """
+    recorded = fixture['headers']
+    etag = recorded.get('ETag')
+    if (etag is not None and headers and
+            headers.get('If-None-Match') == etag and fixture['status'] == 200):
+        return {'status': 304, 'headers': {'ETag': etag}, 'body': ''}
+    return fixture
+
+
+def to_response(fixture: Fixture, url: str = '') -> 'requests.Response':
+    """Builds the response of a fixture, as if it was read from the network"""
+    import requests
+    r = requests.Response()
+    r.status_code = fixture['status']
+    r.headers.update(fixture['headers'])
+    r.url = url
+    r.encoding = 'utf-8'
+    r.raw = io.BytesIO(fixture['body'].encode('utf-8'))
+    return r
+
+
+class RecordingTransport:
+    """Sends requests with another transport and saves every response as a
+        fixture.
+    """
+
+    def __init__(self, transport, directory: str) -> None:
+        """Initializes the recorder.
+
+        Args:
+            transport: The transport sending the requests, such as an
+                :py:class:`HTTPTransport`.
+            directory: The directory the fixtures are saved in.
+        """
+        self.transport = transport
+        self.fixtures = FixtureStore(directory)
+
+    @property
+    def last_timing(self):
+        return getattr(self.transport, 'last_timing', None)
+
+    def get(self,
+            url: str,
+            params: Optional[PARAMS] = None,
+            headers: Optional[Dict[str, str]] = None,
+            stream: bool = False) -> 'requests.Response':
+        """Sends a request and records its response. The body is read in
+            full even when streaming, to be saved.
+        """
+        r = self.transport.get(url, params=params, headers=headers)
+        # Revalidations are not recorded, so the full response is kept
+        if r.status_code != 304:
+            self.fixtures.save(
+                urlparse(url).path, params, r.status_code, r.headers,
+                r.content.decode('utf-8'))
+        return r
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class ReplayTransport:
+    """Answers requests from recorded fixtures instead of the network.
+
+    Conditional requests are answered with 304 Not Modified when the
+    recorded ETag matches, so caching behaves as it does online.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """Initializes the transport.
+
+        Args:
+            directory: The directory of the fixtures.
+        """
+        self.fixtures = FixtureStore(directory)
+        self.last_timing = None
+
+    def get(self,
+            url: str,
+            params: Optional[PARAMS] = None,
+            headers: Optional[Dict[str, str]] = None,
+            stream: bool = False) -> 'requests.Response':
+        """Builds the recorded response of a request.
+
+        Raises:
+            FileNotFoundError: If the request was not recorded.
+        """
+        fixture = self.fixtures.load(urlparse(url).path, params)
+        if fixture is None:
+            raise FileNotFoundError(f'No recorded response for {url} with '
+                                    f'parameters {params or {}}')
+        return to_response(answer(fixture, headers), url)
+
+    def close(self) -> None:
+        pass
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Records the responses of API paths with the live API"""
+    from gideon_api import gideon_api
+    parser = argparse.ArgumentParser(
+        prog='python -m gideon_api.query.replay',
+        description='Records GIDEON API responses to fixture files.')
+    parser.add_argument('directory', help='directory of the fixtures')
+    parser.add_argument('paths',
+                        nargs='+',
+                        help='API paths to record, with any parameters, e.g. '
+                        '/diseases/outbreaks?year=2020')
+    args = parser.parse_args(argv)
+
+    gideon_api.transport = RecordingTransport(gideon_api.transport,
+                                              args.directory)
+    for path in args.paths:
+        url = urlparse(path)
+        try:
+            gideon_api.query_gideon_api_online(url.path,
+                                               dict(parse_qsl(url.query)))
+        except (ConnectionError, ValueError) as e:
+            print(f'{path}: {e}', file=sys.stderr)
+    gideon_api.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""Retries failed calls to the GIDEON API with exponential backoff and stops
+    calling the API while it is unavailable
+"""
+from datetime import datetime as dt, timezone
+from time import monotonic
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+import random
+import threading
+
+if TYPE_CHECKING:
+    import requests
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling the API while the circuit breaker is open"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converts a Retry-After header to a number of seconds to wait.
+
+    Args:
+        value: The header value, either a number of seconds or an HTTP date.
+
+    Returns:
+        The number of seconds to wait, or None if the header is missing or
+            cannot be parsed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    # Only imported when needed, since it is slow to import
+    from email.utils import parsedate_to_datetime
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - dt.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """Describes when and how long to wait before retrying a failed call"""
+
+    def __init__(self,
+                 max_attempts: int = 5,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0,
+                 jitter: bool = True,
+                 retry_statuses: Iterable[int] = RETRY_STATUS_CODES,
+                 respect_retry_after: bool = True,
+                 deadline: Optional[float] = None,
+                 max_retry_after: Optional[float] = 300.0) -> None:
+        """Initializes the retry policy.
+
+        Args:
+            max_attempts: The maximum number of times a call is sent,
+                including the first attempt.
+            backoff_base: The wait, in seconds, before the first retry. The
+                wait doubles with every following retry.
+            backoff_max: The longest wait, in seconds, between two attempts.
+            jitter: If true, each wait is drawn uniformly between zero and
+                the exponential backoff so clients do not retry in lockstep.
+            retry_statuses: The HTTP status codes which are retried.
+            respect_retry_after: If true, the wait requested by the server
+                with a Retry-After header is used in full when present,
+                since a call retried earlier would be refused again.
+            deadline: The maximum time, in seconds, spent on one call
+                including all retries and waits.
+            max_retry_after: The longest wait, in seconds, requested with a
+                Retry-After header which the client waits for. If the server
+                asks for a longer wait, the call gives up at once with the
+                server's response. If None, any wait is honored.
+        """
+        if max_attempts < 1:
+            raise ValueError('max_attempts must be at least 1')
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.respect_retry_after = respect_retry_after
+        self.deadline = deadline
+        self.max_retry_after = max_retry_after
+
+    @classmethod
+    def never(cls) -> 'RetryPolicy':
+        """A policy which sends every call only once"""
+        return cls(max_attempts=1)
+
+    def backoff(self, retry: int) -> float:
+        """The wait, in seconds, before the given retry (starting at 0)"""
+        wait = min(self.backoff_max, self.backoff_base * 2**retry)
+        if self.jitter:
+            wait = random.uniform(0, wait)
+        return wait
+
+    def retry_after(
+            self,
+            response: Optional['requests.Response'] = None) -> Optional[float]:
+        """The wait requested by the server with a Retry-After header, if it
+            is honored.
+        """
+        if not self.respect_retry_after or response is None:
+            return None
+        return parse_retry_after(response.headers.get('Retry-After'))
+
+    def retry_delay(self,
+                    retry: int,
+                    response: Optional['requests.Response'] = None) -> float:
+        """The wait before a retry, the whole wait requested by the server's
+            Retry-After if any.
+        """
+        retry_after = self.retry_after(response)
+        if retry_after is not None:
+            return retry_after
+        return self.backoff(retry)
+
+    def waits_too_long(self,
+                       response: Optional['requests.Response'] = None) -> bool:
+        """Whether the server asks for a longer wait than
+            ``max_retry_after``, so the call should not be retried.
+        """
+        retry_after = self.retry_after(response)
+        return (retry_after is not None and self.max_retry_after is not None and
+                retry_after > self.max_retry_after)
+
+    def should_retry(self, response: 'requests.Response') -> bool:
+        return response.status_code in self.retry_statuses
+
+
+class RetryStats:
+    """Running totals of the retries made by a client"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self.gave_up = 0
+        self.rejected_by_circuit = 0
+
+    def record(self, **counts: float) -> None:
+        """Adds to the named totals, e.g. ``record(retries=1)``"""
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'retries': self.retries,
+                'backoff_seconds': self.backoff_seconds,
+                'gave_up': self.gave_up,
+                'rejected_by_circuit': self.rejected_by_circuit,
+            }
+
+
+class CircuitBreaker:
+    """Fails calls immediately after repeated failures, until a cool down
+        period has passed.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls raise :py:class:`CircuitOpenError` without contacting the server.
+    Once ``reset_timeout`` seconds have passed, a single trial call is let
+    through. If it succeeds the circuit closes, otherwise it opens again.
+    """
+
+    def __init__(self,
+                 failure_threshold: int = 5,
+                 reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def before_call(self) -> bool:
+        """Checks that a call may be sent.
+
+        Returns:
+            True if the call is the trial call of an open circuit, which
+                must be ended with :py:meth:`end_trial` however it finishes.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            cooling_down = monotonic() - self._opened_at < self.reset_timeout
+            if cooling_down or self._trial_running:
+                raise CircuitOpenError(
+                    'GIDEON API unavailable, not retrying until '
+                    f'{self.reset_timeout} seconds after the last failure')
+            self._trial_running = True
+            return True
+
+    def end_trial(self) -> None:
+        """Lets another trial call through once the cool down has passed.
+
+        Called in a ``finally`` block after the trial call, so that a trial
+        ending with an error recorded neither as a success nor as a failure
+        does not keep the circuit open for good.
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = monotonic()
+            self._trial_running = False
@@ -0,0 +1,237 @@
+"""Converts API responses to DataFrames with compact column types
+
+Each column is built directly from the JSON records. Columns repeating a few
+values, such as country codes and disease names, become categoricals, and
+numbers, including numbers sent as strings such as latitudes, become 64-bit
+numeric columns instead of columns of Python objects. Codes keep one type
+across endpoints, so that outbreaks can be merged with the catalogs.
+"""
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+import itertools
+import re
+from gideon_api import JSON
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    import pyarrow
+
+# Column types of a schema
+CATEGORY = 'category'
+INTEGER = 'integer'
+FLOAT = 'float'
+OBJECT = 'object'
+# Infers the type from the values of the column
+AUTO = 'auto'
+
+Schema = Dict[str, str]
+
+# A column is stored as a categorical if it has at most this fraction of
+# distinct values
+CATEGORY_RATIO = 0.5
+
+# Codes joining the outbreak responses with the catalogs, which have the
+# same type in every schema so that the frames can be merged on them
+_KEY_TYPES = {
+    'country_code': CATEGORY,
+    'region_code': CATEGORY,
+    'disease_code': INTEGER,
+}
+
+# Columns shared by the outbreak and distribution responses, which repeat
+# the same countries and diseases on many rows
+_OUTBREAK_SCHEMA = {
+    **_KEY_TYPES,
+    'country': CATEGORY,
+    'region': CATEGORY,
+    'disease': CATEGORY,
+    'latitude': FLOAT,
+    'longitude': FLOAT,
+    'year': INTEGER,
+    'start_year': INTEGER,
+    'end_year': INTEGER,
+}
+
+
+def _catalog_schema(id_key: str, name_key: str) -> Schema:
+    """Every item of a category has its own code and name"""
+    return {
+        id_key: _KEY_TYPES.get(id_key, AUTO),
+        name_key: OBJECT,
+        'latitude': FLOAT,
+        'longitude': FLOAT
+    }
+
+
+# Schemas of the endpoints used by gideon_api.diseases and gideon_api.codes,
+# matched against the API path in order
+ENDPOINT_SCHEMAS = [
+    (re.compile(r'/diseases/outbreaks(/distribution/[^/]+)?'),
+     _OUTBREAK_SCHEMA),
+    (re.compile(r'/diseases/countries/[^/]+(/latest-outbreaks)?'),
+     _OUTBREAK_SCHEMA),
+    (re.compile(r'/diseases/\d+/(outbreaks|countries)'), _OUTBREAK_SCHEMA),
+    (re.compile(r'/diseases/filter'), _catalog_schema('disease_code',
+                                                      'disease')),
+    (re.compile(r'/diseases'), _catalog_schema('disease_code', 'disease')),
+    (re.compile(r'/diseases/fingerprint/agents'),
+     _catalog_schema('agent_code', 'agent')),
+    (re.compile(r'/diseases/fingerprint/vectors'),
+     _catalog_schema('vector_code', 'vector')),
+    (re.compile(r'/diseases/fingerprint/vehicles'),
+     _catalog_schema('vehicle_code', 'vehicle')),
+    (re.compile(r'/diseases/fingerprint/reservoirs'),
+     _catalog_schema('reservoir_code', 'reservoir')),
+    (re.compile(r'/diseases/fingerprint/countries'),
+     _catalog_schema('country_code', 'country')),
+    (re.compile(r'/drugs'), _catalog_schema('drug_code', 'drug')),
+    (re.compile(r'/vaccines'), _catalog_schema('vaccine_code', 'vaccine')),
+    (re.compile(r'/microbiology/bacteria'),
+     _catalog_schema('bacteria_code', 'bacteria')),
+    (re.compile(r'/microbiology/mycobacteria'),
+     _catalog_schema('mycobacteria_code', 'mycobacteria')),
+    (re.compile(r'/microbiology/yeasts'),
+     _catalog_schema('yeast_code', 'yeast')),
+    (re.compile(r'/countries'), _catalog_schema('country_code', 'country')),
+    (re.compile(r'/travel/regions'), _catalog_schema('region_code', 'region')),
+]
+
+
+def endpoint_schema(api_path: Optional[str]) -> Schema:
+    """Finds the schema of an API path, or an empty schema inferring the
+        type of every column.
+    """
+    if api_path is not None:
+        for pattern, schema in ENDPOINT_SCHEMAS:
+            if pattern.fullmatch(api_path):
+                return schema
+    return {}
+
+
+def records_to_columns(records: List[JSON]) -> Dict[str, List[Any]]:
+    """Transposes a list of records into a list of values per column, with
+        None where a record lacks a column.
+    """
+    # Iterating with map and chain keeps the loops over the records in C
+    names = dict.fromkeys(itertools.chain.from_iterable(records))
+    return {
+        column: list(map(dict.get, records, itertools.repeat(column)))
+        for column in names
+    }
+
+
+def _value_types(values: List[Any]) -> set:
+    """The types of the values of a column, other than None"""
+    types = set(map(type, values))
+    types.discard(type(None))
+    return types
+
+
+def _convert(values: List[Any], kind: str) -> Any:
+    """Builds the array of a column from its values"""
+    import numpy
+    import pandas
+    types = _value_types(values)
+    if kind == AUTO:
+        if types == {int}:
+            kind = INTEGER
+        elif types and types <= {int, float}:
+            kind = FLOAT
+        elif (types == {str} and
+              len(set(values)) <= CATEGORY_RATIO * len(values)):
+            kind = CATEGORY
+        else:
+            kind = OBJECT
+
+    if kind == CATEGORY:
+        try:
+            return pandas.Categorical(values)
+        except TypeError:
+            # Unhashable values, such as nested lists, cannot be categorized
+            return values
+    if kind == FLOAT:
+        if None not in values:
+            try:
+                return numpy.array(values, dtype='float64')
+            except (TypeError, ValueError):
+                pass
+        return pandas.to_numeric(pandas.Series(values, dtype=object),
+                                 errors='coerce').to_numpy(dtype='float64')
+    if kind == INTEGER:
+        if types != {int}:
+            return _convert(values, FLOAT)
+        if None in values:
+            return pandas.array(values, dtype='Int64')
+        # Not downcast, so that arithmetic on the column cannot overflow
+        return numpy.array(values, dtype='int64')
+    return values
+
+
+def to_typed_dataframe(records: List[JSON],
+                       api_path: Optional[str] = None,
+                       schema: Optional[Schema] = None) -> 'DataFrame':
+    """Converts the records of an API response to a DataFrame, using the
+        column types of the endpoint's schema.
+
+    Args:
+        records: The records listed under the 'data' key of the response.
+        api_path: The API path the records were returned from, used to find
+            the schema if one is not given.
+        schema: Maps column names to one of the types 'category', 'integer',
+            'float', 'object' or 'auto'. Columns not in the schema are
+            inferred.
+
+    Returns:
+        A DataFrame with a column per key of the records, in the order the
+            keys first appear.
+    """
+    if schema is None:
+        schema = endpoint_schema(api_path)
+    return columns_to_dataframe(records_to_columns(records), schema)
+
+
+def columns_to_dataframe(columns: Dict[str, List[Any]],
+                         schema: Optional[Schema] = None) -> 'DataFrame':
+    """Builds a DataFrame from lists of column values, using the column
+        types of the schema and inferring the others.
+    """
+    from pandas import DataFrame
+    schema = schema or {}
+    data = {
+        column: _convert(values, schema.get(column, AUTO))
+        for column, values in columns.items()
+    }
+    return DataFrame(data, columns=list(columns))
+
+
+def arrow_schema(frame: 'DataFrame',
+                 schema: Optional[Schema] = None) -> 'pyarrow.Schema':
+    """The Arrow schema to write a DataFrame to Parquet with, so that files
+        written from different responses share one schema.
+
+    Columns of the schema get the type of their kind whatever their values.
+    Other columns are float64 if numeric, null if every value is missing,
+    and strings otherwise. Requires the pyarrow package.
+    """
+    import pyarrow
+    types = {
+        CATEGORY: pyarrow.dictionary(pyarrow.int32(), pyarrow.string()),
+        INTEGER: pyarrow.int64(),
+        FLOAT: pyarrow.float64(),
+        OBJECT: pyarrow.string(),
+    }
+    schema = schema or {}
+    fields = []
+    for column in frame.columns:
+        kind = schema.get(column, AUTO)
+        if kind in types:
+            arrow_type = types[kind]
+        elif frame[column].isna().all():
+            arrow_type = pyarrow.null()
+        elif frame[column].dtype.kind in 'iuf':
+            arrow_type = pyarrow.float64()
+        elif frame[column].dtype.kind == 'b':
+            arrow_type = pyarrow.bool_()
+        else:
+            arrow_type = pyarrow.string()
+        fields.append(pyarrow.field(column, arrow_type))
+    return pyarrow.schema(fields)
@@ -0,0 +1,203 @@
+"""Serializes cached responses to compact byte strings
+
+A serialized response starts with the name of its format, such as
+``json+zlib``, followed by a newline and the encoded response. The format
+names an encoding:
+
+* ``json``: The response as UTF-8 JSON text.
+* ``columnar``: The records of the 'data' array stored as a list of values
+  per column, so the keys are not repeated on every record. Responses
+  without an array of records fall back to ``json``.
+* ``pickle``: The response pickled, as the cache stored it before.
+  Loading a pickle can run arbitrary code, so pickles are only decoded when
+  ``allow_pickle`` is passed, for data written by a trusted process.
+
+and optionally a compression: ``gzip`` and ``zlib`` from the standard
+library, ``zstd`` with the zstandard package or ``lz4`` with the lz4
+package. Responses cached before formats were named are raw pickles, which
+are still read.
+"""
+from typing import Any, Tuple
+import gzip
+import json
+import pickle
+import zlib
+from gideon_api.query.schema import records_to_columns
+
+# The format used by the cache backends unless another is chosen. JSON
+# cannot run code when read from a cache shared with other users or shipped
+# as a snapshot, and compressing it takes a seventh of the space for a little
+# more time (``python -m benchmarks.cache_formats``).
+DEFAULT_FORMAT = 'json+zlib'
+
+_SEPARATOR = b'\n'
+# The first byte of a pickle of protocol 2 or above
+_PICKLE_PROTOCOL = b'\x80'
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def _json_loads(data: bytes) -> Any:
+    return json.loads(data.decode('utf-8'))
+
+
+def _is_tabular(value: Any) -> bool:
+    """Checks if a response holds an array of records under 'data'"""
+    if not isinstance(value, dict):
+        return False
+    records = value.get('data')
+    return (isinstance(records, list) and bool(records) and
+            all(isinstance(record, dict) for record in records))
+
+
+def _columnar_dumps(value: Any) -> bytes:
+    records = value['data']
+    columns = records_to_columns(records)
+    # Distinguishes records lacking a key from records with a null value
+    absent = {}
+    for column in columns:
+        missing = [
+            row for row, record in enumerate(records) if column not in record
+        ]
+        if missing:
+            absent[column] = missing
+    return _json_dumps({
+        'keys': list(value),
+        'other': {
+            key: item for key, item in value.items() if key != 'data'
+        },
+        'rows': len(records),
+        'columns': columns,
+        'absent': absent,
+    })
+
+
+def _columnar_loads(data: bytes) -> Any:
+    encoded = _json_loads(data)
+    columns = encoded['columns']
+    names = list(columns)
+    if names:
+        records = [dict(zip(names, row)) for row in zip(*columns.values())]
+    else:
+        records = [{} for _ in range(encoded['rows'])]
+    for column, rows in encoded['absent'].items():
+        for row in rows:
+            del records[row][column]
+    other = encoded['other']
+    return {
+        key: records if key == 'data' else other[key] for key in encoded['keys']
+    }
+
+
+def _pickle_dumps(value: Any) -> bytes:
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _zstd_compress(data: bytes) -> bytes:
+    import zstandard
+    return zstandard.ZstdCompressor(level=3).compress(data)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    import zstandard
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def _lz4_compress(data: bytes) -> bytes:
+    import lz4.frame
+    return lz4.frame.compress(data)
+
+
+def _lz4_decompress(data: bytes) -> bytes:
+    import lz4.frame
+    return lz4.frame.decompress(data)
+
+
+ENCODINGS = {
+    'json': (_json_dumps, _json_loads),
+    'columnar': (_columnar_dumps, _columnar_loads),
+    'pickle': (_pickle_dumps, pickle.loads),
+}
+
+COMPRESSIONS = {
+    'gzip':
+        (lambda data: gzip.compress(data, compresslevel=6), gzip.decompress),
+    'zlib': (zlib.compress, zlib.decompress),
+    'zstd': (_zstd_compress, _zstd_decompress),
+    'lz4': (_lz4_compress, _lz4_decompress),
+}
+
+
+def _parse_format(name: str) -> Tuple[str, str]:
+    """Splits a format name into its encoding and compression"""
+    encoding, _, compression = name.partition('+')
+    if encoding not in ENCODINGS or (compression and
+                                     compression not in COMPRESSIONS):
+        raise ValueError(f'Unknown cache format: "{name}"')
+    return encoding, compression
+
+
+def check_format(name: str) -> str:
+    """Validates a format name, raising ImportError if it needs a package
+        which is not installed.
+    """
+    _, compression = _parse_format(name)
+    if compression:
+        COMPRESSIONS[compression][0](b'')
+    return name
+
+
+def serialize(value: Any, name: str = DEFAULT_FORMAT) -> bytes:
+    """Serializes a response in a format.
+
+    Args:
+        value: The JSON response, represented as Python objects.
+        name: The format, such as 'json+gzip' or 'columnar+zstd'.
+
+    Returns:
+        The name of the format used, which differs from the one requested
+            if a response without records cannot be stored by column, a
+            newline and the encoded response.
+    """
+    encoding, compression = _parse_format(name)
+    if encoding == 'columnar' and not _is_tabular(value):
+        encoding = 'json'
+    data = ENCODINGS[encoding][0](value)
+    if compression:
+        data = COMPRESSIONS[compression][0](data)
+        encoding = f'{encoding}+{compression}'
+    return encoding.encode('ascii') + _SEPARATOR + data
+
+
+def is_pickled(data: bytes) -> bool:
+    """Checks if a serialized response is a pickle"""
+    if data[:1] == _PICKLE_PROTOCOL:
+        return True
+    name = data.partition(_SEPARATOR)[0]
+    return name.partition(b'+')[0] == b'pickle'
+
+
+def deserialize(data: bytes, allow_pickle: bool = False) -> Any:
+    """Decodes a serialized response, whichever format it is in.
+
+    Args:
+        data: The serialized response.
+        allow_pickle: Decodes pickled responses, which can run arbitrary
+            code, so only pass it for data written by a trusted process.
+
+    Raises:
+        ValueError: The response is pickled and ``allow_pickle`` is false,
+            or its format is unknown.
+    """
+    if is_pickled(data) and not allow_pickle:
+        raise ValueError('Refusing to load a pickled cache response')
+    if data[:1] == _PICKLE_PROTOCOL:
+        return pickle.loads(data)
+    name, _, data = data.partition(_SEPARATOR)
+    encoding, compression = _parse_format(name.decode('ascii'))
+    if compression:
+        data = COMPRESSIONS[compression][1](data)
+    return ENCODINGS[encoding][1](data)
@@ -0,0 +1,78 @@
+"""Shares the result of one call between concurrent callers asking for the
+    same thing
+"""
+from typing import Any, Callable
+import threading
+
+
+class _Call:
+    """A call in progress, which callers arriving later wait on"""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls with the same key.
+
+    While a call for a key is running, other threads calling with the same key
+    wait for it to finish and receive its result, or its exception, instead of
+    making the call again. Once the call finishes, the next call for the key
+    runs again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls = {}
+        # The number of calls which were answered by another caller's call
+        self.coalesced = 0
+
+    def in_flight(self) -> int:
+        """The number of keys with a call currently running"""
+        with self._lock:
+            return len(self._calls)
+
+    def running(self, key: str) -> bool:
+        """Checks if a call with the key is currently running"""
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key: str, func: Callable[..., Any], *args) -> Any:
+        """Calls the function, unless a call with the same key is already
+            running, in which case its result is returned.
+
+        Args:
+            key: Identifies calls which return the same result.
+            func: The function to call.
+            *args: The arguments passed to the function.
+
+        Returns:
+            The return value of the function.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
@@ -0,0 +1,226 @@
+"""A local HTTP server standing in for the GIDEON API
+
+The server answers requests from the fixtures recorded by
+:py:class:`gideon_api.query.replay.RecordingTransport`, adding latency,
+server errors and rate limiting as configured, so the throughput, retries
+and caching of the client can be measured without a network::
+
+    with StandInServer('fixtures', latency=0.05, error_rate=0.1) as server:
+        client = GIDEON(api_key, api_origin=server.origin)
+"""
+from collections import deque
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from time import monotonic, sleep
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlparse
+import argparse
+import json
+import random
+import sys
+import threading
+from gideon_api.query.replay import FixtureStore, answer
+
+
+class StandInStats:
+    """Running totals of the requests answered by a stand-in server"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.not_modified = 0
+        self.not_found = 0
+
+    def record(self, **counts: int) -> None:
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'throttled': self.throttled,
+                'not_modified': self.not_modified,
+                'not_found': self.not_found,
+            }
+
+
+class _ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keeps connections open so the client's connection pool is exercised
+    protocol_version = 'HTTP/1.1'
+    server_version = 'GIDEONStandIn'
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send(self, status: int, headers: Dict[str, str], body: str) -> None:
+        data = body.encode('utf-8')
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        stand_in = self.server.stand_in
+        stand_in.stats.record(requests=1)
+        if stand_in.throttle():
+            stand_in.stats.record(throttled=1)
+            self._send(429, {'Retry-After': str(stand_in.retry_after)}, '')
+            return
+        if stand_in.latency:
+            sleep(stand_in.latency)
+        if stand_in.fail():
+            stand_in.stats.record(errors=1)
+            self._send(503, {}, '')
+            return
+
+        url = urlparse(self.path)
+        fixture = stand_in.fixtures.load(url.path, dict(parse_qsl(url.query)))
+        if fixture is None:
+            stand_in.stats.record(not_found=1)
+            self._send(404, {'Content-Type': 'application/json'},
+                       json.dumps({'message': 'Not Found'}))
+            return
+        fixture = answer(fixture, dict(self.headers.items()))
+        if fixture['status'] == 304:
+            stand_in.stats.record(not_modified=1)
+        self._send(fixture['status'], fixture['headers'], fixture['body'])
+
+
+class StandInServer:
+    """Serves recorded GIDEON API responses on a local port.
+
+    Attributes:
+        origin: The origin to pass as ``api_origin`` to :py:class:`GIDEON`.
+        stats: Counts of the requests answered, errors, throttled requests
+            and other outcomes.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 latency: float = 0.0,
+                 error_rate: float = 0.0,
+                 rate_limit: Optional[float] = None,
+                 retry_after: int = 1,
+                 port: int = 0,
+                 seed: Optional[int] = None) -> None:
+        """Starts the server in a background thread.
+
+        Args:
+            directory: The directory of the recorded fixtures.
+            latency: Seconds added before every response.
+            error_rate: The fraction of requests, from 0 to 1, answered with
+                503 Service Unavailable.
+            rate_limit: If set, requests beyond this many per second are
+                answered with 429 Too Many Requests.
+            retry_after: The whole number of seconds sent in the Retry-After
+                header of throttled requests.
+            port: The port to listen on, by default any free port.
+            seed: Seeds the random errors, to repeat the same sequence.
+        """
+        self.fixtures = FixtureStore(directory)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.stats = StandInStats()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # The times of the requests accepted in the last second
+        self._recent = deque()
+        self._server = _ThreadingServer(('127.0.0.1', port), _Handler)
+        self._server.stand_in = self
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='gideon-api-stand-in',
+                                        daemon=True)
+        self._thread.start()
+
+    @property
+    def origin(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def throttle(self) -> bool:
+        """Checks if a request exceeds the rate limit"""
+        if self.rate_limit is None:
+            return False
+        now = monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] >= 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                return True
+            self._recent.append(now)
+            return False
+
+    def fail(self) -> bool:
+        """Decides if a request is answered with a server error"""
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def close(self) -> None:
+        """Stops the server"""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self) -> 'StandInServer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Serves fixtures until interrupted"""
+    parser = argparse.ArgumentParser(
+        prog='python -m gideon_api.query.standin',
+        description='Serves recorded GIDEON API responses. Point clients at '
+        'it with the GIDEON_API_ORIGIN environment variable.')
+    parser.add_argument('directory', help='directory of the fixtures')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency',
+                        type=float,
+                        default=0.0,
+                        help='seconds added to every response')
+    parser.add_argument('--error-rate',
+                        type=float,
+                        default=0.0,
+                        help='fraction of requests answered with 503')
+    parser.add_argument('--rate-limit',
+                        type=float,
+                        help='requests per second before answering 429')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    server = StandInServer(args.directory,
+                           latency=args.latency,
+                           error_rate=args.error_rate,
+                           rate_limit=args.rate_limit,
+                           port=args.port,
+                           seed=args.seed)
+    print(f'Serving {len(server.fixtures.paths())} API paths at '
+          f'{server.origin}')
+    try:
+        while True:
+            sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print(json.dumps(server.stats.as_dict()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Parses JSON responses incrementally as they are downloaded
+
+The records of a response's 'data' array are decoded one at a time from the
+response stream, so the raw body and its decoded text are never held in
+memory in full.
+"""
+from typing import (TYPE_CHECKING, Any, Iterable, Iterator, List, Optional,
+                    Tuple)
+import codecs
+import json
+import re
+from gideon_api import JSON
+
+if TYPE_CHECKING:
+    import requests
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# The characters which may continue a number
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+_DECODER = json.JSONDecoder()
+# The closing braces tried as the end of the objects decoded together
+_BATCH_ATTEMPTS = 2
+
+
+def response_text(r: 'requests.Response',
+                  chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Reads the body of a response as text, one chunk at a time.
+
+    JSON is UTF-8 unless the response declares another charset.
+    """
+    decoder = codecs.getincrementaldecoder(r.encoding or 'utf-8')()
+    if r.raw is None:
+        # The body has already been read into memory
+        byte_chunks = [r.content]
+    else:
+        byte_chunks = r.iter_content(chunk_size)
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def close_response(r: 'requests.Response') -> None:
+    """Returns the connection of a response to the pool, discarding any
+        unread part of the body.
+    """
+    if r.raw is not None:
+        r.close()
+
+
+class _JSONReader:
+    """Decodes JSON values from a stream of text chunks.
+
+    Only the unread part of the current chunk, and any value spanning
+    chunks, is kept in memory.
+    """
+
+    def __init__(self, chunks: Iterable[str]) -> None:
+        self._chunks = iter(chunks)
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        # Counts the chunks read, to tell when the unread text has grown
+        self._fills = 0
+
+    def _fill(self) -> bool:
+        """Appends the next chunk to the unread text, returning False once
+            the stream has ended.
+        """
+        for chunk in self._chunks:
+            self._buffer = self._buffer[self._pos:] + chunk
+            self._pos = 0
+            self._fills += 1
+            return True
+        self._eof = True
+        return False
+
+    def _error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self._buffer, self._pos)
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, or an empty
+            string at the end of the stream.
+        """
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise self._error(f'Expecting {char!r}')
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decodes the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the text may continue in the next chunk
+            at_end = (_NUMBER_TAIL.match(self._buffer, end).end() == len(
+                self._buffer) and isinstance(value, (int, float)))
+            if not at_end or self._eof or not self._fill():
+                self._pos = end
+                return value
+
+    def members(self) -> Iterator[Tuple[str, bool]]:
+        """Iterates over the keys of an object, along with whether each value
+            is an array. The caller must read each value before continuing.
+        """
+        self.expect('{')
+        while True:
+            char = self.peek()
+            if char == '}':
+                self._pos += 1
+                return
+            if char == ',':
+                self._pos += 1
+                continue
+            key = self.value()
+            self.expect(':')
+            yield key, self.peek() == '['
+
+    def _objects(self) -> Optional[List[Any]]:
+        """Decodes the complete objects of an array in the unread text at
+            once, or returns None if they cannot be told apart.
+
+        Decoding many objects in one call is much faster than decoding them
+        one at a time, and the decoder shares the strings of repeated keys
+        between the objects it decodes together. A cut after a closing brace
+        inside a string leaves the string unterminated, so the objects only
+        decode if the cut ends a value of the array.
+        """
+        end = len(self._buffer)
+        for _ in range(_BATCH_ATTEMPTS):
+            end = self._buffer.rfind('}', self._pos, end)
+            if end < 0:
+                break
+            try:
+                objects = _DECODER.decode('[' +
+                                          self._buffer[self._pos:end + 1] + ']')
+            except json.JSONDecodeError:
+                continue
+            self._pos = end + 1
+            return objects
+        return None
+
+    def items(self) -> Iterator[Any]:
+        """Iterates over the values of an array"""
+        self.expect('[')
+        # The fill of the text already found not to split into objects
+        checked = -1
+        while True:
+            char = self.peek()
+            if char == ']':
+                self._pos += 1
+                return
+            if char == ',':
+                self._pos += 1
+                continue
+            if not char:
+                raise self._error('Unterminated array')
+            if char == '{' and self._fills != checked:
+                objects = self._objects()
+                if objects is not None:
+                    yield from objects
+                    continue
+                checked = self._fills
+            yield self.value()
+
+
+def iter_records(chunks: Iterable[str], key: str = 'data') -> Iterator[JSON]:
+    """Yields the values of an array in a JSON object as they are decoded.
+
+    Args:
+        chunks: The text of the JSON document, in chunks.
+        key: The key of the array in the top level object.
+    """
+    reader = _JSONReader(chunks)
+    if reader.peek() != '{':
+        return
+    for member, is_array in reader.members():
+        if member == key and is_array:
+            yield from reader.items()
+        else:
+            reader.value()
+
+
+def load(chunks: Iterable[str]) -> Any:
+    """Decodes a JSON document from chunks of text, building the arrays of
+        the top level object one value at a time.
+    """
+    reader = _JSONReader(chunks)
+    if reader.peek() != '{':
+        return reader.value()
+    document = {}
+    for member, is_array in reader.members():
+        document[member] = list(reader.items()) if is_array else reader.value()
+    return document
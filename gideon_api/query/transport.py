@@ -0,0 +1,239 @@
+"""Maintains pooled, keep-alive HTTP connections to the GIDEON API and
+    records how long each phase of a request takes
+"""
+from time import perf_counter
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional
+import functools
+import threading
+from gideon_api import PARAMS
+
+if TYPE_CHECKING:
+    import requests
+
+# Connections are opened in the thread sending the request, so the time spent
+# connecting is handed back to the transport through thread local storage
+_connect_timer = threading.local()
+
+
+def _record_connect(start: float) -> None:
+    _connect_timer.elapsed = (getattr(_connect_timer, 'elapsed', 0.0) +
+                              perf_counter() - start)
+
+
+@functools.lru_cache(maxsize=None)
+def _timed_adapter_class() -> type:
+    """Creates an HTTP adapter class whose connection pools report the time
+        spent setting up connections.
+
+    The classes are created on first use so that importing the package does
+    not import requests.
+    """
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class TimedHTTPConnection(HTTPConnection):
+
+        def connect(self) -> None:
+            start = perf_counter()
+            try:
+                super().connect()
+            finally:
+                _record_connect(start)
+
+    class TimedHTTPSConnection(HTTPSConnection):
+
+        def connect(self) -> None:
+            start = perf_counter()
+            try:
+                super().connect()
+            finally:
+                _record_connect(start)
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    class TimedHTTPAdapter(HTTPAdapter):
+
+        def init_poolmanager(self, *args, **kwargs) -> None:
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                'http': TimedHTTPConnectionPool,
+                'https': TimedHTTPSConnectionPool,
+            }
+
+    return TimedHTTPAdapter
+
+
+class RequestTiming(NamedTuple):
+    """Durations, in seconds, of the phases of a single HTTP request.
+
+    Attributes:
+        connect: Time spent opening the TCP connection and completing the TLS
+            handshake. This is zero when a pooled connection was reused.
+        ttfb: Time from the request being sent until the response headers
+            arrived, excluding any time spent connecting.
+        download: Time spent reading the response body.
+        total: Wall clock time of the entire request.
+    """
+    connect: float
+    ttfb: float
+    download: float
+    total: float
+
+    @property
+    def reused_connection(self) -> bool:
+        return self.connect == 0
+
+
+class TransportStats:
+    """Running totals of the request timings seen by a transport"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.connect_seconds = 0.0
+        self.ttfb_seconds = 0.0
+        self.download_seconds = 0.0
+        self.total_seconds = 0.0
+
+    def record(self, timing: RequestTiming) -> None:
+        with self._lock:
+            self.requests += 1
+            if not timing.reused_connection:
+                self.new_connections += 1
+            self.connect_seconds += timing.connect
+            self.ttfb_seconds += timing.ttfb
+            self.download_seconds += timing.download
+            self.total_seconds += timing.total
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'connect_seconds': self.connect_seconds,
+                'ttfb_seconds': self.ttfb_seconds,
+                'download_seconds': self.download_seconds,
+                'total_seconds': self.total_seconds,
+            }
+
+
+class HTTPTransport:
+    """Sends HTTP requests over a pool of persistent connections.
+
+    Connections are kept open between calls, one pool per host, so only the
+    first request to a host pays for the TCP and TLS handshakes. The transport
+    should be closed when it is no longer needed, either by calling
+    :py:meth:`close` or by using it as a context manager.
+    """
+
+    def __init__(self,
+                 pool_connections: int = 4,
+                 pool_maxsize: int = 10,
+                 connect_timeout: Optional[float] = 10.0,
+                 read_timeout: Optional[float] = 60.0,
+                 pool_block: bool = False) -> None:
+        """Initializes the connection pool settings.
+
+        Args:
+            pool_connections: The number of hosts to keep connection pools
+                open for.
+            pool_maxsize: The maximum number of connections kept open to a
+                single host.
+            connect_timeout: Seconds to wait for a connection to be
+                established, or None to wait indefinitely.
+            read_timeout: Seconds to wait for the server to send data, or
+                None to wait indefinitely.
+            pool_block: If true, requests wait for a free connection rather
+                than opening a temporary one when the pool is exhausted.
+        """
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._pool_block = pool_block
+        self.timeout = (connect_timeout, read_timeout)
+        self.stats = TransportStats()
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def session(self) -> 'requests.Session':
+        """The underlying requests session, created on first use"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    session = requests.Session()
+                    adapter = _timed_adapter_class()(
+                        pool_connections=self._pool_connections,
+                        pool_maxsize=self._pool_maxsize,
+                        pool_block=self._pool_block)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    @property
+    def last_timing(self) -> Optional[RequestTiming]:
+        """The timing of the most recent request sent by the current thread"""
+        return getattr(self._local, 'timing', None)
+
+    def get(self,
+            url: str,
+            params: Optional[PARAMS] = None,
+            headers: Optional[Dict[str, str]] = None,
+            stream: bool = False) -> 'requests.Response':
+        """Sends a GET request over a pooled connection.
+
+        Args:
+            url: The complete URL to request.
+            params: Optional key-value pairs to attach as URL parameters.
+            headers: Optional HTTP headers to send with the request.
+            stream: If true, the body is left to be read by the caller, who
+                must close the response to return the connection to the pool.
+
+        Returns:
+            The requests.Response object, with its body already downloaded
+            unless streaming. The timing of the request is stored in
+            :py:attr:`last_timing`, without the download time when streaming.
+        """
+        _connect_timer.elapsed = 0.0
+        start = perf_counter()
+        r = self.session.get(url,
+                             params=params,
+                             headers=headers,
+                             timeout=self.timeout,
+                             stream=True)
+        headers_received = perf_counter()
+        if not stream:
+            # Accessing the content downloads the remainder of the body
+            r.content  # pylint: disable=pointless-statement
+        end = perf_counter()
+
+        connect = _connect_timer.elapsed
+        timing = RequestTiming(connect=connect,
+                               ttfb=max(headers_received - start - connect,
+                                        0.0),
+                               download=end - headers_received,
+                               total=end - start)
+        self._local.timing = timing
+        self.stats.record(timing)
+        return r
+
+    def close(self) -> None:
+        """Closes all pooled connections"""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def __enter__(self) -> 'HTTPTransport':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
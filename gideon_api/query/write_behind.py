@@ -0,0 +1,313 @@
+"""Moves cache writes off the query path
+
+A :py:class:`WriteBehindBackend` records writes in memory and applies them to
+the wrapped backend in batches from a background thread.
+"""
+from datetime import datetime as dt
+from typing import Callable, Dict, List, Optional, Tuple
+import atexit
+import logging
+import threading
+import weakref
+from gideon_api.query.cache_backends import (CONTENT_HASH, ETAG, LAST_MODIFIED,
+                                             RESPONSE, TIMESTAMP, CacheBackend,
+                                             CacheEntry, content_hash,
+                                             response_size)
+
+# Pending changes of a key, the later replacing or amending the earlier
+_SET = 'set'
+_TOUCH = 'touch'
+_DELETE = 'delete'
+
+Change = Tuple[str, object]
+
+# Backends with changes to write when the interpreter exits
+_OPEN_BACKENDS = weakref.WeakSet()
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    for backend in list(_OPEN_BACKENDS):
+        backend.flush()
+
+
+def _touched(entry: CacheEntry, touch: tuple) -> CacheEntry:
+    timestamp, validators = touch
+    entry = dict(entry)
+    entry[TIMESTAMP] = timestamp
+    if validators is not None:
+        entry.update(validators)
+    return entry
+
+
+def _combine(earlier: Change, later: Change) -> Change:
+    """The single change equivalent to two successive changes of a key"""
+    kind, value = later
+    if kind != _TOUCH:
+        return later
+    earlier_kind, earlier_value = earlier
+    if earlier_kind == _SET:
+        return _SET, _touched(earlier_value, value)
+    if earlier_kind == _TOUCH and earlier_value[1] is not None:
+        # Keep the validators of the earlier touch the later one omits
+        validators = dict(earlier_value[1])
+        validators.update(value[1] or {})
+        return _TOUCH, (value[0], validators)
+    if earlier_kind == _DELETE:
+        # Touching a deleted entry does nothing
+        return earlier
+    return later
+
+
+class WriteBehindBackend(CacheBackend):
+    """Buffers the changes to a backend in memory and writes them in batches
+        from a background thread.
+
+    Writing, touching and deleting entries only updates a dictionary of
+    pending changes, and reads see those changes immediately. The changes
+    are written to the wrapped backend, and the backend flushed once, every
+    ``flush_interval`` seconds, as soon as ``max_pending`` keys are waiting,
+    when :py:meth:`flush` or :py:meth:`close` is called, and when the
+    interpreter exits. If ``max_pending`` keys are still waiting when a new
+    key changes, the thread making the change writes them itself, so callers
+    are held back while the backend is slow, and see its errors while it
+    fails, as with the wrapped backend alone. If the process crashes, at most the
+    changes of the last ``flush_interval`` seconds, and no more than
+    ``max_pending`` keys, are lost.
+
+    A background write which fails is logged and retried on the next
+    interval. The error of the last failed write is kept in ``error``, and
+    raised by :py:meth:`flush` and :py:meth:`close` if the changes still
+    cannot be written. A change which cannot be written while
+    ``max_pending`` keys wait is not kept.
+
+    As responses are only serialized when they are written, :py:meth:`set`
+    does not know the stored size of an entry. It is passed to
+    ``on_stored`` once the entry is written instead.
+    """
+
+    def __init__(
+            self,
+            backend: CacheBackend,
+            flush_interval: float = 1.0,
+            max_pending: int = 100,
+            on_stored: Optional[Callable[[str, int], None]] = None) -> None:
+        """Starts the background writer.
+
+        Args:
+            backend: The backend the changes are written to.
+            flush_interval: The maximum number of seconds a change waits
+                before it is written.
+            max_pending: The number of changed keys which starts a write
+                before the interval has passed, and the most keys kept
+                waiting.
+            on_stored: Called with the key and the stored size, in bytes, of
+                every entry written, in the units of :py:meth:`sizes`. It is
+                called after the batch is written, without holding the locks
+                of the backend.
+        """
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.on_stored = on_stored
+        self._lock = threading.Lock()
+        # Guards the wrapped backend, which is used from both threads
+        self._backend_lock = threading.RLock()
+        self._pending = {}
+        # The batch being written, still visible to reads until it is done
+        self._writing = {}
+        self._wake = threading.Event()
+        self._closed = False
+        self.error = None
+        self._writer = threading.Thread(target=self._run,
+                                        name='gideon-api-cache-writer',
+                                        daemon=True)
+        self._writer.start()
+        _OPEN_BACKENDS.add(self)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self._write_pending()
+            except Exception as e:  # pylint: disable=broad-except
+                # The changes are kept and retried on the next interval
+                self.error = e
+                _LOGGER.warning('Could not write cached responses: %s', e)
+
+    def _record(self, key: str, change: Change) -> None:
+        with self._lock:
+            full = (len(self._pending) >= self.max_pending and
+                    key not in self._pending)
+        if full:
+            # Raises the error of a failing backend before the change is
+            # kept, so the pending changes cannot grow without bound
+            self._write_pending()
+        with self._lock:
+            earlier = self._pending.get(key) or self._writing.get(key)
+            if earlier is not None:
+                change = _combine(earlier, change)
+            self._pending[key] = change
+            if len(self._pending) >= self.max_pending:
+                self._wake.set()
+
+    def _change(self, key: str) -> Optional[Change]:
+        with self._lock:
+            return self._pending.get(key) or self._writing.get(key)
+
+    def _write_pending(self) -> None:
+        """Writes the pending changes to the backend as one batch"""
+        stored = {}
+        with self._backend_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                self._writing, self._pending = self._pending, {}
+            try:
+                with self.backend.batch():
+                    for key, (kind, value) in self._writing.items():
+                        if kind == _SET:
+                            size = self.backend.set(key, value)
+                            if size is None:
+                                size = response_size(value[RESPONSE])
+                            stored[key] = size
+                        elif kind == _TOUCH:
+                            self.backend.touch(key, *value)
+                        else:
+                            self.backend.delete(key)
+                self.backend.flush()
+            except BaseException:
+                # Put the batch back before the changes made since
+                with self._lock:
+                    for key, change in self._pending.items():
+                        if key in self._writing:
+                            change = _combine(self._writing[key], change)
+                        self._writing[key] = change
+                    self._pending, self._writing = self._writing, {}
+                raise
+            with self._lock:
+                self._writing = {}
+            self.error = None
+        if self.on_stored is not None:
+            for key, size in stored.items():
+                self.on_stored(key, size)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        change = self._change(key)
+        if change is not None and change[0] == _DELETE:
+            return None
+        if change is not None and change[0] == _SET:
+            return dict(change[1])
+        with self._backend_lock:
+            entry = self.backend.get(key)
+        if entry is not None and change is not None:
+            entry = _touched(entry, change[1])
+        return entry
+
+    def get_hash(self, key: str) -> Optional[str]:
+        change = self._change(key)
+        if change is None or change[0] == _TOUCH:
+            with self._backend_lock:
+                return self.backend.get_hash(key)
+        if change[0] == _DELETE:
+            return None
+        entry = change[1]
+        return entry.get(CONTENT_HASH) or content_hash(entry[RESPONSE])
+
+    def get_metadata(self, key: str) -> Optional[Tuple[dt, str]]:
+        change = self._change(key)
+        if change is not None and change[0] == _DELETE:
+            return None
+        if change is not None and change[0] == _SET:
+            return change[1][TIMESTAMP], self.get_hash(key)
+        with self._backend_lock:
+            metadata = self.backend.get_metadata(key)
+        if metadata is not None and change is not None:
+            metadata = change[1][0], metadata[1]
+        return metadata
+
+    def get_validators(self, key: str) -> Optional[Dict[str, Optional[str]]]:
+        change = self._change(key)
+        if change is not None and change[0] == _DELETE:
+            return None
+        if change is not None and change[0] == _SET:
+            entry = change[1]
+            return {
+                ETAG: entry.get(ETAG),
+                LAST_MODIFIED: entry.get(LAST_MODIFIED)
+            }
+        with self._backend_lock:
+            validators = self.backend.get_validators(key)
+        if validators is not None and change is not None and change[1][1]:
+            validators.update(change[1][1])
+        return validators
+
+    def set(self, key: str, entry: CacheEntry) -> Optional[int]:
+        # The size is only known once written, see on_stored
+        self._record(key, (_SET, dict(entry)))
+        return None
+
+    def touch(self,
+              key: str,
+              timestamp: dt,
+              validators: Optional[Dict[str, Optional[str]]] = None) -> None:
+        self._record(key, (_TOUCH, (timestamp, validators)))
+
+    def delete(self, key: str) -> None:
+        self._record(key, (_DELETE, None))
+
+    def delete_older_than(self, timestamp: dt) -> List[str]:
+        self.flush()
+        with self._backend_lock:
+            return self.backend.delete_older_than(timestamp)
+
+    def keys(self) -> List[str]:
+        with self._backend_lock, self._lock:
+            changes = dict(self._writing)
+            changes.update(self._pending)
+            keys = dict.fromkeys(self.backend.keys())
+        for key, (kind, _) in changes.items():
+            if kind == _SET:
+                keys[key] = None
+            elif kind == _DELETE:
+                keys.pop(key, None)
+        return list(keys)
+
+    def sizes(self) -> List[Tuple[str, int]]:
+        self.flush()
+        with self._backend_lock:
+            return self.backend.sizes()
+
+    def pending(self) -> int:
+        """The number of keys with changes not yet written"""
+        with self._lock:
+            return len(self._pending) + len(self._writing)
+
+    def flush(self) -> None:
+        """Writes the pending changes now, in the calling thread, raising
+            any error of the backend.
+        """
+        self._write_pending()
+
+    def stop(self) -> None:
+        """Stops the background writer and writes the pending changes,
+            leaving the wrapped backend open.
+        """
+        self._closed = True
+        self._wake.set()
+        self._writer.join()
+        _OPEN_BACKENDS.discard(self)
+        with self._backend_lock:
+            self._write_pending()
+            self.backend.flush()
+
+    def close(self) -> None:
+        """Stops the background writer, writes the pending changes and
+            closes the wrapped backend.
+        """
+        self.stop()
+        with self._backend_lock:
+            self.backend.close()
@@ -1 +1,2 @@
-from gideon_api.utilities.geospatial import *
\ No newline at end of file
+from gideon_api.utilities.geospatial import *
+from gideon_api.utilities.geoquery import *
@@ -0,0 +1,226 @@
+"""Radius, nearest neighbour and polygon queries over outbreak locations
+
+An :py:class:`OutbreakIndex` is built once over the latitude and longitude
+columns of a dataframe and answers many queries at once::
+
+    index = OutbreakIndex(outbreaks)
+    near_nairobi = index.within_radius(-1.2864, 36.8172, 200)
+
+Distances are great-circle distances in kilometres. Polygons are given in
+longitude/latitude coordinates, like the points of :py:func:`to_geojson`.
+"""
+from typing import TYPE_CHECKING, Tuple, Union
+from gideon_api.utilities.geospatial import _coordinates
+
+if TYPE_CHECKING:
+    import numpy
+    from pandas import DataFrame
+
+__all__ = ['OutbreakIndex']
+
+# The mean radius of the Earth
+EARTH_RADIUS_KM = 6371.0088
+# Half the circumference, the largest distance between two points
+_MAX_DISTANCE_KM = 3.141592653589793 * EARTH_RADIUS_KM
+
+_QUERY = 'query'
+_DISTANCE = 'distance_km'
+
+Coordinates = Union[float, 'numpy.ndarray']
+
+
+def haversine_km(lat1: Coordinates, lon1: Coordinates, lat2: Coordinates,
+                 lon2: Coordinates) -> 'numpy.ndarray':
+    """The great-circle distances in kilometres between pairs of points"""
+    import numpy as np
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(
+        (lon2 - lon1) / 2)**2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class OutbreakIndex:
+    """A spatial index of the rows of a dataframe with a location.
+
+    The points are kept in a shapely STRtree. Radius queries take the points
+    in the bounding box of each circle from the tree and keep those within
+    the great-circle distance, so they are exact across the antimeridian and
+    near the poles. Every query method takes arrays of query points or
+    polygons and returns the matches of all of them in one dataframe, with
+    the position of the matching query in the "query" column.
+
+    Attributes:
+        frame: The rows of the indexed dataframe with a location, with their
+            original index.
+    """
+
+    def __init__(self, df) -> None:
+        """Builds the index.
+
+        Args:
+            df (DataFrame): The dataframe with the columns "latitude" and
+                "longitude", such as outbreak data or the GeoDataFrame of
+                :py:func:`to_geojson`. Rows without a location are left out.
+        """
+        import shapely
+        self.frame, lat, lon = _coordinates(df)
+        self._lat = lat.to_numpy()
+        self._lon = lon.to_numpy()
+        self._tree = shapely.STRtree(shapely.points(self._lon, self._lat))
+
+    def __len__(self) -> int:
+        return len(self._lat)
+
+    def _candidates(self, lat: 'numpy.ndarray', lon: 'numpy.ndarray',
+                    radius_km: 'numpy.ndarray') -> Tuple['numpy.ndarray', ...]:
+        """The pairs of queries and points within the radius of the query,
+            with their distances.
+        """
+        import numpy as np
+        import shapely
+        angle = np.minimum(radius_km / EARTH_RADIUS_KM, np.pi)
+        dlat = np.degrees(angle)
+        south = lat - dlat
+        north = lat + dlat
+        # Circles reaching a pole, or wider than a hemisphere, span every
+        # longitude. Otherwise the widest point of the circle is found from
+        # the sine of its angular radius.
+        polar = (south <= -90) | (north >= 90) | (angle >= np.pi / 2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dlon = np.degrees(np.arcsin(
+                np.sin(angle) / np.cos(np.radians(lat))))
+        dlon = np.where(polar | np.isnan(dlon), 180.0, dlon)
+        west = lon - dlon
+        east = lon + dlon
+        south = np.maximum(south, -90)
+        north = np.minimum(north, 90)
+        full = dlon >= 180
+
+        # Boxes crossing the antimeridian are split in two, the part beyond
+        # it wrapped around to the other side
+        west_wrap = ~full & (west < -180)
+        east_wrap = ~full & (east > 180)
+        boxes = np.concatenate([
+            shapely.box(np.where(full, -180, np.maximum(west, -180)), south,
+                        np.where(full, 180, np.minimum(east, 180)), north),
+            shapely.box(west[west_wrap] + 360, south[west_wrap], 180,
+                        north[west_wrap]),
+            shapely.box(-180, south[east_wrap], east[east_wrap] - 360,
+                        north[east_wrap]),
+        ])
+        box_query = np.concatenate([
+            np.arange(len(lat)),
+            np.flatnonzero(west_wrap),
+            np.flatnonzero(east_wrap)
+        ])
+        box, point = self._tree.query(boxes)
+        query = box_query[box]
+
+        distance = haversine_km(lat[query], lon[query], self._lat[point],
+                                self._lon[point])
+        inside = distance <= radius_km[query]
+        return query[inside], point[inside], distance[inside]
+
+    def _matches(self, query: 'numpy.ndarray', point: 'numpy.ndarray',
+                 **columns: 'numpy.ndarray') -> 'DataFrame':
+        """The matching rows, with the query they match"""
+        return self.frame.iloc[point].assign(**{_QUERY: query}, **columns)
+
+    def within_radius(self, latitudes: Coordinates, longitudes: Coordinates,
+                      radius_km: Coordinates) -> 'DataFrame':
+        """Finds the rows within a distance of each query point.
+
+        Args:
+            latitudes: The latitude, or an array of latitudes, of the queries.
+            longitudes: The longitude, or an array of longitudes, of the
+                queries.
+            radius_km: The distance in kilometres, the same for every query
+                or one for each.
+
+        Returns:
+            DataFrame: The matching rows, ordered by query and then by
+            distance, with the columns "query" and "distance_km" added.
+        """
+        import numpy as np
+        lat, lon, radius_km = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(latitudes, dtype=float)),
+            np.asarray(longitudes, dtype=float),
+            np.asarray(radius_km, dtype=float))
+        query, point, distance = self._candidates(lat, lon, radius_km)
+        order = np.lexsort((point, distance, query))
+        return self._matches(query[order], point[order],
+                             **{_DISTANCE: distance[order]})
+
+    def nearest(self,
+                latitudes: Coordinates,
+                longitudes: Coordinates,
+                k: int = 1) -> 'DataFrame':
+        """Finds the k rows nearest to each query point.
+
+        The search radius of every query starts from the distance expected
+        for k evenly spread points, and grows until k rows are found.
+
+        Args:
+            latitudes: The latitude, or an array of latitudes, of the queries.
+            longitudes: The longitude, or an array of longitudes, of the
+                queries.
+            k: The number of rows to find for each query, or fewer if the
+                index has fewer rows.
+
+        Returns:
+            DataFrame: The matching rows, ordered by query and then by
+            distance, with the columns "query" and "distance_km" added.
+        """
+        import numpy as np
+        lat, lon = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(latitudes, dtype=float)),
+            np.asarray(longitudes, dtype=float))
+        k = min(k, len(self))
+        found = []
+        remaining = np.arange(len(lat))
+        radius = 2 * EARTH_RADIUS_KM * np.sqrt(k / max(len(self), 1))
+        radius_km = np.full(len(lat), radius)
+        while len(remaining) and k > 0:
+            query, point, distance = self._candidates(lat[remaining],
+                                                      lon[remaining],
+                                                      radius_km[remaining])
+            counts = np.bincount(query, minlength=len(remaining))
+            done = (counts >= k) | (radius_km[remaining] >= _MAX_DISTANCE_KM)
+            # Every point closer than the k-th point found is within the
+            # radius, so the k nearest of the candidates are the k nearest
+            keep = done[query]
+            query, point, distance = query[keep], point[keep], distance[keep]
+            order = np.lexsort((point, distance, query))
+            query, point, distance = query[order], point[order], distance[order]
+            rank = np.arange(len(query)) - np.searchsorted(query, query)
+            first = rank < k
+            found.append(
+                (remaining[query[first]], point[first], distance[first]))
+            remaining = remaining[~done]
+            radius_km[remaining] *= 4
+
+        if found:
+            query, point, distance = map(np.concatenate, zip(*found))
+        else:
+            query = point = np.array([], dtype=int)
+            distance = np.array([], dtype=float)
+        order = np.lexsort((point, distance, query))
+        return self._matches(query[order], point[order],
+                             **{_DISTANCE: distance[order]})
+
+    def within_polygons(self, polygons) -> 'DataFrame':
+        """Finds the rows inside each polygon.
+
+        Args:
+            polygons: A shapely polygon, or a sequence or GeoSeries of
+                polygons, in longitude/latitude coordinates.
+
+        Returns:
+            DataFrame: The matching rows, ordered by query and then by their
+            order in the index, with the column "query" added.
+        """
+        import numpy as np
+        polygons = np.atleast_1d(np.asarray(polygons, dtype=object))
+        query, point = self._tree.query(polygons, predicate='contains')
+        order = np.lexsort((point, query))
+        return self._matches(query[order], point[order])
@@ -1,43 +1,100 @@
-from typing import Optional
-import fiona
-import geopandas
-from geopandas.geodataframe import GeoDataFrame
-from shapely.geometry import Point
+from typing import TYPE_CHECKING, Optional
+import os.path
+
+if TYPE_CHECKING:
+    from geopandas.geodataframe import GeoDataFrame
+
+__all__ = ['to_geojson']
 
 _LAT = 'latitude'
 _LON = 'longitude'
 _CENTROID = 'centroid'
+# Latitudes and longitudes are in WGS 84
+_CRS = 'EPSG:4326'
+
+# The file formats written for each file extension. GeoParquet is written by
+# geopandas itself, the other formats by the OGR driver of the same name.
+_EXTENSION_FORMAT = {
+    '.geojson': 'GeoJSON',
+    '.json': 'GeoJSON',
+    '.fgb': 'FlatGeobuf',
+    '.gpkg': 'GPKG',
+    '.parquet': 'Parquet',
+    '.geoparquet': 'Parquet',
+}
+_FORMATS = frozenset(_EXTENSION_FORMAT.values())
+
 
+def _file_format(filename: str, file_format: Optional[str]) -> str:
+    """The format to write a file in, by default from its extension"""
+    if file_format is None:
+        extension = os.path.splitext(filename)[1].lower()
+        return _EXTENSION_FORMAT.get(extension, 'GeoJSON')
+    if file_format not in _FORMATS:
+        raise ValueError(f'Unknown file format {file_format}, expected one of '
+                         f'{", ".join(sorted(_FORMATS))}')
+    return file_format
 
-def _get_centroid(series, lat_col: str = _LAT, lon_col: str = _LON) -> Point:
-    """Returns a point from the lat/lon columns"""
-    return Point(series[lon_col], series[lat_col])
+
+def _coordinates(df):
+    """The rows of a dataframe with a location, and their latitudes and
+        longitudes as floats.
+    """
+    # Check if the dataframe has lat/lon data
+    if _LAT not in df or _LON not in df:
+        raise ValueError('Latitude/Longitude data not in dataframe')
+    located = df[_LAT].notna() & df[_LON].notna()
+    if not located.all():
+        df = df[located]
+    return df, df[_LAT].astype('float'), df[_LON].astype('float')
 
 
 def to_geojson(df,
-               filename: str,
-               return_geodataframe: bool = True) -> Optional[GeoDataFrame]:
+               filename: Optional[str] = None,
+               return_geodataframe: bool = True,
+               file_format: Optional[str] = None) -> Optional['GeoDataFrame']:
     """Exports a dataframe containing latitude and longitude data to a GeoJSON
-        file to be used in other programs.
-    
+        file, or another geospatial file format, to be used in other programs.
+
+    The points are built from the latitude and longitude columns at once, and
+    the input dataframe is neither modified nor copied more than needed.
+    Large dataframes are written much faster as FlatGeobuf (.fgb), GeoParquet
+    (.parquet) or GeoPackage (.gpkg) files than as GeoJSON.
+
     Args:
         df (DataFrame): The dataframe with the columns "latitude" and "longitude"
-        filename: the name of the GeoJSON file saved the computer. The save
-            location is relative to the current working directory.
+        filename: the name of the file saved the computer. The save location
+            is relative to the current working directory. If None, no file is
+            written and only the GeoDataFrame is returned.
         return_geodataframe: Indicates if the underlying GeoDataFrame should
             be returned as a Python object, in addition to the expored GeoJSON
             file.
-    
+        file_format: One of "GeoJSON", "FlatGeobuf", "GPKG" or "Parquet". By
+            default the format is chosen from the extension of the filename,
+            and files with other extensions are written as GeoJSON. Writing
+            GeoParquet requires the ``parquet`` extra (pyarrow).
+
     Returns:
         Optionally returns the GeoDataFrame of the input dataframe.
     """
-    # Check if the dataframe has lat/lon data
-    if _LAT in df and _LON in df:
-        df = df[df[_LAT].notna() & df[_LON].notna()].copy()
-        df[[_LAT, _LON]] = df[[_LAT, _LON]].astype('float')
-        df[_CENTROID] = df.apply(_get_centroid, 'columns')
-        gdf = geopandas.GeoDataFrame(df, geometry=_CENTROID)
-        gdf.to_file(filename, 'GeoJSON')
+    # The geospatial libraries are slow to import, so load them on first use
+    import geopandas
+
+    df, lat, lon = _coordinates(df)
+    if filename is not None:
+        file_format = _file_format(filename, file_format)
+    points = geopandas.points_from_xy(lon, lat, crs=_CRS)
+    # With copy-on-write, the other columns share their data with the input
+    columns = {_LAT: lat, _LON: lon, _CENTROID: points}
+    gdf = geopandas.GeoDataFrame(df.assign(**columns),
+                                 geometry=_CENTROID,
+                                 copy=False)
+
+    if filename is not None:
+        if file_format == 'Parquet':
+            gdf.to_parquet(filename)
+        else:
+            gdf.to_file(filename, driver=file_format)
+    if return_geodataframe:
         return gdf
-    else:
-        raise ValueError('Latitude/Longitude data not in dataframe')
+    return None
@@ -0,0 +1,143 @@
+"""Offline stand-ins for the GIDEON API shared by the tests
+
+The responses are built from fixtures like those replayed by
+:py:class:`gideon_api.query.replay.ReplayTransport`, so the client reads
+them the same way as recorded responses.
+"""
+import json
+import random
+import threading
+import time
+from unittest import mock
+from urllib.parse import urlparse
+import pandas as pd
+import requests
+from gideon_api.query import GIDEON
+from gideon_api.query.cache import GideonAPICache
+from gideon_api.query.cache_backends import content_hash
+from gideon_api.query.replay import answer, to_response
+
+
+def fake_response(body=None, status=200, headers=None, url=''):
+    """A response with a JSON body, or an empty body if None"""
+    return to_response(
+        {
+            'status': status,
+            'headers': dict(headers or {}),
+            'body': '' if body is None else json.dumps(body)
+        }, url)
+
+
+class FakeTransport:
+    """Answers requests from a function of their path and parameters,
+        recording every request.
+
+    Attributes:
+        calls: The path and parameters of every request, in order.
+        sent_headers: The headers of every request, in order.
+        streamed: Whether every request asked for a streamed body, in order.
+        responses: The responses sent, in order.
+        not_modified: The number of requests answered with 304.
+        max_active: The largest number of requests answered at once.
+    """
+
+    def __init__(self, serve, etags=False, delay=0.0, headers=None):
+        """Initializes the transport.
+
+        Args:
+            serve: Called with the path and parameters of a request, returns
+                the JSON body of the response, None for 404 Not Found, or a
+                response sent as it is. Errors it raises are raised by the
+                transport.
+            etags: Sends the content hash of every body as its ETag, and
+                answers conditional requests for an unchanged body with 304.
+            delay: Seconds taken to answer every request.
+            headers: Other headers sent with every response.
+        """
+        self.serve = serve
+        self.etags = etags
+        self.delay = delay
+        self.headers = dict(headers or {})
+        self.calls = []
+        self.sent_headers = []
+        self.streamed = []
+        self.responses = []
+        self.not_modified = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def paths(self):
+        return [path for path, _ in self.calls]
+
+    def get(self, url, params=None, headers=None, stream=False):
+        path = urlparse(url).path
+        with self._lock:
+            self.calls.append((path, params))
+            self.sent_headers.append(dict(headers or {}))
+            self.streamed.append(stream)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            body = self.serve(path, params)
+        finally:
+            with self._lock:
+                self.active -= 1
+        r = self._respond(body, url, headers)
+        with self._lock:
+            self.responses.append(r)
+        return r
+
+    def _respond(self, body, url, headers):
+        if isinstance(body, requests.Response):
+            return body
+        if body is None:
+            return fake_response(status=404, url=url)
+
+        fixture = {
+            'status': 200,
+            'headers': dict(self.headers),
+            'body': json.dumps(body)
+        }
+        if self.etags:
+            fixture['headers']['ETag'] = '"' + content_hash(body) + '"'
+            fixture = answer(fixture, headers)
+            if fixture['status'] == 304:
+                with self._lock:
+                    self.not_modified += 1
+        return to_response(fixture, url)
+
+    def close(self):
+        pass
+
+
+def offline_client(transport, **kwargs):
+    """A client sending its requests with the transport, with a cache kept
+        in memory
+    """
+    return GIDEON('key',
+                  transport=transport,
+                  cache=GideonAPICache(24, persistent_cache=False),
+                  **kwargs)
+
+
+def use_client(test, client, *modules):
+    """Has the modules query with the client until the test ends"""
+    for module in modules:
+        patcher = mock.patch.object(module, 'gideon_api', client)
+        patcher.start()
+        test.addCleanup(patcher.stop)
+
+
+def random_outbreaks(count, seed=0):
+    """Outbreaks at random locations, labelled from 1000"""
+    rng = random.Random(seed)
+    return pd.DataFrame(
+        {
+            'outbreak': range(count),
+            'latitude': [rng.uniform(-90, 90) for _ in range(count)],
+            'longitude': [rng.uniform(-180, 180) for _ in range(count)],
+        },
+        index=range(1000, 1000 + count))
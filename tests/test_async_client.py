@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+from gideon_api.query import AsyncGIDEON
+from gideon_api.query.cache import GideonAPICache
+from helpers import FakeTransport
+
+
+def _echo(path, params):
+    return {'data': [{'path': path, **(params or {})}]}
+
+
+def _slow_transport(delay):
+    """Answers every request after a fixed delay"""
+    return FakeTransport(_echo, delay=delay)
+
+
+def _client(transport, max_concurrency):
+    client = AsyncGIDEON('key',
+                         max_concurrency=max_concurrency,
+                         cache=GideonAPICache(24, persistent_cache=False))
+    client.client.transport = transport
+    return client
+
+
+class TestAsyncGIDEON(unittest.TestCase):
+
+    def test_concurrency_limit(self):
+        transport = _slow_transport(0.05)
+        client = _client(transport, 5)
+
+        async def run():
+            async with client:
+                return await asyncio.gather(*(client.query_gideon_api(
+                    '/diseases/outbreaks', {'year': year})
+                                              for year in range(2000, 2020)))
+
+        start = time.perf_counter()
+        frames = asyncio.run(run())
+        elapsed = time.perf_counter() - start
+        self.assertEqual(len(frames), 20)
+        self.assertEqual(frames[3]['year'][0], 2003)
+        self.assertEqual(transport.max_active, 5)
+        self.assertLess(elapsed, 20 * 0.05)
+
+    def test_cache_hit_skips_server(self):
+        transport = _slow_transport(0)
+        client = _client(transport, 2)
+
+        async def run():
+            first = await client.query_gideon_api('/diseases',
+                                                  try_dataframe=False)
+            second = await client.query_gideon_api('/diseases',
+                                                   try_dataframe=False)
+            return first, second
+
+        first, second = asyncio.run(run())
+        client.close()
+        self.assertEqual(first, second)
+        self.assertEqual(len(transport.calls), 1)
+
+    def test_identical_queries_coalesced(self):
+        transport = _slow_transport(0.05)
+        client = _client(transport, 8)
+
+        async def run():
+            return await asyncio.gather(
+                *(client.query_gideon_api('/diseases') for _ in range(10)))
+
+        frames = asyncio.run(run())
+        client.close()
+        self.assertEqual(len(transport.calls), 1)
+        self.assertEqual(client.coalesced, 9)
+        self.assertIsNot(frames[0], frames[1])
+
+    def test_forced_query_not_coalesced(self):
+        transport = _slow_transport(0.05)
+        client = _client(transport, 8)
+
+        async def run():
+            return await asyncio.gather(
+                client.query_gideon_api('/diseases'),
+                client.query_gideon_api('/diseases', force_online=True))
+
+        asyncio.run(run())
+        client.close()
+        # The forced query runs on its own worker, so it cannot be answered
+        # from the cache by the worker of the other query
+        self.assertEqual(client.coalesced, 0)
+        self.assertEqual(client.client._in_flight.coalesced, 0)
+
+    def test_cache_read_off_the_loop(self):
+        client = _client(_slow_transport(0), 2)
+        threads = []
+        query_cache = client.client.query_cache
+
+        def recording_query_cache(*args):
+            threads.append(threading.current_thread())
+            return query_cache(*args)
+
+        client.client.query_cache = recording_query_cache
+        asyncio.run(client.query_gideon_api('/diseases'))
+        client.close()
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_shared_client_left_open(self):
+        owner = _client(_slow_transport(0), 2)
+        shared = AsyncGIDEON(client=owner.client)
+        with mock.patch.object(owner.client, 'close') as close:
+            shared.close()
+            close.assert_not_called()
+            owner.close()
+            close.assert_called_once()
@@ -0,0 +1,261 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime as dt, timedelta
+from unittest import mock
+from gideon_api.query.cache import (CACHE_DIR_VARIABLE, GideonAPICache,
+                                    cache_directory)
+from gideon_api.query.cache_backends import (ETAG, LAST_MODIFIED, RESPONSE,
+                                             TIMESTAMP, MemoryBackend,
+                                             PickleBackend, SQLiteBackend)
+
+
+class _BackendTests:
+    """Behavior shared by every cache backend"""
+
+    def make_backend(self, path):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache')
+        self.cache = GideonAPICache(24, backend=self.make_backend(self.path))
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        self.cache.write('/diseases', {'data': [{'disease_code': 10100}]})
+        self.assertEqual(self.cache.query('/diseases'),
+                         {'data': [{
+                             'disease_code': 10100
+                         }]})
+        self.assertIsNone(self.cache.query('/drugs'))
+
+    def test_expiration(self):
+        self.cache.write('/diseases', {'data': []})
+        self.cache.backend.touch('/diseases', dt.now() - timedelta(hours=25))
+        self.assertIsNone(self.cache.query('/diseases'))
+        self.assertEqual(self.cache.query('/diseases', 48), {'data': []})
+        self.cache.query('/diseases', delete_expired_entry=True)
+        self.assertEqual(self.cache.backend.keys(), [])
+
+    def test_unchanged_write_refreshes_timestamp(self):
+        self.assertTrue(self.cache.write('/diseases', {'data': [1]}))
+        self.cache.backend.touch('/diseases', dt.now() - timedelta(hours=25))
+        self.assertFalse(self.cache.write('/diseases', {'data': [1]}))
+        self.assertEqual(self.cache.query('/diseases'), {'data': [1]})
+        self.assertTrue(self.cache.write('/diseases', {'data': [2]}))
+
+    def test_delete_old_queries(self):
+        self.cache.write('/old', {'data': []})
+        self.cache.write('/new', {'data': []})
+        self.cache.backend.touch('/old', dt.now() - timedelta(hours=30))
+        self.cache.delete_old_queries()
+        self.assertEqual(self.cache.backend.keys(), ['/new'])
+
+    def test_validators_stored(self):
+        self.cache.write('/diseases', {'data': [1]}, etag='"v1"')
+        self.cache.backend.touch('/diseases', dt.now() - timedelta(hours=25))
+        entry = self.cache.get_entry('/diseases')
+        self.assertEqual((entry[ETAG], entry[LAST_MODIFIED]), ('"v1"', None))
+
+        self.cache.revalidate('/diseases', etag='"v2"')
+        self.assertEqual(self.cache.query('/diseases'), {'data': [1]})
+        self.assertEqual(self.cache.get_entry('/diseases')[ETAG], '"v2"')
+        self.assertEqual(self.cache.stats.revalidated, 1)
+
+    def test_omitted_validators_kept(self):
+        self.cache.write('/diseases', {'data': [1]},
+                         etag='"v1"',
+                         last_modified='today')
+        self.cache.revalidate('/diseases', etag='"v2"')
+        self.assertEqual(self.cache.get_validators('/diseases'), {
+            ETAG: '"v2"',
+            LAST_MODIFIED: 'today'
+        })
+        self.cache.revalidate('/diseases')
+        self.assertEqual(self.cache.get_validators('/diseases')[ETAG], '"v2"')
+        self.assertIsNone(self.cache.get_validators('/drugs'))
+
+    def test_persisted(self):
+        self.cache.write('/diseases', {'data': [1]})
+        self.cache.close()
+        self.cache = GideonAPICache(24, backend=self.make_backend(self.path))
+        self.assertEqual(self.cache.query('/diseases'), {'data': [1]})
+
+    def test_shared_between_threads(self):
+        cache = GideonAPICache(24,
+                               backend=self.make_backend(self.path + '.2'),
+                               max_entries=20)
+        self.addCleanup(cache.close)
+
+        def worker(offset):
+            for i in range(50):
+                key = f'/outbreaks?year={(offset + i) % 30}'
+                if cache.query(key) is None:
+                    cache.write(key, {'data': [i]})
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache.stats.hits + cache.stats.misses, 400)
+        self.assertEqual(cache.stats.entries, 20)
+        self.assertEqual(sorted(cache.backend.keys()), sorted(cache._lru))
+
+
+class TestSQLiteBackend(_BackendTests, unittest.TestCase):
+
+    def make_backend(self, path):
+        return SQLiteBackend(path)
+
+    def test_entry_read_per_key(self):
+        self.cache.write('/diseases', {'data': [1]})
+        entry = self.cache.backend.get('/diseases')
+        self.assertEqual(entry[RESPONSE], {'data': [1]})
+        self.assertIsInstance(entry[TIMESTAMP], dt)
+
+    def test_database_without_validators_upgraded(self):
+        self.cache.close()
+        os.remove(self.path)
+        connection = sqlite3.connect(self.path)
+        connection.execute('CREATE TABLE entries (key TEXT PRIMARY KEY, '
+                           'timestamp REAL NOT NULL, content_hash TEXT NOT '
+                           'NULL, response BLOB NOT NULL)')
+        connection.close()
+        self.cache = GideonAPICache(24, backend=self.make_backend(self.path))
+        self.cache.write('/diseases', {'data': [1]}, last_modified='today')
+        self.assertEqual(
+            self.cache.get_entry('/diseases')[LAST_MODIFIED], 'today')
+
+
+class TestPickleBackend(_BackendTests, unittest.TestCase):
+
+    def make_backend(self, path):
+        return PickleBackend(path, buffer_size=100)
+
+
+class TestSharedCache(unittest.TestCase):
+    """Backends opened on the same file, as by separate processes"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'shared', 'cache')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _entry(self, value):
+        return {TIMESTAMP: dt.now(), RESPONSE: value}
+
+    def test_pickle_entry_written_by_other_process_is_hit(self):
+        first = PickleBackend(self.path, buffer_size=1)
+        second = PickleBackend(self.path, buffer_size=1)
+        self.assertIsNone(second.get('/diseases'))
+        first.set('/diseases', self._entry({'data': [1]}))
+        self.assertEqual(second.get('/diseases')[RESPONSE], {'data': [1]})
+
+    def test_pickle_writes_are_merged(self):
+        first = PickleBackend(self.path, buffer_size=100)
+        second = PickleBackend(self.path, buffer_size=100)
+        first.set('/a', self._entry({'data': [1]}))
+        first.set('/old', self._entry({'data': []}))
+        first.flush()
+        second.set('/b', self._entry({'data': [2]}))
+        second.delete('/old')
+        second.flush()
+        first.flush()
+        self.assertEqual(sorted(PickleBackend(self.path).keys()), ['/a', '/b'])
+        # No temporary files are left behind
+        self.assertEqual(sorted(os.listdir(os.path.dirname(self.path))),
+                         ['cache', 'cache.lock'])
+
+    def test_truncated_pickle_is_ignored(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'wb') as f:
+            f.write(b'\x80\x05\x95')
+        backend = PickleBackend(self.path, buffer_size=1)
+        self.assertEqual(backend.keys(), [])
+        backend.set('/a', self._entry({'data': [1]}))
+        self.assertEqual(PickleBackend(self.path).keys(), ['/a'])
+
+    def test_sqlite_shared_in_wal_mode(self):
+        first = SQLiteBackend(self.path)
+        second = SQLiteBackend(self.path)
+        first.set('/diseases', self._entry({'data': [1]}))
+        self.assertEqual(second.get('/diseases')[RESPONSE], {'data': [1]})
+        self.assertEqual(first._fetch('PRAGMA journal_mode'), [('wal',)])
+        first.close()
+        second.close()
+
+    def test_cache_directory_from_environment(self):
+        with mock.patch.dict(os.environ,
+                             {CACHE_DIR_VARIABLE: self.directory.name}):
+            self.assertEqual(cache_directory(), self.directory.name)
+        with mock.patch.dict(os.environ, {CACHE_DIR_VARIABLE: ''}):
+            self.assertNotIn('site-packages', cache_directory())
+            self.assertTrue(cache_directory().endswith('gideon_api'))
+
+
+class TestCacheLimits(unittest.TestCase):
+
+    def test_max_entries_evicts_least_recently_used(self):
+        cache = GideonAPICache(24, persistent_cache=False, max_entries=2)
+        cache.write('/a', {'data': [1]})
+        cache.write('/b', {'data': [2]})
+        cache.query('/a')
+        cache.write('/c', {'data': [3]})
+        self.assertEqual(sorted(cache.backend.keys()), ['/a', '/c'])
+        self.assertEqual(cache.stats.evictions, 1)
+
+    def test_max_bytes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = GideonAPICache(24,
+                                   backend=SQLiteBackend(
+                                       os.path.join(directory, 'cache')),
+                                   max_bytes=1000)
+            for year in range(10):
+                cache.write(f'/outbreaks?year={year}',
+                            {'data': ['x' * 100] * 3})
+            self.assertLessEqual(cache.stats.bytes, 1000)
+            self.assertEqual(cache.stats.entries, len(cache.backend.keys()))
+            self.assertIsNotNone(cache.query('/outbreaks?year=9'))
+            cache.close()
+
+    def test_limits_applied_to_existing_entries(self):
+        backend = MemoryBackend()
+        for i in range(5):
+            backend.set(
+                f'/{i}', {
+                    TIMESTAMP: dt.now() - timedelta(minutes=10 - i),
+                    RESPONSE: {
+                        'data': [i]
+                    },
+                })
+        cache = GideonAPICache(24, backend=backend, max_entries=3)
+        self.assertEqual(sorted(cache.backend.keys()), ['/2', '/3', '/4'])
+
+    def test_hit_miss_stats(self):
+        cache = GideonAPICache(24, persistent_cache=False)
+        cache.query('/a')
+        cache.write('/a', {'data': []})
+        cache.query('/a')
+        cache.backend.touch('/a', dt.now() - timedelta(hours=25))
+        cache.query('/a')
+        self.assertEqual(
+            (cache.stats.hits, cache.stats.misses, cache.stats.expired),
+            (1, 2, 1))
+
+    def test_background_sweep(self):
+        cache = GideonAPICache(24, persistent_cache=False, sweep_interval=0.01)
+        cache.write('/a', {'data': []})
+        cache.backend.touch('/a', dt.now() - timedelta(hours=25))
+        time.sleep(0.1)
+        self.assertEqual(cache.backend.keys(), [])
+        cache.close()
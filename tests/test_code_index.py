@@ -0,0 +1,71 @@
+import unittest
+from datetime import datetime as dt, timedelta
+from gideon_api.codes import index, lookup_item, lookup_items
+from gideon_api.codes.index import ENDPOINT_ID_NAME, CatalogIndex
+from helpers import FakeTransport, offline_client, use_client
+
+
+class TestCatalogIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.diseases = [
+            {
+                'disease_code': 10100,
+                'disease': 'Anthrax'
+            },
+            {
+                'disease_code': 10390,
+                'disease': 'Cholera '
+            },
+            {
+                'disease_code': 1,
+                'disease': 'Twin'
+            },
+            {
+                'disease_code': 2,
+                'disease': 'twin'
+            },
+        ]
+        self.transport = FakeTransport(lambda *_: {'data': self.diseases})
+        self.client = offline_client(self.transport)
+        use_client(self, self.client, index)
+        self.addCleanup(index._INDEXES.clear)
+
+    def test_exact_lookup(self):
+        self.assertEqual(lookup_item('diseases', ' cholera'), 10390)
+        self.assertEqual(lookup_item('disease', 'Anthrax'), 10100)
+        self.assertIsNone(lookup_item('diseases', 'Anthra'))
+        self.assertEqual(lookup_item('diseases', 'TWIN'), [(1, 'Twin'),
+                                                           (2, 'twin')])
+
+    def test_bulk_lookup(self):
+        names = ['Anthrax', 'cholera', 'missing'] * 1000
+        codes = lookup_items('diseases', names)
+        self.assertEqual(codes, {
+            'Anthrax': 10100,
+            'cholera': 10390,
+            'missing': None
+        })
+        self.assertEqual(len(self.transport.calls), 1)
+
+    def test_index_reused_until_cache_changes(self):
+        first = index.catalog_index('diseases')
+        self.assertIs(index.catalog_index('diseases'), first)
+
+        # The same response fetched again keeps the index
+        self.client._cache.backend.touch('/diseases',
+                                         dt.now() - timedelta(hours=25))
+        self.assertIs(index.catalog_index('diseases'), first)
+        self.assertEqual(len(self.transport.calls), 2)
+
+        self.client._cache.backend.touch('/diseases',
+                                         dt.now() - timedelta(hours=25))
+        self.diseases = [{'disease_code': 3, 'disease': 'Zika'}]
+        self.assertEqual(lookup_item('diseases', 'Zika'), 3)
+        self.assertIsNone(lookup_item('diseases', 'Anthrax'))
+
+    def test_every_endpoint_indexed(self):
+        for api_endpoint, (id_key, name_key) in ENDPOINT_ID_NAME.items():
+            catalog = {'data': [{id_key: 7, name_key: 'Item'}]}
+            self.assertEqual(
+                CatalogIndex(api_endpoint, catalog, 'v').lookup('item'), 7)
@@ -0,0 +1,110 @@
+import unittest
+from unittest import mock
+from pandas import Series, isna
+from gideon_api.codes import index, match_items, search_items
+from gideon_api.codes.search import CatalogSearch, search_key
+
+_DISEASES = {
+    'data': [
+        {
+            'disease_code': 12250,
+            'disease': 'St. Louis encephalitis'
+        },
+        {
+            'disease_code': 11030,
+            'disease': 'Japanese encephalitis'
+        },
+        {
+            'disease_code': 10100,
+            'disease': 'Anthrax'
+        },
+        {
+            'disease_code': 12680,
+            'disease': 'Zika'
+        },
+    ]
+}
+
+
+class TestCatalogSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.index = CatalogSearch('/diseases', _DISEASES, 'v')
+
+    def test_search_key(self):
+        self.assertEqual(search_key(' Sofosbuvir / Velpatasvir'),
+                         search_key('sofosbuvir/velpatasvir'))
+
+    def test_ranked_matches(self):
+        matches = self.index.search('St Louis encephalitis')
+        self.assertEqual(matches[0].code, 12250)
+        self.assertEqual(matches[0].score, 1.0)
+        self.assertEqual(matches[1].code, 11030)
+        self.assertLess(matches[1].score, 1.0)
+
+    def test_misspelling(self):
+        self.assertEqual(self.index.search('antrax', limit=1)[0].code, 10100)
+
+    def test_min_score_and_limit(self):
+        self.assertEqual(self.index.search('xyz', min_score=0.5), [])
+        self.assertEqual(len(self.index.search('encephalitis', limit=1)), 1)
+
+    def test_complete(self):
+        codes = [match.code for match in self.index.complete('enceph')]
+        self.assertEqual(sorted(codes), [11030, 12250])
+        self.assertEqual(self.index.complete('j')[0].code, 11030)
+        self.assertEqual(self.index.complete('louis')[0].code, 12250)
+        self.assertEqual(self.index.complete('q'), [])
+        # The last suffix in sort order, and a prefix matching every item
+        self.assertEqual([m.code for m in self.index.complete('zik')], [12680])
+        self.assertEqual(len(self.index.complete('', limit=10)), 4)
+
+    def test_complete_visits_only_matches(self):
+
+        class _Suffixes(list):
+            visited = 0
+
+            def __getitem__(self, item):
+                if isinstance(item, slice):
+                    raise AssertionError('suffixes copied')
+                _Suffixes.visited += 1
+                return super().__getitem__(item)
+
+        catalog = {
+            'data': [{
+                'disease_code': code,
+                'disease': f'Item {code:04d}'
+            } for code in range(1000)]
+        }
+        search = CatalogSearch('/diseases', catalog, 'v')
+        search._prefixes = _Suffixes(search._prefixes)
+        self.assertEqual(len(search.complete('item 001', limit=20)), 10)
+        # The 10 matches and two binary searches over 2000 suffixes
+        self.assertLess(_Suffixes.visited, 40)
+
+
+class TestSearchFunctions(unittest.TestCase):
+
+    def setUp(self):
+        client = mock.Mock()
+        client.cached_version.return_value = None
+        client.query_gideon_api.return_value = _DISEASES
+        patcher = mock.patch.object(index, 'gideon_api', client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(index._INDEXES.clear)
+
+    def test_search_items(self):
+        self.assertEqual(search_items('diseases', 'zika')[0].code, 12680)
+
+    def test_match_column(self):
+        names = Series(
+            ['anthrax', 'St Louis Encephalitis', 'unknown', None, 'anthrax'],
+            index=list('abcde'))
+        matches = match_items('diseases', names)
+        self.assertEqual(list(matches.index), list('abcde'))
+        self.assertEqual(matches.loc['a', 'code'], 10100)
+        self.assertEqual(matches.loc['b', 'name'], 'St. Louis encephalitis')
+        self.assertTrue(isna(matches.loc['c', 'code']))
+        self.assertTrue(isna(matches.loc['d', 'code']))
+        self.assertEqual(matches.loc['e', 'code'], 10100)
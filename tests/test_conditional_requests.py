@@ -0,0 +1,90 @@
+import time
+import unittest
+from datetime import datetime as dt, timedelta
+from unittest import mock
+from gideon_api.query import GIDEON
+from gideon_api.query.cache import GideonAPICache
+from gideon_api.query.cache_backends import content_hash
+from helpers import FakeTransport
+
+
+def _etag(data):
+    return '"' + content_hash({'data': data}) + '"'
+
+
+class TestConditionalRequests(unittest.TestCase):
+
+    def setUp(self):
+        self.data = [1]
+        self.transport = FakeTransport(lambda *_: {'data': self.data},
+                                       etags=True)
+        self.cache = GideonAPICache(24, persistent_cache=False)
+
+    def _client(self, **kwargs):
+        return GIDEON('key',
+                      transport=self.transport,
+                      cache=self.cache,
+                      **kwargs)
+
+    def _expire(self):
+        self.cache.backend.touch('/diseases', dt.now() - timedelta(hours=25))
+
+    def test_not_modified_refreshes_cache(self):
+        client = self._client()
+        client.query_gideon_api('/diseases', try_dataframe=False)
+        self.assertNotIn('If-None-Match', self.transport.sent_headers[0])
+
+        self._expire()
+        response = client.query_gideon_api('/diseases', try_dataframe=False)
+        self.assertEqual(response, {'data': [1]})
+        self.assertEqual(self.transport.sent_headers[1]['If-None-Match'],
+                         _etag([1]))
+        self.assertEqual(self.cache.stats.revalidated, 1)
+        self.assertIsNotNone(self.cache.query('/diseases'))
+
+    def test_modified_response_replaces_cache(self):
+        client = self._client()
+        client.query_gideon_api('/diseases', try_dataframe=False)
+        self._expire()
+        self.data = [2]
+        response = client.query_gideon_api('/diseases', try_dataframe=False)
+        self.assertEqual(response, {'data': [2]})
+        self.assertEqual(self.cache.stats.revalidated, 0)
+        self.assertEqual(self.cache.get_entry('/diseases')['etag'], _etag([2]))
+
+    def test_stale_while_revalidate(self):
+        client = self._client(stale_while_revalidate=True)
+        client.query_gideon_api('/diseases', try_dataframe=False)
+        self._expire()
+        self.data = [2]
+
+        response = client.query_gideon_api('/diseases', try_dataframe=False)
+        self.assertEqual(response, {'data': [1]})
+        self.assertEqual(self.cache.stats.stale, 1)
+        for _ in range(500):
+            if self.cache.query('/diseases') is not None:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.cache.query('/diseases'), {'data': [2]})
+
+    def test_validators_read_without_response(self):
+        client = self._client()
+        client.query_gideon_api('/diseases', try_dataframe=False)
+        self._expire()
+        self.data = [2]
+        with mock.patch.object(self.cache,
+                               'get_entry',
+                               side_effect=AssertionError('response read')):
+            response = client.query_gideon_api('/diseases', try_dataframe=False)
+        self.assertEqual(response, {'data': [2]})
+        self.assertEqual(self.transport.sent_headers[1]['If-None-Match'],
+                         _etag([1]))
+
+    def test_not_modified_after_eviction_refetched(self):
+        client = self._client()
+        client.query_gideon_api('/diseases', try_dataframe=False)
+        self._expire()
+        with mock.patch.object(self.cache, 'get_entry', return_value=None):
+            response = client.query_gideon_api('/diseases', try_dataframe=False)
+        self.assertEqual(response, {'data': [1]})
+        self.assertNotIn('If-None-Match', self.transport.sent_headers[2])
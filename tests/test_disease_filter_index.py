@@ -0,0 +1,152 @@
+import unittest
+from unittest import mock
+from gideon_api import filter_diseases
+from gideon_api.codes.index import ENDPOINT_ID_NAME
+from gideon_api.diseases import filter_index
+from gideon_api.diseases.filter_index import (DiseaseFilterIndex,
+                                              local_filter_index)
+from helpers import FakeTransport, offline_client, use_client
+
+_DISEASES = {code: f'Disease {code}' for code in range(10100, 10110)}
+# The diseases of each filter value
+_SETS = {
+    ('agent', '1'): [10100, 10101, 10102, 10103],
+    ('agent', '2'): [10104, 10105],
+    ('vector', '7'): [10101, 10103, 10105, 10107],
+    ('country', 'G100'): [10103, 10105, 10109],
+}
+
+
+def _records(codes):
+    return {
+        'data': [{
+            'disease_code': code,
+            'disease': _DISEASES[code]
+        } for code in codes]
+    }
+
+
+def _serve(path, params):
+    """The disease catalog and the diseases of each filter value"""
+    if path == '/diseases':
+        return _records(_DISEASES)
+    if path in ENDPOINT_ID_NAME and path.startswith('/diseases/fingerprint/'):
+        id_key, name_key = ENDPOINT_ID_NAME[path]
+        return {
+            'data': [{
+                id_key: int(code) if code.isdigit() else code
+            } for dimension, code in _SETS if dimension == name_key]
+        }
+    if path.startswith('/diseases/countries/'):
+        return _records(_SETS['country', path.rsplit('/', 1)[1]])
+    if path == '/diseases/filter':
+        sets = [
+            set(_SETS.get((key, str(value)), []))
+            for key, value in params.items()
+        ]
+        return _records(sorted(set.intersection(*sets)))
+    return None
+
+
+class TestDiseaseFilterIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = FakeTransport(_serve)
+        self.client = offline_client(self.transport)
+        use_client(self, self.client, filter_index)
+        self.index = DiseaseFilterIndex()
+        patcher = mock.patch.object(filter_index, '_INDEX', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_intersections(self):
+        self.assertEqual(self.index.codes(agent=1, vector=7), [10101, 10103])
+        self.assertEqual(self.index.codes(agent=1, vector=7, country='G100'),
+                         [10103])
+        self.assertEqual(self.index.codes(agent=2, country='G100'), [10105])
+        self.assertEqual(self.index.codes(agent=1, country=None),
+                         [10100, 10101, 10102, 10103])
+        self.assertEqual(self.index.codes(), list(_DISEASES))
+
+    def test_values_fetched_once(self):
+        self.index.codes(agent=1, vector=7)
+        self.index.codes(vector=7, country='G100')
+        self.index.codes(agent=1, vector=7, country='G100')
+        self.assertEqual(self.transport.calls, [
+            ('/diseases', None),
+            ('/diseases/filter', {
+                'agent': 1
+            }),
+            ('/diseases/filter', {
+                'vector': 7
+            }),
+            ('/diseases/countries/G100', None),
+        ])
+
+    def test_matches_server(self):
+        self.assertIs(local_filter_index(), self.index)
+        local = filter_diseases(agent=1, vector=7, local=True)
+        self.assertEqual(local.to_dict('records'), [{
+            'disease_code': 10101,
+            'disease': 'Disease 10101'
+        }, {
+            'disease_code': 10103,
+            'disease': 'Disease 10103'
+        }])
+        with mock.patch('gideon_api.diseases.filter.gideon_api', self.client):
+            online = filter_diseases(agent=1, vector=7)
+        self.assertEqual(online.to_dict('records'), local.to_dict('records'))
+
+    def test_catalog_records_returned(self):
+        catalog = _records(_DISEASES)
+        for record in catalog['data']:
+            record['category'] = 'bacterial'
+        self.client._cache.write('/diseases', catalog)
+        frame = self.index.filter(agent=2)
+        self.assertEqual(list(frame.columns),
+                         ['disease_code', 'disease', 'category'])
+        self.assertEqual(frame['disease_code'].tolist(), [10104, 10105])
+
+    def test_bitsets_of_an_earlier_catalog_not_combined(self):
+        self.index.codes(agent=1, vector=7)
+        real_bitset = self.index._bitset
+
+        def renumbering_bitset(dimension, code):
+            # The catalog changes while the first value is being read
+            found = real_bitset(dimension, code)
+            if dimension == 'agent':
+                self.client._cache.write('/diseases', _records([10103, 10101]))
+                self.index._check_catalog()
+            return found
+
+        with mock.patch.object(self.index, '_bitset', renumbering_bitset):
+            self.assertEqual(self.index.codes(agent=1, vector=7),
+                             [10103, 10101])
+
+    def test_prefetch(self):
+        self.assertEqual(self.index.prefetch(['agent']), 2)
+        calls = len(self.transport.calls)
+        self.assertEqual(self.index.codes(agent=2), [10104, 10105])
+        self.assertEqual(len(self.transport.calls), calls)
+        with self.assertRaises(ValueError):
+            self.index.prefetch(['colour'])
+
+    def test_prefetch_every_dimension(self):
+        # Two agents, a vector and a country
+        self.assertEqual(self.index.prefetch(), 4)
+        self.assertIn(('/diseases/fingerprint/countries', None),
+                      self.transport.calls)
+        calls = len(self.transport.calls)
+        self.assertEqual(self.index.codes(vector=7, country='G100'),
+                         [10103, 10105])
+        self.assertEqual(len(self.transport.calls), calls)
+
+    def test_rebuilt_when_catalog_changes(self):
+        self.index.codes(agent=1)
+        self.client._cache.write('/diseases', _records([10103, 10102]))
+        self.assertEqual(self.index.codes(agent=1),
+                         [10103, 10102, 10100, 10101])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import numpy as np
+import pandas as pd
+from shapely.geometry import Point, Polygon, box
+from gideon_api import OutbreakIndex
+from gideon_api.utilities.geoquery import haversine_km
+from helpers import random_outbreaks
+
+
+class TestOutbreakIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.df = random_outbreaks(2000)
+        self.index = OutbreakIndex(self.df)
+        # Query points include the antimeridian and both poles
+        self.lat = np.array([0.0, -1.2864, 51.5, 89.9, -89.5, 10.0])
+        self.lon = np.array([0.0, 36.8172, -0.1, 45.0, 120.0, 179.9])
+
+    def _distances(self, lat, lon):
+        return haversine_km(lat, lon, self.df['latitude'].to_numpy(),
+                            self.df['longitude'].to_numpy())
+
+    def test_haversine(self):
+        # London to Paris
+        self.assertAlmostEqual(haversine_km(51.5074, -0.1278, 48.8566, 2.3522),
+                               343.6,
+                               delta=0.5)
+
+    def test_within_radius_matches_scan(self):
+        for radius in (100, 1000, 5000, 25000):
+            result = self.index.within_radius(self.lat, self.lon, radius)
+            for query, (lat, lon) in enumerate(zip(self.lat, self.lon)):
+                with self.subTest(radius=radius, query=query):
+                    distances = self._distances(lat, lon)
+                    expected = sorted(self.df.index[distances <= radius],
+                                      key=lambda label: distances[label - 1000])
+                    matches = result[result['query'] == query]
+                    self.assertEqual(list(matches.index), expected)
+                    self.assertTrue(matches['distance_km'].le(radius).all())
+
+    def test_radius_per_query(self):
+        result = self.index.within_radius([0, 0], [0, 0], [0, 2000])
+        self.assertEqual(set(result['query']), {1})
+
+    def test_nearest_matches_scan(self):
+        for k in (1, 5, 50):
+            result = self.index.nearest(self.lat, self.lon, k)
+            for query, (lat, lon) in enumerate(zip(self.lat, self.lon)):
+                with self.subTest(k=k, query=query):
+                    distances = self._distances(lat, lon)
+                    expected = list(self.df.index[np.argsort(
+                        distances, kind='stable')[:k]])
+                    matches = result[result['query'] == query]
+                    self.assertEqual(list(matches.index), expected)
+
+    def test_nearest_more_than_indexed(self):
+        index = OutbreakIndex(self.df.head(3))
+        self.assertEqual(len(index.nearest(0, 0, 10)), 3)
+
+    def test_within_polygons(self):
+        polygons = [
+            box(-10, -10, 10, 10),
+            Polygon([(100, 0), (140, 0), (120, 40)]),
+        ]
+        result = self.index.within_polygons(polygons)
+        for query, polygon in enumerate(polygons):
+            with self.subTest(query=query):
+                expected = [
+                    label for label, lat, lon in
+                    zip(self.df.index, self.df['latitude'],
+                        self.df['longitude'])
+                    if polygon.contains(Point(lon, lat))
+                ]
+                self.assertEqual(list(result.index[result['query'] == query]),
+                                 expected)
+        self.assertEqual(len(self.index.within_polygons(polygons[0])),
+                         (result['query'] == 0).sum())
+
+    def test_rows_without_location_left_out(self):
+        df = pd.DataFrame({
+            'latitude': ['1.5', None],
+            'longitude': ['2.5', '3.0'],
+        })
+        index = OutbreakIndex(df)
+        self.assertEqual(len(index), 1)
+        self.assertEqual(list(index.nearest(0, 0)['latitude']), ['1.5'])
+
+
+if __name__ == '__main__':
+    unittest.main()
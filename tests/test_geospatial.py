@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+import geopandas
+import pandas as pd
+from gideon_api import to_geojson
+from helpers import FakeTransport, offline_client
+
+
+class TestToGeoJSON(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'country': ['Kenya', 'Peru', 'Unknown'],
+            'latitude': ['-1.2864', '-12.0464', None],
+            'longitude': ['36.8172', '-77.0428', None],
+        })
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_points_from_columns(self):
+        gdf = to_geojson(self.df)
+        self.assertEqual(list(gdf['country']), ['Kenya', 'Peru'])
+        self.assertEqual(gdf.geometry.name, 'centroid')
+        self.assertEqual(gdf.crs, 'EPSG:4326')
+        self.assertEqual((gdf.geometry.x[0], gdf.geometry.y[0]),
+                         (36.8172, -1.2864))
+        self.assertEqual(gdf['latitude'].dtype, 'float64')
+        # The input is left unchanged
+        self.assertEqual(list(self.df.columns),
+                         ['country', 'latitude', 'longitude'])
+        self.assertEqual(self.df['latitude'][0], '-1.2864')
+
+    def test_outbreak_response(self):
+        # Outbreak responses send coordinates as strings
+        records = self.df.where(self.df.notna(), None).to_dict('records')
+        client = offline_client(FakeTransport(lambda *_: {'data': records}))
+        outbreaks = client.query_gideon_api('/diseases/outbreaks',
+                                            {'year': 2020})
+        gdf = to_geojson(outbreaks)
+        self.assertEqual(list(gdf['country']), ['Kenya', 'Peru'])
+        self.assertEqual((gdf.geometry.x[1], gdf.geometry.y[1]),
+                         (-77.0428, -12.0464))
+
+    def test_missing_columns(self):
+        with self.assertRaises(ValueError):
+            to_geojson(self.df.drop(columns='latitude'))
+
+    def test_file_formats(self):
+        for name, driver in (('outbreaks.geojson', 'GeoJSON'),
+                             ('outbreaks.fgb', 'FlatGeobuf'), ('outbreaks.gpkg',
+                                                               'GPKG')):
+            with self.subTest(driver=driver):
+                path = os.path.join(self.directory, name)
+                self.assertIsNone(to_geojson(self.df, path, False))
+                gdf = geopandas.read_file(path)
+                self.assertEqual(list(gdf['country']), ['Kenya', 'Peru'])
+
+    def test_explicit_file_format(self):
+        path = os.path.join(self.directory, 'outbreaks.data')
+        to_geojson(self.df, path, file_format='FlatGeobuf')
+        self.assertEqual(len(geopandas.read_file(path)), 2)
+        with self.assertRaises(ValueError):
+            to_geojson(self.df, path, file_format='KML')
+
+
+if __name__ == '__main__':
+    unittest.main()
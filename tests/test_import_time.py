@@ -0,0 +1,47 @@
+import json
+import subprocess
+import sys
+import unittest
+
+# Libraries which should only be imported once they are needed
+_DEFERRED_MODULES = ('pandas', 'numpy', 'requests', 'urllib3', 'geopandas',
+                     'fiona', 'shapely', 'asyncio')
+
+_IMPORT_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import gideon_api
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'seconds': elapsed,
+    'modules': sorted(sys.modules),
+    'cache_opened': gideon_api.gideon_api._cache._backend is not None,
+}))
+'''
+
+
+def _import_in_subprocess():
+    output = subprocess.run([sys.executable, '-c', _IMPORT_SCRIPT],
+                            check=True,
+                            stdout=subprocess.PIPE).stdout
+    return json.loads(output)
+
+
+class TestImportTime(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Take the fastest of a few runs to reduce noise from the machine
+        runs = [_import_in_subprocess() for _ in range(3)]
+        cls.result = min(runs, key=lambda run: run['seconds'])
+
+    def test_heavy_dependencies_deferred(self):
+        loaded = set(self.result['modules'])
+        for module in _DEFERRED_MODULES:
+            self.assertNotIn(module, loaded)
+
+    def test_cache_not_loaded(self):
+        self.assertFalse(self.result['cache_opened'])
+
+    def test_import_time(self):
+        self.assertLess(self.result['seconds'], 0.2)
@@ -1,9 +1,21 @@
+import os.path
 import unittest
 from gideon_api import lookup_item
+from gideon_api.codes import index
+from gideon_api.query.replay import ReplayTransport
+from helpers import offline_client, use_client
+
+# Catalog responses holding the items looked up, as fixtures replayed in place
+# of the live API
+_FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'catalogs')
 
 
 class TestLookupItemExact(unittest.TestCase):
 
+    def setUp(self):
+        use_client(self, offline_client(ReplayTransport(_FIXTURES)), index)
+        self.addCleanup(index._INDEXES.clear)
+
     def test_lookup_diseases(self):
         disease_and_id = (
             ('Anthrax', 10100),
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+from gideon_api import Mirror
+from gideon_api.codes.index import ENDPOINT_ID_NAME
+from gideon_api.query.cache_backends import content_hash
+from helpers import FakeTransport, offline_client
+
+
+class TestMirror(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'mirror.sqlite3')
+        # A small database whose responses can be changed
+        self.responses = {}
+        for path, (id_key, name_key) in ENDPOINT_ID_NAME.items():
+            self.responses[path] = {'data': [{id_key: 1, name_key: 'First'}]}
+        self.responses['/diseases/outbreaks'] = {'data': [{'year': 2020}]}
+        self.responses['/diseases/1/countries'] = {'data': [{'country': 'A'}]}
+        self.responses['/diseases/countries/1'] = {'data': [{'disease': 'B'}]}
+        self.transport = FakeTransport(
+            lambda path, params: self.responses.get(path), etags=True)
+        self.client = offline_client(self.transport)
+        self.mirror = self._open()
+
+    def _open(self):
+        mirror = Mirror(self.path, self.client)
+        self.addCleanup(mirror.close)
+        return mirror
+
+    def test_endpoints(self):
+        self.assertEqual(self.mirror.endpoints(['endemic_countries']), [])
+        self.mirror.sync(self.mirror.endpoints(['catalogs']))
+        self.assertEqual(
+            self.mirror.endpoints(
+                ['outbreaks', 'endemic_countries', 'endemic_diseases'],
+                years=[2019, 2020]), [('/diseases/outbreaks', {
+                    'year': 2019
+                }), ('/diseases/outbreaks', {
+                    'year': 2020
+                }), ('/diseases/1/countries', None),
+                                      ('/diseases/countries/1', None)])
+        with self.assertRaises(ValueError):
+            self.mirror.endpoints(['travel'])
+
+    def test_only_changed_responses_replaced(self):
+        queries = self.mirror.endpoints(['catalogs'
+                                        ]) + [('/diseases/outbreaks', {
+                                            'year': 2020
+                                        }), ('/diseases/1/countries', None)]
+        changed = self.mirror.sync(queries)
+        self.assertTrue(all(changed.values()))
+        self.assertEqual(len(self.mirror), len(queries))
+
+        self.responses['/drugs'] = {
+            'data': [{
+                'drug_code': 1,
+                'drug': 'Renamed'
+            }]
+        }
+        changed = self.mirror.sync(queries)
+        self.assertEqual([uri for uri, c in changed.items() if c], ['/drugs'])
+        # Unchanged responses are not sent again
+        self.assertEqual(self.transport.not_modified, len(queries) - 1)
+        self.assertEqual(
+            self.mirror.query('/drugs', try_dataframe=False)['data'][0]['drug'],
+            'Renamed')
+        self.assertEqual(self.mirror.versions()['/drugs'],
+                         content_hash(self.responses['/drugs']))
+
+    def test_reads_served_locally(self):
+        self.mirror.sync([('/diseases/outbreaks', {'year': 2020})])
+        calls = len(self.transport.calls)
+        frame = self.mirror.query('/diseases/outbreaks', {'year': 2020})
+        self.assertEqual(list(frame['year']), [2020])
+        # Callers get their own copy of the converted DataFrame
+        frame['year'] = 0
+        self.assertEqual(
+            list(
+                self.mirror.query('/diseases/outbreaks',
+                                  {'year': 2020})['year']), [2020])
+        self.assertIn(('/diseases/outbreaks', {'year': 2020}), self.mirror)
+        self.assertNotIn('/drugs', self.mirror)
+        with self.assertRaises(KeyError):
+            self.mirror.query('/drugs')
+        self.assertEqual(len(self.transport.calls), calls)
+
+    def test_persisted_between_sessions(self):
+        self.mirror.sync([('/vaccines', None)])
+        self.mirror.close()
+        mirror = self._open()
+        self.assertEqual(mirror.query('/vaccines', try_dataframe=False),
+                         self.responses['/vaccines'])
+        # The stored validators are sent with the next sync
+        self.assertEqual(mirror.sync([('/vaccines', None)]),
+                         {'/vaccines': False})
+        self.assertEqual(self.transport.not_modified, 1)
+
+    def test_sync_everything(self):
+        changed = self.mirror.sync()
+        self.assertIn('/diseases/1/countries', changed)
+        self.assertIn('/diseases/countries/1', changed)
+        self.assertIn('/diseases/outbreaks?year=2020', changed)
+
+
+if __name__ == '__main__':
+    unittest.main()
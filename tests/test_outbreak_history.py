@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from gideon_api.diseases import history
+from gideon_api.query import RetryPolicy
+from helpers import FakeTransport, fake_response, offline_client, use_client
+
+
+class TestOutbreaksRange(unittest.TestCase):
+
+    def setUp(self):
+        # Outbreaks are served for each year, except the failing years
+        self.failing = set()
+        self.transport = FakeTransport(self._serve)
+        use_client(
+            self,
+            offline_client(self.transport, retry_policy=RetryPolicy.never()),
+            history)
+
+    def _serve(self, path, params):
+        year = params['year']
+        if year in self.failing:
+            return fake_response(status=503)
+        data = [{'disease_code': 10100, 'country_code': 'G100'}]
+        if year % 2:
+            data.append({'disease_code': 10390, 'cases': year})
+        return {'data': data}
+
+    @property
+    def years(self):
+        return [params['year'] for _, params in self.transport.calls]
+
+    def test_years_combined_in_order(self):
+        frame = history.outbreaks_range(2000, 2009, max_workers=4)
+        self.assertEqual(len(frame), 15)
+        self.assertEqual(list(frame['year'].unique()), list(range(2000, 2010)))
+        self.assertEqual(set(frame.columns),
+                         {'disease_code', 'country_code', 'year', 'cases'})
+        self.assertTrue(frame.loc[frame['year'] == 2000, 'cases'].isna().all())
+        self.assertEqual(sorted(self.years), list(range(2000, 2010)))
+
+    def test_resumes_after_failure(self):
+        self.failing = {2003}
+        with self.assertRaises(ConnectionError):
+            history.outbreaks_range(2000, 2005)
+        self.failing = set()
+        self.transport.calls.clear()
+        frame = history.outbreaks_range(2000, 2005)
+        self.assertEqual(self.years, [2003])
+        self.assertEqual(len(frame['year'].unique()), 6)
+
+    def test_parquet_partitions_share_schema(self):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+        with tempfile.TemporaryDirectory() as directory:
+            frame = history.outbreaks_range(2000, 2003, directory=directory)
+            schemas = [
+                pyarrow.parquet.read_schema(
+                    os.path.join(directory, f'year={year}', 'data.parquet'))
+                for year in range(2000, 2004)
+            ]
+            # Years without cases only lack the column outside the schema
+            self.assertEqual(schemas[0], schemas[2])
+            self.assertEqual(schemas[1], schemas[3])
+            self.assertEqual(schemas[0].field('disease_code').type,
+                             schemas[1].field('disease_code').type)
+
+            self.assertEqual(frame['year'].dtype.name, 'int64')
+            self.assertEqual(frame['year'].tolist(),
+                             [2000, 2001, 2001, 2002, 2003, 2003])
+            self.assertEqual(frame['disease_code'].dtype.name, 'int64')
+            self.assertEqual(frame['country_code'].dtype.name, 'category')
+            self.assertTrue(frame.loc[frame['year'] == 2000,
+                                      'cases'].isna().all())
+            self.assertEqual(frame['cases'].dropna().tolist(), [2001, 2003])
+
+            # Years already written are read back without downloading them
+            self.transport.calls.clear()
+            again = history.outbreaks_range(2000, 2003, directory=directory)
+            self.assertEqual(self.years, [])
+            self.assertEqual(len(again), len(frame))
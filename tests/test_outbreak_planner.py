@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+from unittest import mock
+from gideon_api import aio
+from gideon_api.diseases import outbreaks
+from gideon_api.query import AsyncGIDEON
+from gideon_api.query.api_wrapper import _cache_uri
+from helpers import FakeTransport, offline_client, use_client
+
+_OUTBREAKS = [
+    {
+        'disease_code': 10100,
+        'country_code': 'G100',
+        'year': 2020
+    },
+    {
+        'disease_code': 10390,
+        'country_code': 'G100',
+        'year': 2020
+    },
+    {
+        'disease_code': 10390,
+        'country_code': 'G200',
+        'year': 2020
+    },
+]
+
+
+def _serve(path, params):
+    """Serves outbreaks of every country, or of a single country"""
+    if path == '/diseases/outbreaks':
+        return {'data': _OUTBREAKS}
+    code = path.rsplit('/', 1)[1]
+    return {'data': [row for row in _OUTBREAKS if row['country_code'] == code]}
+
+
+class TestOutbreakPlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = FakeTransport(_serve)
+        self.client = offline_client(self.transport)
+        use_client(self, self.client, outbreaks)
+        self.addCleanup(outbreaks._INDEXED.clear)
+
+    def test_single_country_queried_directly(self):
+        frame = outbreaks.outbreaks_by_country_year('G100', 2020)
+        self.assertEqual(len(frame), 2)
+        self.assertEqual(self.transport.paths,
+                         ['/diseases/outbreaks/distribution/G100'])
+
+    def test_many_countries_fetched_in_bulk(self):
+        frames = outbreaks.outbreaks_by_countries_year(2020,
+                                                       ['G100', 'G200', 'G300'])
+        self.assertEqual(self.transport.paths, ['/diseases/outbreaks'])
+        self.assertEqual(list(frames['G100']['disease_code']), [10100, 10390])
+        self.assertEqual(len(frames['G200']), 1)
+        self.assertEqual(len(frames['G300']), 0)
+        bulk = outbreaks.outbreaks_by_year(2020)
+        for frame in frames.values():
+            self.assertEqual(dict(frame.dtypes), dict(bulk.dtypes))
+
+        # Single country queries do not depend on what is cached
+        frame = outbreaks.outbreaks_by_country_year('G200', 2020)
+        self.assertEqual(list(frame['disease_code']), [10390])
+        self.assertEqual(self.transport.paths[-1],
+                         '/diseases/outbreaks/distribution/G200')
+
+    def test_one_country_fetched_in_bulk(self):
+        frames = outbreaks.outbreaks_by_countries_year(2020, ['G200'])
+        self.assertEqual(self.transport.paths, ['/diseases/outbreaks'])
+        self.assertEqual(len(frames['G200']), 1)
+
+    def test_every_country(self):
+        frames = outbreaks.outbreaks_by_countries_year(2020)
+        self.assertEqual(sorted(frames), ['G100', 'G200'])
+        self.assertEqual(len(self.transport.paths), 1)
+
+    def test_indexed_years_bounded(self):
+        years = range(2000, 2000 + outbreaks.MAX_INDEXED_YEARS + 3)
+        for year in years:
+            outbreaks.outbreaks_by_countries_year(year, ['G100'])
+        self.assertEqual(len(outbreaks._INDEXED), outbreaks.MAX_INDEXED_YEARS)
+        # The least recently used years are dropped
+        self.assertEqual(list(outbreaks._INDEXED), [
+            _cache_uri('/diseases/outbreaks', {'year': year})
+            for year in years[-outbreaks.MAX_INDEXED_YEARS:]
+        ])
+
+    def test_async_bulk_fetch(self):
+        async_client = AsyncGIDEON(client=self.client)
+        with mock.patch.object(aio.diseases, 'async_gideon_api', async_client):
+            frames = asyncio.run(
+                aio.outbreaks_by_countries_year(2020, ['G100', 'G200']))
+            every_country = asyncio.run(aio.outbreaks_by_countries_year(2020))
+        async_client.close()
+        self.assertEqual(self.transport.paths, ['/diseases/outbreaks'])
+        self.assertEqual(len(frames['G100']), 2)
+        # The same countries as the synchronous version
+        self.assertEqual(sorted(every_country),
+                         sorted(outbreaks.outbreaks_by_countries_year(2020)))
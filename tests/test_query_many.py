@@ -0,0 +1,74 @@
+import time
+import unittest
+import gideon_api
+from helpers import FakeTransport, offline_client, use_client
+
+
+def _echo(path, params):
+    """Echoes the query, or answers 404 for paths under /missing"""
+    if path.startswith('/missing'):
+        return None
+    return {'data': [{'path': path, 'params': params or {}}]}
+
+
+class TestQueryMany(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = FakeTransport(_echo, delay=0.05)
+        self.client = offline_client(self.transport)
+
+    def test_results_in_order(self):
+        queries = [('/diseases/outbreaks', {
+            'year': year
+        }) for year in range(2000, 2012)] + ['/drugs']
+        start = time.perf_counter()
+        results = self.client.query_many(queries,
+                                         try_dataframe=False,
+                                         max_workers=4)
+        elapsed = time.perf_counter() - start
+        self.assertEqual([result['data'][0]['params'] for result in results], [{
+            'year': year
+        } for year in range(2000, 2012)] + [{}])
+        self.assertEqual(self.transport.max_active, 4)
+        # 13 queries of 50 ms on 4 workers take 4 rounds
+        self.assertLess(elapsed, 13 * self.transport.delay)
+
+    def test_cache_hits_answered_first(self):
+        self.client.query_gideon_api('/drugs', try_dataframe=False)
+        self.transport.calls.clear()
+        results = list(
+            self.client.query_many(['/vaccines', '/drugs', '/countries'],
+                                   try_dataframe=False,
+                                   as_completed=True))
+        self.assertEqual(results[0][0], 1)
+        self.assertEqual(sorted(position for position, _ in results), [0, 1, 2])
+        self.assertEqual(sorted(self.transport.paths),
+                         ['/countries', '/vaccines'])
+
+    def test_dataframes(self):
+        frames = self.client.query_many(['/drugs', '/vaccines'])
+        self.assertEqual([frame['path'][0] for frame in frames],
+                         ['/drugs', '/vaccines'])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            self.client.query_many(['/drugs', '/missing'])
+        results = self.client.query_many(['/drugs', '/missing'],
+                                         try_dataframe=False,
+                                         return_exceptions=True)
+        self.assertEqual(results[0]['data'][0]['path'], '/drugs')
+        self.assertIsInstance(results[1], ValueError)
+
+    def test_identical_queries_share_a_call(self):
+        self.client.query_many(['/drugs'] * 5, max_workers=5)
+        self.assertEqual(self.transport.paths, ['/drugs'])
+
+    def test_top_level(self):
+        use_client(self, self.client, gideon_api)
+        results = gideon_api.query_many(['/drugs', ('/vaccines', None)],
+                                        try_dataframe=False)
+        self.assertEqual(len(results), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from gideon_api.query.rate_limit import RateLimiter, TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_is_immediate(self):
+        bucket = TokenBucket(rate=1, burst=5)
+        for _ in range(5):
+            self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 1, places=2)
+
+    def test_sustained_rate(self):
+        bucket = TokenBucket(rate=50, burst=1)
+        start = time.perf_counter()
+        for _ in range(11):
+            bucket.acquire()
+        self.assertAlmostEqual(time.perf_counter() - start, 0.2, delta=0.05)
+
+    def test_threads_share_bucket(self):
+        bucket = TokenBucket(rate=100, burst=1)
+        waits = []
+
+        def worker():
+            waits.append(bucket.reserve())
+
+        threads = [threading.Thread(target=worker) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Each thread reserves its own slot, spaced by 1/rate
+        self.assertAlmostEqual(max(waits), 0.19, delta=0.02)
+        self.assertEqual(min(waits), 0)
+
+    def test_state_file_shared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            state_file = os.path.join(directory, 'bucket')
+            first = TokenBucket(rate=1, burst=2, state_file=state_file)
+            second = TokenBucket(rate=1, burst=2, state_file=state_file)
+            self.assertEqual(first.reserve(), 0)
+            self.assertEqual(second.reserve(), 0)
+            self.assertAlmostEqual(first.reserve(), 1, places=2)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_endpoint_prefix(self):
+        outbreaks = TokenBucket(rate=1)
+        limiter = RateLimiter(endpoints={'/diseases/outbreaks': outbreaks})
+        self.assertIs(
+            limiter.endpoint_bucket('/diseases/outbreaks/distribution/G100'),
+            outbreaks)
+        self.assertIsNone(limiter.endpoint_bucket('/diseases/outbreaksx'))
+        self.assertIsNone(limiter.endpoint_bucket('/drugs'))
+
+    def test_from_delay(self):
+        limiter = RateLimiter.from_delay(0.05)
+        limiter.acquire('/diseases')
+        self.assertAlmostEqual(limiter.acquire('/drugs'), 0.05, delta=0.01)
+        self.assertIsNone(RateLimiter.from_delay(None).default)
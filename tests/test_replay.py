@@ -0,0 +1,150 @@
+import json
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from gideon_api.query import (HTTPTransport, RateLimiter, RecordingTransport,
+                              ReplayTransport, RetryPolicy)
+from gideon_api.query.replay import FixtureStore, fixture_name
+from gideon_api.query.standin import StandInServer
+from helpers import FakeTransport, offline_client
+
+_DISEASES = {'data': [{'disease_code': 10100, 'disease': 'Anthrax'}]}
+
+
+def _live(path, params):
+    """Stands in for the GIDEON API while recording"""
+    return dict(_DISEASES, params=params or {})
+
+
+def _client(transport, **kwargs):
+    return offline_client(transport, rate_limiter=RateLimiter(), **kwargs)
+
+
+class TestRecordReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.fixtures = self.directory.name
+
+    def _record(self):
+        live = FakeTransport(_live,
+                             headers={
+                                 'ETag': '"v1"',
+                                 'Set-Cookie': 'session=secret'
+                             })
+        client = _client(RecordingTransport(live, self.fixtures))
+        client.query_gideon_api('/diseases', try_dataframe=False)
+        client.query_gideon_api('/diseases/outbreaks', {'year': 2020},
+                                try_dataframe=False)
+        return live
+
+    def test_fixture_names(self):
+        self.assertEqual(fixture_name('/diseases/outbreaks'),
+                         'diseases_outbreaks.json')
+        params = {'year': 2020, 'x': 'y'}
+        self.assertEqual(fixture_name('/a', params),
+                         fixture_name('/a', {
+                             'x': 'y',
+                             'year': '2020'
+                         }))
+        self.assertNotEqual(fixture_name('/a', {'year': 2020}),
+                            fixture_name('/a', {'year': 2021}))
+
+    def test_replay_matches_recording(self):
+        self._record()
+        self.assertEqual(
+            FixtureStore(self.fixtures).paths(),
+            ['/diseases', '/diseases/outbreaks'])
+        client = _client(ReplayTransport(self.fixtures))
+        self.assertEqual(
+            client.query_gideon_api('/diseases/outbreaks', {'year': 2020},
+                                    try_dataframe=False)['params'],
+            {'year': 2020})
+        with self.assertRaises(FileNotFoundError):
+            client.query_gideon_api('/drugs')
+
+    def test_only_selected_headers_recorded(self):
+        self._record()
+        fixture = FixtureStore(self.fixtures).load('/diseases')
+        self.assertEqual(fixture['headers'], {'ETag': '"v1"'})
+
+    def test_replay_revalidates(self):
+        self._record()
+        transport = ReplayTransport(self.fixtures)
+        r = transport.get('https://api.gideononline.com/diseases',
+                          headers={'If-None-Match': '"v1"'})
+        self.assertEqual(r.status_code, 304)
+
+
+class TestStandInServer(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.fixtures = directory.name
+        FixtureStore(self.fixtures).save('/diseases', None,
+                                         200, {'ETag': '"v1"'},
+                                         json.dumps(_DISEASES))
+
+    def _serve(self, **kwargs):
+        server = StandInServer(self.fixtures, **kwargs)
+        self.addCleanup(server.close)
+        transport = HTTPTransport()
+        self.addCleanup(transport.close)
+        return server, transport
+
+    def test_serves_fixtures_over_http(self):
+        server, transport = self._serve()
+        client = _client(transport, api_origin=server.origin)
+        self.assertEqual(client.query_gideon_api_online('/diseases'), _DISEASES)
+        with self.assertRaises(ValueError):
+            client.query_gideon_api_online('/drugs')
+
+        with ThreadPoolExecutor(4) as executor:
+            results = list(
+                executor.map(
+                    lambda _: client.query_gideon_api_online('/diseases'),
+                    range(20)))
+        self.assertTrue(all(result == _DISEASES for result in results))
+        self.assertEqual(server.stats.requests, 22)
+        # Connections are kept open between requests
+        self.assertLess(transport.stats.new_connections, 10)
+
+    def test_errors_are_retried(self):
+        server, transport = self._serve(error_rate=0.5, seed=1)
+        client = _client(transport,
+                         api_origin=server.origin,
+                         retry_policy=RetryPolicy(max_attempts=10,
+                                                  backoff_base=0.001))
+        for _ in range(5):
+            self.assertEqual(client.query_gideon_api_online('/diseases'),
+                             _DISEASES)
+        self.assertGreater(server.stats.errors, 0)
+        self.assertEqual(client.retry_stats.retries, server.stats.errors)
+
+    def test_throttling(self):
+        server, transport = self._serve(rate_limit=2, retry_after=0)
+        client = _client(transport,
+                         api_origin=server.origin,
+                         retry_policy=RetryPolicy.never())
+        statuses = [
+            client.query_gideon_api_online(
+                '/diseases', return_response_object=True).status_code
+            for _ in range(3)
+        ]
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(server.stats.throttled, 1)
+
+    def test_conditional_requests(self):
+        server, transport = self._serve()
+        client = _client(transport, api_origin=server.origin)
+        client.query_gideon_api('/diseases', try_dataframe=False)
+        client.query_gideon_api('/diseases',
+                                try_dataframe=False,
+                                cache_expiration_hours=0)
+        self.assertEqual(server.stats.not_modified, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import unittest
+from unittest import mock
+import requests
+from urllib3.exceptions import ProtocolError
+from gideon_api.query.retry import (CircuitBreaker, CircuitOpenError,
+                                    RetryPolicy, parse_retry_after)
+from helpers import FakeTransport, fake_response, offline_client
+
+
+class _CutStream:
+    """A response body whose connection is lost after the first chunk"""
+
+    def stream(self, chunk_size, decode_content=True):
+        yield b'{"data": [{"disease_code": 10100}'
+        raise ProtocolError('Connection broken: IncompleteRead')
+
+    def close(self):
+        pass
+
+
+def _scripted(*statuses, headers=None):
+    """A transport replying with the given status codes in order, with None
+        a refused connection and 'cut' a 200 response whose body is cut
+        short.
+    """
+    statuses = list(statuses)
+
+    def serve(path, params):
+        status = statuses.pop(0)
+        if status is None:
+            raise requests.ConnectionError('connection refused')
+        if status == 'cut':
+            r = fake_response()
+            r.raw = _CutStream()
+            return r
+        return fake_response({'data': []}, status, headers)
+
+    return FakeTransport(serve)
+
+
+def _client(transport, **kwargs):
+    kwargs.setdefault('retry_policy', RetryPolicy(backoff_base=0.001))
+    return offline_client(transport, **kwargs)
+
+
+class TestRetry(unittest.TestCase):
+
+    def test_transient_errors_retried(self):
+        transport = _scripted(503, None, 429, 200)
+        client = _client(transport)
+        self.assertEqual(client.query_gideon_api_online('/diseases'),
+                         {'data': []})
+        self.assertEqual(client.retry_stats.retries, 3)
+        self.assertEqual(len(transport.calls), 4)
+
+    def test_gives_up_after_max_attempts(self):
+        transport = _scripted(500, 500, 500)
+        client = _client(transport,
+                         retry_policy=RetryPolicy(max_attempts=3,
+                                                  backoff_base=0.001))
+        with self.assertRaises(ConnectionError):
+            client.query_gideon_api_online('/diseases')
+        self.assertEqual(client.retry_stats.gave_up, 1)
+
+    def test_body_cut_short_retried(self):
+        transport = _scripted('cut', 200)
+        client = _client(transport)
+        self.assertEqual(
+            client.query_gideon_api('/diseases', try_dataframe=False),
+            {'data': []})
+        self.assertEqual(client.retry_stats.retries, 1)
+
+    def test_body_cut_short_raises_connection_error(self):
+        client = _client(_scripted(*['cut'] * 5),
+                         retry_policy=RetryPolicy(max_attempts=2,
+                                                  backoff_base=0.001))
+        with self.assertRaises(ConnectionError):
+            client.query_gideon_api_online('/diseases')
+        with self.assertRaises(ConnectionError):
+            list(client.stream_records('/diseases'))
+        results = client.query_many(['/diseases'], return_exceptions=True)
+        self.assertIsInstance(results[0], ConnectionError)
+
+    def test_not_found_not_retried(self):
+        transport = _scripted(404)
+        with self.assertRaises(ValueError):
+            _client(transport).query_gideon_api_online('/bad')
+        self.assertEqual(len(transport.calls), 1)
+
+    def test_retry_after_respected(self):
+        transport = _scripted(429, 200, headers={'Retry-After': '0'})
+        client = _client(transport, retry_policy=RetryPolicy(backoff_base=60))
+        client.query_gideon_api_online('/diseases')
+        self.assertEqual(client.retry_stats.backoff_seconds, 0)
+
+    def test_retry_after_waited_in_full(self):
+        transport = _scripted(429, 200, headers={'Retry-After': '60'})
+        client = _client(transport, retry_policy=RetryPolicy(backoff_max=0.01))
+        with mock.patch('gideon_api.query.api_wrapper.sleep') as sleep:
+            client.query_gideon_api_online('/diseases')
+        sleep.assert_called_once_with(60)
+        self.assertEqual(client.retry_stats.backoff_seconds, 60)
+
+    def test_long_retry_after_gives_up(self):
+        for options in ({'max_retry_after': 30}, {'deadline': 30}):
+            with self.subTest(**options):
+                transport = _scripted(429, 200, headers={'Retry-After': '60'})
+                client = _client(transport, retry_policy=RetryPolicy(**options))
+                r = client.query_gideon_api_online('/diseases',
+                                                   return_response_object=True)
+                self.assertEqual(r.status_code, 429)
+                self.assertEqual(len(transport.calls), 1)
+                self.assertEqual(client.retry_stats.gave_up, 1)
+
+    def test_deadline(self):
+        transport = _scripted(503, 200)
+        client = _client(transport,
+                         retry_policy=RetryPolicy(backoff_base=10,
+                                                  jitter=False,
+                                                  deadline=1))
+        with self.assertRaises(ConnectionError):
+            client.query_gideon_api_online('/diseases')
+        self.assertEqual(len(transport.calls), 1)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('120'), 120)
+        self.assertEqual(parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0)
+        self.assertIsNone(parse_retry_after('soon'))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_failures(self):
+        transport = _scripted(*[503] * 4)
+        client = _client(transport,
+                         retry_policy=RetryPolicy(max_attempts=2,
+                                                  backoff_base=0.001),
+                         circuit_breaker=CircuitBreaker(failure_threshold=2,
+                                                        reset_timeout=60))
+        with self.assertRaises(ConnectionError):
+            client.query_gideon_api_online('/diseases')
+        with self.assertRaises(CircuitOpenError):
+            client.query_gideon_api_online('/diseases')
+        self.assertEqual(len(transport.calls), 2)
+        self.assertEqual(client.retry_stats.rejected_by_circuit, 1)
+
+    def test_trial_call_closes_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+
+    def test_trial_ended_by_any_error(self):
+
+        def serve(path, params):
+            raise RuntimeError('bug in transport')
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        client = _client(FakeTransport(serve), circuit_breaker=breaker)
+        with self.assertRaises(RuntimeError):
+            client.query_gideon_api_online('/diseases')
+        # Another trial call is let through
+        self.assertTrue(breaker.before_call())
@@ -0,0 +1,105 @@
+import unittest
+from gideon_api.query.api_wrapper import _to_dataframe
+from gideon_api.query.schema import (endpoint_schema, records_to_columns,
+                                     to_typed_dataframe)
+
+_OUTBREAKS = [
+    {
+        'disease_code': 10100,
+        'disease': 'Anthrax',
+        'country_code': 'G100',
+        'year': 2020,
+        'latitude': '12.5',
+        'longitude': '-3.25'
+    },
+    {
+        'disease_code': 10100,
+        'disease': 'Anthrax',
+        'country_code': 'G200',
+        'year': 2021,
+        'latitude': None,
+        'longitude': '4'
+    },
+]
+
+
+class TestSchema(unittest.TestCase):
+
+    def test_endpoint_schemas(self):
+        outbreaks = endpoint_schema('/diseases/outbreaks')
+        self.assertIs(endpoint_schema('/diseases/10100/outbreaks'), outbreaks)
+        self.assertIs(endpoint_schema('/diseases/countries/G100'), outbreaks)
+        self.assertEqual(endpoint_schema('/diseases/fingerprint/countries'),
+                         endpoint_schema('/countries'))
+        self.assertEqual(endpoint_schema('/unknown'), {})
+
+    def test_records_to_columns(self):
+        self.assertEqual(records_to_columns([{
+            'a': 1
+        }, {
+            'b': 2
+        }]), {
+            'a': [1, None],
+            'b': [None, 2]
+        })
+
+    def test_outbreak_dtypes(self):
+        frame = to_typed_dataframe(_OUTBREAKS, '/diseases/outbreaks')
+        self.assertEqual(list(frame.columns), list(_OUTBREAKS[0]))
+        self.assertEqual(frame['country_code'].dtype.name, 'category')
+        self.assertEqual(frame['disease'].dtype.name, 'category')
+        self.assertEqual(frame['latitude'].dtype.name, 'float64')
+        self.assertEqual(frame['longitude'].tolist(), [-3.25, 4.0])
+        self.assertTrue(frame['latitude'].isna()[1])
+        self.assertEqual(frame['year'].dtype.name, 'int64')
+        self.assertEqual(frame['year'].tolist(), [2020, 2021])
+        # Integers are not downcast, so arithmetic does not wrap around
+        self.assertEqual((frame['year'] * 100).tolist(), [202000, 202100])
+        small = to_typed_dataframe([{'cases': 100}, {'cases': 120}])
+        self.assertEqual((small['cases'] * 1000).tolist(), [100000, 120000])
+
+    def test_key_dtypes(self):
+        outbreaks = to_typed_dataframe(_OUTBREAKS, '/diseases/outbreaks')
+        diseases = to_typed_dataframe([{
+            'disease_code': 10100,
+            'disease': 'Anthrax'
+        }], '/diseases')
+        countries = to_typed_dataframe([{
+            'country_code': 'G100',
+            'country': 'Albania'
+        }], '/countries')
+        self.assertEqual(outbreaks['disease_code'].dtype,
+                         diseases['disease_code'].dtype)
+        self.assertEqual(outbreaks['country_code'].dtype.name,
+                         countries['country_code'].dtype.name)
+        merged = outbreaks.merge(countries, on='country_code')
+        self.assertEqual(merged['country_code'].tolist(), ['G100'])
+
+    def test_inferred_dtypes(self):
+        frame = to_typed_dataframe([{
+            'count': 1,
+            'ratio': 0.5,
+            'tags': ['a'],
+            'flag': True
+        }, {
+            'count': None,
+            'ratio': 2,
+            'tags': ['b'],
+            'flag': False
+        }])
+        self.assertEqual(frame['count'].dtype.name, 'Int64')
+        self.assertEqual(frame['ratio'].dtype.name, 'float64')
+        self.assertEqual(frame['tags'].dtype.name, 'object')
+        self.assertEqual(frame['flag'].dtype.name, 'bool')
+
+    def test_response_conversion(self):
+        response = {'data': _OUTBREAKS}
+        typed = _to_dataframe(response, api_path='/diseases/outbreaks')
+        plain = _to_dataframe(response)
+        self.assertNotEqual(plain['country_code'].dtype.name, 'category')
+        self.assertLess(
+            typed.memory_usage(deep=True).sum(),
+            plain.memory_usage(deep=True).sum())
+        # Data which is not a list of records is left as it is
+        self.assertEqual(_to_dataframe({'data': 'text'}, api_path='/drugs'),
+                         {'data': 'text'})
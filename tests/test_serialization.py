@@ -0,0 +1,166 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime as dt
+from gideon_api.query.cache_backends import (RESPONSE, TIMESTAMP, PickleBackend,
+                                             SQLiteBackend)
+from gideon_api.query.serialization import (COMPRESSIONS, ENCODINGS,
+                                            check_format, deserialize,
+                                            serialize)
+
+_OUTBREAKS = {
+    'data': [{
+        'country_code': 'G100',
+        'country': 'Côte d\'Ivoire',
+        'year': 2020,
+        'latitude': '7.5400'
+    }, {
+        'country_code': 'G100',
+        'country': 'Côte d\'Ivoire',
+        'year': None
+    }, {
+        'year': 2021,
+        'country_code': 'G101',
+        'region': 'West Africa'
+    }],
+    'total': 3,
+}
+
+
+def _available_formats():
+    for encoding in ENCODINGS:
+        for compression in [''] + list(COMPRESSIONS):
+            name = f'{encoding}+{compression}' if compression else encoding
+            try:
+                yield check_format(name)
+            except ImportError:
+                continue
+
+
+class TestSerialization(unittest.TestCase):
+
+    def test_round_trip_every_format(self):
+        for name in _available_formats():
+            for value in (_OUTBREAKS, {'data': []}, {'data': [1, 2]}, [1]):
+                with self.subTest(name=name, value=value):
+                    self.assertEqual(
+                        deserialize(serialize(value, name), allow_pickle=True),
+                        value)
+
+    def test_format_is_recorded(self):
+        self.assertTrue(
+            serialize(_OUTBREAKS,
+                      'columnar+gzip').startswith(b'columnar+gzip\n'))
+        # Responses without records are not stored by column
+        text = {'data': 'text'}
+        self.assertTrue(serialize(text, 'columnar').startswith(b'json\n'))
+
+    def test_columnar_keeps_absent_keys_absent(self):
+        value = deserialize(serialize(_OUTBREAKS, 'columnar'))
+        self.assertNotIn('latitude', value['data'][1])
+        self.assertIsNone(value['data'][1]['year'])
+        self.assertEqual(list(value), ['data', 'total'])
+
+    def test_compression_reduces_size(self):
+        value = {'data': _OUTBREAKS['data'] * 200}
+        self.assertLess(len(serialize(value, 'json+zlib')),
+                        len(serialize(value, 'json')) / 4)
+
+    def test_default_format_is_not_pickled(self):
+        self.assertEqual(deserialize(serialize(_OUTBREAKS)), _OUTBREAKS)
+
+    def test_pickles_need_allow_pickle(self):
+        legacy = pickle.dumps(_OUTBREAKS, pickle.HIGHEST_PROTOCOL)
+        for data in (legacy, serialize(_OUTBREAKS, 'pickle+zlib')):
+            with self.assertRaises(ValueError):
+                deserialize(data)
+            self.assertEqual(deserialize(data, allow_pickle=True), _OUTBREAKS)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            check_format('json+rar')
+        with self.assertRaises(ValueError):
+            serialize(_OUTBREAKS, 'xml')
+
+
+class TestSerializedBackends(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _entry(self, response):
+        return {TIMESTAMP: dt.now(), RESPONSE: response}
+
+    def _insert_legacy_row(self):
+        legacy = pickle.dumps({'data': [1]}, pickle.HIGHEST_PROTOCOL)
+        connection = sqlite3.connect(self.path)
+        connection.execute(
+            'INSERT INTO entries (key, timestamp, content_hash, response) '
+            'VALUES (?, ?, ?, ?)',
+            ('/old', dt.now().timestamp(), 'hash', legacy))
+        connection.commit()
+        connection.close()
+
+    def test_sqlite_reads_rows_in_previous_format(self):
+        backend = SQLiteBackend(self.path, serialization='columnar+gzip')
+        backend.set('/new', self._entry(_OUTBREAKS))
+        backend.close()
+        self._insert_legacy_row()
+
+        backend = SQLiteBackend(self.path, allow_pickle=True)
+        self.assertEqual(backend.get('/new')[RESPONSE], _OUTBREAKS)
+        self.assertEqual(backend.get('/old')[RESPONSE], {'data': [1]})
+        backend.close()
+
+    def test_sqlite_ignores_pickled_rows(self):
+        SQLiteBackend(self.path).close()
+        self._insert_legacy_row()
+
+        backend = SQLiteBackend(self.path)
+        with mock.patch('pickle.loads') as loads:
+            self.assertIsNone(backend.get('/old'))
+        loads.assert_not_called()
+        self.assertEqual(backend.keys(), [])
+        with self.assertRaises(ValueError):
+            SQLiteBackend(self.path, serialization='pickle+zlib')
+        backend.close()
+
+    def test_pickle_backend_decodes_on_read(self):
+        backend = PickleBackend(self.path)
+        size = backend.set('/diseases', self._entry(_OUTBREAKS))
+        backend.flush()
+
+        backend = PickleBackend(self.path)
+        stored = backend._entries['/diseases'][RESPONSE]
+        self.assertIsInstance(stored, bytes)
+        self.assertEqual(len(stored), size)
+        self.assertEqual(backend.sizes(), [('/diseases', size)])
+        self.assertEqual(backend.get('/diseases')[RESPONSE], _OUTBREAKS)
+
+    @unittest.skipUnless(hasattr(os, 'getuid'), 'needs file ownership')
+    def test_pickle_backend_ignores_file_others_can_write(self):
+        backend = PickleBackend(self.path)
+        backend.set('/diseases', self._entry(_OUTBREAKS))
+        backend.flush()
+        os.chmod(self.path, 0o666)
+        self.assertIsNone(PickleBackend(self.path).get('/diseases'))
+        os.chmod(self.path, 0o600)
+        self.assertIsNotNone(PickleBackend(self.path).get('/diseases'))
+
+    def test_pickle_backend_reads_unserialized_entries(self):
+        with open(self.path, 'wb') as f:
+            pickle.dump({'/diseases': self._entry({'data': [1]})}, f)
+        backend = PickleBackend(self.path)
+        self.assertEqual(backend.get('/diseases')[RESPONSE], {'data': [1]})
+        self.assertIsNotNone(backend.get_hash('/diseases'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import threading
+import time
+import unittest
+from gideon_api.query.singleflight import SingleFlight
+from helpers import FakeTransport, offline_client
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def _run_concurrently(self, flight, func, count=10):
+        results = []
+        errors = []
+
+        def worker():
+            try:
+                results.append(flight.do('/diseases', func))
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_concurrent_calls_share_result(self):
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return {'data': []}
+
+        flight = SingleFlight()
+        results, _ = self._run_concurrently(flight, fetch)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(flight.coalesced, 9)
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_errors_shared(self):
+
+        def fetch():
+            time.sleep(0.05)
+            raise ValueError('Bad GIDEON API path')
+
+        results, errors = self._run_concurrently(SingleFlight(), fetch)
+        self.assertEqual((len(results), len(errors)), (0, 10))
+
+    def test_sequential_calls_not_shared(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('/a', lambda: 1), 1)
+        self.assertEqual(flight.do('/a', lambda: 2), 2)
+
+
+class TestClientFlights(unittest.TestCase):
+
+    def test_forced_query_not_shared(self):
+        transport = FakeTransport(lambda *_: {'data': []}, delay=0.1)
+        client = offline_client(transport)
+        thread = threading.Thread(target=client.query_gideon_api,
+                                  args=('/diseases',))
+        thread.start()
+        time.sleep(0.02)
+        # Joining the other call could answer the forced query from the
+        # cache, so it sends its own call
+        client.query_gideon_api('/diseases', force_online=True)
+        thread.join()
+        self.assertEqual(transport.paths, ['/diseases', '/diseases'])
+        self.assertEqual(client._in_flight.coalesced, 0)
@@ -0,0 +1,160 @@
+import io
+import json
+import tracemalloc
+import unittest
+import requests
+from gideon_api.query.stream import iter_records, load, response_text
+from helpers import FakeTransport, offline_client
+
+_DOCUMENT = {
+    'meta': {
+        'count': 3,
+        'tags': ['a', {
+            'b': [1, 2]
+        }]
+    },
+    'data': [{
+        'country': 'Ghana',
+        'year': 2019,
+        'latitude': 7.9465
+    }, {
+        'country': 'Côte d\'Ivoire',
+        'year': 2020,
+        'latitude': -12.5e-3
+    }, {
+        'country': 'Peru [ "]',
+        'year': 2021,
+        'latitude': None
+    }],
+    'total': 1234567,
+}
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestJSONReader(unittest.TestCase):
+
+    def test_load_matches_json_for_every_chunk_size(self):
+        text = json.dumps(_DOCUMENT)
+        for size in (1, 2, 3, 7, 64, len(text)):
+            with self.subTest(size=size):
+                self.assertEqual(load(_chunks(text, size)), _DOCUMENT)
+
+    def test_records_are_yielded_in_order(self):
+        text = json.dumps(_DOCUMENT, indent=2)
+        self.assertEqual(list(iter_records(_chunks(text, 5))),
+                         _DOCUMENT['data'])
+
+    def test_number_split_across_chunks(self):
+        self.assertEqual(load(['{"data": [12', '34, 5', '6]}']),
+                         {'data': [1234, 56]})
+        self.assertEqual(load(['12', '3.', '5']), 123.5)
+
+    def test_other_keys_are_skipped(self):
+        text = json.dumps({'data': {'not': 'an array'}, 'rows': [1, 2]})
+        self.assertEqual(list(iter_records([text])), [])
+        self.assertEqual(list(iter_records([text], key='rows')), [1, 2])
+
+    def test_invalid_document_raises(self):
+        with self.assertRaises(json.JSONDecodeError):
+            load(['{"data": [1, 2'])
+        with self.assertRaises(json.JSONDecodeError):
+            load(['{"data" 1}'])
+
+    def test_braces_inside_records(self):
+        document = {
+            'data': [{
+                'name': 'a}, {"b": 1}'
+            }, {
+                'nested': {
+                    'x': [{}]
+                }
+            }, {
+                'name': '}'
+            }, 3, {
+                'name': '}]'
+            }],
+            'meta': {
+                'y': 1
+            }
+        }
+        text = json.dumps(document)
+        for size in (1, 5, 16, len(text)):
+            with self.subTest(size=size):
+                self.assertEqual(load(_chunks(text, size)), document)
+
+    def test_keys_shared_between_records(self):
+        records = [{
+            'country_code': f'G{i % 50}',
+            'disease_code': i % 70,
+            'latitude': str(i / 7)
+        } for i in range(20000)]
+        text = json.dumps({'data': records})
+
+        def retained(decode):
+            tracemalloc.start()
+            try:
+                decoded = decode()
+                return tracemalloc.get_traced_memory()[0], decoded
+            finally:
+                tracemalloc.stop()
+
+        loaded_size, loaded = retained(lambda: json.loads(text))
+        streamed_size, streamed = retained(
+            lambda: load(_chunks(text, 64 * 1024)))
+        self.assertEqual(streamed, loaded)
+        # The decoded records take no more memory than with json.loads
+        self.assertLess(streamed_size, loaded_size * 1.1)
+
+    def test_multibyte_characters_split_across_chunks(self):
+        body = json.dumps({'data': ['Côte']}, ensure_ascii=False).encode()
+        r = requests.Response()
+        r.raw = io.BytesIO(body)
+        # A chunk size of 1 byte splits the two bytes of 'ô'
+        self.assertEqual(load(response_text(r, chunk_size=1)),
+                         {'data': ['Côte']})
+
+
+class TestStreamingClient(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = FakeTransport(lambda *_: _DOCUMENT)
+        self.client = offline_client(self.transport)
+
+    @property
+    def raw(self):
+        """The body of the last response"""
+        return self.transport.responses[-1].raw
+
+    def test_query_parses_streamed_response(self):
+        response = self.client.query_gideon_api('/diseases/outbreaks',
+                                                try_dataframe=False)
+        self.assertEqual(response, _DOCUMENT)
+        self.assertEqual(self.transport.streamed, [True])
+        self.assertTrue(self.raw.closed)
+
+    def test_stream_records(self):
+        records = self.client.stream_records('/diseases/outbreaks')
+        self.assertEqual(next(records), _DOCUMENT['data'][0])
+        self.assertFalse(self.raw.closed)
+        self.assertEqual(list(records), _DOCUMENT['data'][1:])
+        self.assertTrue(self.raw.closed)
+
+    def test_stream_dataframes(self):
+        frames = list(
+            self.client.stream_dataframes('/diseases/outbreaks', chunk_size=2))
+        self.assertEqual([len(frame) for frame in frames], [2, 1])
+        self.assertEqual(frames[0]['country'].dtype, 'category')
+        self.assertEqual(frames[1]['year'].tolist(), [2021])
+
+    def test_response_object_is_not_streamed(self):
+        r = self.client.query_gideon_api_online('/diseases/outbreaks',
+                                                return_response_object=True)
+        self.assertEqual(r.json(), _DOCUMENT)
+        self.assertEqual(self.transport.streamed, [False])
+
+
+if __name__ == '__main__':
+    unittest.main()
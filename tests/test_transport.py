@@ -0,0 +1,58 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from gideon_api.query.transport import HTTPTransport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"data": []}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHTTPTransport(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/diseases'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_connection_reused(self):
+        with HTTPTransport() as transport:
+            for _ in range(3):
+                r = transport.get(self.url)
+                self.assertEqual(r.json(), {'data': []})
+            self.assertEqual(transport.stats.requests, 3)
+            self.assertEqual(transport.stats.new_connections, 1)
+            self.assertTrue(transport.last_timing.reused_connection)
+
+    def test_timing_phases(self):
+        with HTTPTransport() as transport:
+            transport.get(self.url)
+            timing = transport.last_timing
+            self.assertGreater(timing.connect, 0)
+            self.assertGreaterEqual(timing.total,
+                                    timing.connect + timing.download)
+
+    def test_close_reopens_connection(self):
+        transport = HTTPTransport()
+        transport.get(self.url)
+        transport.close()
+        transport.get(self.url)
+        self.assertEqual(transport.stats.new_connections, 2)
+        transport.close()
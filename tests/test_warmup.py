@@ -0,0 +1,99 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime as dt, timedelta
+from gideon_api.codes import index, lookup_item, search_items, warmup
+from gideon_api.codes.index import ENDPOINT_ID_NAME, CatalogIndex
+from gideon_api.codes.search import CatalogSearch
+from gideon_api.query import GIDEON
+from gideon_api.query.cache import GideonAPICache
+from gideon_api.query.cache_backends import RESPONSE, SQLiteBackend
+from helpers import FakeTransport, offline_client, use_client
+
+
+def _catalog(path, params):
+    """Two items for every catalog endpoint"""
+    if path not in ENDPOINT_ID_NAME:
+        return None
+    id_key, name_key = ENDPOINT_ID_NAME[path]
+    return {
+        'data': [{
+            id_key: 1,
+            name_key: f'First {path}'
+        }, {
+            id_key: 2,
+            name_key: f'Second {path}'
+        }]
+    }
+
+
+class TestWarmCache(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = FakeTransport(_catalog, etags=True)
+        self.client = offline_client(self.transport)
+        use_client(self, self.client, index, warmup)
+        self.addCleanup(index._INDEXES.clear)
+
+    def test_every_catalog_fetched_and_indexed(self):
+        counts = warmup.warm_cache()
+        self.assertEqual(counts, dict.fromkeys(ENDPOINT_ID_NAME, 2))
+        self.assertEqual(sorted(self.transport.paths), sorted(ENDPOINT_ID_NAME))
+        for api_endpoint in ENDPOINT_ID_NAME:
+            for index_class in (CatalogIndex, CatalogSearch):
+                self.assertIsNotNone(
+                    index.current_index(api_endpoint, index_class))
+
+        # Lookups are answered without calling the server
+        self.assertEqual(lookup_item('vaccines', 'second /vaccines'), 2)
+        self.assertEqual(search_items('yeasts', 'First yeast')[0].code, 1)
+        self.assertEqual(len(self.transport.paths), len(ENDPOINT_ID_NAME))
+
+    def test_snapshot_is_a_ready_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.sqlite3')
+            warmup.warm_cache(['drugs', 'countries'], snapshot=path)
+            backend = SQLiteBackend(path)
+            self.assertEqual(sorted(backend.keys()), ['/countries', '/drugs'])
+            self.assertEqual(
+                backend.get('/drugs')[RESPONSE]['data'][0], {
+                    'drug_code': 1,
+                    'drug': 'First /drugs'
+                })
+            backend.close()
+
+    def test_expired_snapshot_revalidated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.sqlite3')
+            warmup.warm_cache(['drugs'], snapshot=path)
+            backend = SQLiteBackend(path)
+            backend.touch('/drugs', dt.now() - timedelta(hours=25))
+            backend.close()
+
+            client = GIDEON('key',
+                            transport=self.transport,
+                            cache=GideonAPICache(
+                                24, backend=lambda: SQLiteBackend(path)))
+            drugs = client.query_gideon_api('/drugs', try_dataframe=False)
+            self.assertEqual(drugs['data'][0]['drug'], 'First /drugs')
+            self.assertEqual(client._cache.stats.revalidated, 1)
+            client.close()
+
+    def test_cached_catalogs_not_downloaded_again(self):
+        warmup.warm_cache(['diseases'])
+        warmup.warm_cache(['diseases'])
+        self.assertEqual(self.transport.paths, ['/diseases'])
+
+    def test_command(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            status = warmup.main(['regions', '--workers', '2'])
+        self.assertEqual(status, 0)
+        self.assertIn('/travel/regions', output.getvalue())
+        self.assertIn('1 catalogs ready', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,244 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from datetime import datetime as dt, timedelta
+from gideon_api.query import GIDEON
+from gideon_api.query.cache import GideonAPICache
+from gideon_api.query.cache_backends import (ETAG, LAST_MODIFIED, RESPONSE,
+                                             TIMESTAMP, MemoryBackend,
+                                             SQLiteBackend, response_size)
+from gideon_api.query.write_behind import WriteBehindBackend, _flush_at_exit
+
+
+class _FailingBackend(MemoryBackend):
+    """Fails the first write of every batch until allowed"""
+
+    def __init__(self):
+        super().__init__()
+        self.fail = True
+
+    def set(self, key, entry):
+        if self.fail:
+            raise OSError('disk full')
+        return super().set(key, entry)
+
+
+class TestWriteBehindBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.inner = MemoryBackend()
+        # Long enough that only explicit flushes write during a test
+        self.backend = WriteBehindBackend(self.inner, flush_interval=60)
+
+    def tearDown(self):
+        self.backend.close()
+
+    def _entry(self, value, hours_ago=0):
+        return {
+            TIMESTAMP: dt.now() - timedelta(hours=hours_ago),
+            RESPONSE: value
+        }
+
+    def test_writes_are_deferred(self):
+        self.backend.set('/a', self._entry({'data': [1]}))
+        self.assertIsNone(self.inner.get('/a'))
+        self.assertEqual(self.backend.get('/a')[RESPONSE], {'data': [1]})
+        self.assertEqual(self.backend.keys(), ['/a'])
+        self.assertEqual(self.backend.pending(), 1)
+
+        self.backend.flush()
+        self.assertEqual(self.inner.get('/a')[RESPONSE], {'data': [1]})
+        self.assertEqual(self.backend.pending(), 0)
+
+    def test_changes_to_a_key_are_combined(self):
+        self.inner.set('/a', self._entry({'data': [1]}, hours_ago=30))
+        now = dt.now()
+        self.backend.touch('/a', now, {ETAG: '"v2"'})
+        self.assertEqual(self.backend.get('/a')[TIMESTAMP], now)
+        self.assertEqual(self.backend.get_metadata('/a')[0], now)
+
+        self.backend.set('/b', self._entry({'data': [2]}))
+        self.backend.touch('/b', now, {ETAG: '"v1"'})
+        self.backend.delete('/c')
+        self.backend.flush()
+        self.assertEqual(self.inner.get('/a')[ETAG], '"v2"')
+        self.assertEqual(self.inner.get('/b')[ETAG], '"v1"')
+
+        self.backend.delete('/a')
+        self.assertIsNone(self.backend.get('/a'))
+        self.assertIsNone(self.backend.get_hash('/a'))
+        self.assertEqual(self.backend.keys(), ['/b'])
+
+    def test_touches_keep_omitted_validators(self):
+        entry = self._entry({'data': [1]}, hours_ago=30)
+        entry[LAST_MODIFIED] = 'today'
+        self.inner.set('/a', entry)
+        self.backend.touch('/a', dt.now(), {ETAG: '"v1"'})
+        self.backend.touch('/a', dt.now(), {LAST_MODIFIED: 'tomorrow'})
+        validators = {ETAG: '"v1"', LAST_MODIFIED: 'tomorrow'}
+        self.assertEqual(self.backend.get_validators('/a'), validators)
+        self.backend.flush()
+        self.assertEqual(self.inner.get_validators('/a'), validators)
+        self.backend.delete('/a')
+        self.assertIsNone(self.backend.get_validators('/a'))
+
+    def test_interval_and_size_thresholds(self):
+        backend = WriteBehindBackend(self.inner, flush_interval=0.01)
+        backend.set('/a', self._entry({'data': []}))
+        time.sleep(0.2)
+        self.assertIsNotNone(self.inner.get('/a'))
+        backend.close()
+
+        backend = WriteBehindBackend(self.inner,
+                                     flush_interval=60,
+                                     max_pending=3)
+        for key in ('/b', '/c', '/d'):
+            backend.set(key, self._entry({'data': []}))
+        time.sleep(0.2)
+        self.assertEqual(backend.pending(), 0)
+        backend.close()
+
+    def test_failed_batch_is_retried(self):
+        inner = _FailingBackend()
+        backend = WriteBehindBackend(inner, flush_interval=60)
+        backend.set('/a', self._entry({'data': [1]}))
+        with self.assertRaises(OSError):
+            backend.flush()
+        backend.touch('/a', dt.now(), {ETAG: '"v1"'})
+        self.assertEqual(backend.pending(), 1)
+
+        inner.fail = False
+        backend.close()
+        self.assertEqual(inner.get('/a')[RESPONSE], {'data': [1]})
+        self.assertEqual(inner.get('/a')[ETAG], '"v1"')
+
+    def test_failing_backend_holds_back_writes(self):
+        inner = _FailingBackend()
+        backend = WriteBehindBackend(inner, flush_interval=0.01, max_pending=5)
+        with self.assertLogs('gideon_api.query.write_behind', 'WARNING'):
+            for i in range(5):
+                backend.set(f'/{i}', self._entry({'data': [i]}))
+            time.sleep(0.1)
+        # The background writer failed and kept the changes
+        self.assertIsInstance(backend.error, OSError)
+        self.assertEqual(backend.pending(), 5)
+        # Once max_pending keys wait, the error reaches the caller instead of
+        # the changes piling up in memory
+        for i in range(5, 20):
+            with self.assertRaises(OSError):
+                backend.set(f'/{i}', self._entry({'data': [i]}))
+        self.assertEqual(backend.pending(), 5)
+        # Changes to the waiting keys are still kept
+        backend.touch('/0', dt.now(), {ETAG: '"v1"'})
+
+        inner.fail = False
+        backend.flush()
+        self.assertIsNone(backend.error)
+        self.assertEqual(sorted(inner.keys()), [f'/{i}' for i in range(5)])
+        self.assertEqual(inner.get('/0')[ETAG], '"v1"')
+        backend.close()
+
+    def test_flushed_at_exit(self):
+        self.backend.set('/a', self._entry({'data': []}))
+        _flush_at_exit()
+        self.assertIsNotNone(self.inner.get('/a'))
+
+
+class TestWriteBehindCache(unittest.TestCase):
+
+    def test_sqlite_changes_persisted_on_close(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache')
+            cache = GideonAPICache(24,
+                                   backend=SQLiteBackend(path),
+                                   write_behind=60)
+            for year in range(5):
+                cache.write(f'/outbreaks?year={year}', {'data': [year]})
+            self.assertEqual(cache.query('/outbreaks?year=3'), {'data': [3]})
+            self.assertEqual(SQLiteBackend(path).keys(), [])
+            cache.close()
+
+            cache = GideonAPICache(24, backend=SQLiteBackend(path))
+            self.assertEqual(len(cache.backend.keys()), 5)
+            self.assertEqual(cache.query('/outbreaks?year=3'), {'data': [3]})
+            cache.close()
+
+    def test_sizes_counted_as_stored(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache')
+            cache = GideonAPICache(24,
+                                   backend=lambda: SQLiteBackend(path),
+                                   max_bytes=10**6,
+                                   write_behind=60)
+            response = {'data': [{'disease_code': 10100}] * 1000}
+            # Responses are not serialized on the calling thread
+            with mock.patch('gideon_api.query.cache.response_size',
+                            side_effect=AssertionError):
+                cache.write('/diseases', response)
+                cache.write('/countries', {'data': []})
+            cache.flush()
+            stored = dict(cache.backend.backend.sizes())
+            self.assertEqual(dict(cache._lru), stored)
+            self.assertEqual(cache.stats.bytes, sum(stored.values()))
+            # The compressed size, as counted when the cache is reopened
+            self.assertLess(stored['/diseases'], response_size(response))
+            cache.close()
+
+            reopened = GideonAPICache(24,
+                                      backend=lambda: SQLiteBackend(path),
+                                      max_bytes=10**6)
+            self.assertEqual(len(reopened.backend.keys()), 2)
+            self.assertEqual(reopened.stats.bytes, sum(stored.values()))
+            reopened.close()
+
+    def test_client_close_stops_threads(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache')
+            cache = GideonAPICache(24,
+                                   backend=lambda: SQLiteBackend(path),
+                                   sweep_interval=60,
+                                   write_behind=60)
+            client = GIDEON('key', cache=cache)
+            cache.write('/diseases', {'data': []})
+            writer = cache.backend._writer
+            sweeper = cache._sweeper
+            client.close()
+            self.assertFalse(writer.is_alive())
+            self.assertFalse(sweeper.is_alive())
+            self.assertEqual(SQLiteBackend(path).keys(), ['/diseases'])
+            # The cache is opened again when the client is used again
+            self.assertEqual(cache.query('/diseases'), {'data': []})
+            client.close()
+
+    def test_backend_of_the_caller_left_open(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache')
+            for backend in (MemoryBackend(), SQLiteBackend(path)):
+                for write_behind in (None, 60):
+                    with self.subTest(backend=type(backend).__name__,
+                                      write_behind=write_behind):
+                        cache = GideonAPICache(24,
+                                               backend=backend,
+                                               write_behind=write_behind)
+                        client = GIDEON('key', cache=cache)
+                        cache.write('/diseases', {'data': [1]})
+                        client.close()
+                        # The client is used again after it is closed
+                        self.assertEqual(
+                            client.query_gideon_api('/diseases',
+                                                    try_dataframe=False),
+                            {'data': [1]})
+                        client.close()
+                        cache.backend.delete('/diseases')
+                        client.close()
+            backend.close()
+
+    def test_default_cache_keeps_expired_entries(self):
+        client = GIDEON('key')
+        self.assertIsNone(client._cache._sweep_interval)
+
+
+if __name__ == '__main__':
+    unittest.main()